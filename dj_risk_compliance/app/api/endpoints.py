@@ -1,13 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Body
 from typing import List, Optional
 from app.services.dj_api import DowJonesAPIService
+from app.services.name_normalization import dedupe_names
+from app.services.match_store import get_match_store
+from app.services.scheduler import INTERACTIVE
+from app.auth.pool import get_credential_pool
+from app.responses import json_response
+from app.tracing import TimedRoute
 import httpx
 import asyncio
 from app.api.models import *
 
 import logging
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 logger = logging.getLogger(__name__)
 
 
@@ -98,7 +104,7 @@ async def create_screening_case(request: BulkScreeningRequest, details: bool = T
 @router.get("/screening/cases/{case_id}")
 async def get_screening_case(case_id: str):
     try:
-        service = DowJonesAPIService()
+        service = DowJonesAPIService(priority=INTERACTIVE)
         result = await service.get_case_by_id(case_id)
         return result
     except Exception as e:
@@ -123,6 +129,21 @@ async def get_all_screening_cases(
 async def create_screening_case(names: List[str] = Body(..., embed=True, example=["Name1", "Name2"])):
     wait_for_matches: bool = True,
     max_wait_seconds: int = 10
+    unique_names, name_index = dedupe_names(names)
+    # Every submitted input, pointing at the association it was collapsed into;
+    # names with nothing left after normalization are not screened and are marked rejected
+    screened = {
+        index: unique_names[position]
+        for position, occurrences in enumerate(name_index.values())
+        for index, _ in occurrences
+    }
+    inputs = [
+        {"input_index": index, "input_name": name, "screened_name": screened[index]} if index in screened
+        else {"input_index": index, "input_name": name, "screened_name": None, "rejected": "empty after normalization"}
+        for index, name in enumerate(names)
+    ]
+    if not unique_names:
+        raise HTTPException(status_code=422, detail={"message": "No screenable names", "inputs": inputs})
     try:
         service = DowJonesAPIService()
         
@@ -136,7 +157,7 @@ async def create_screening_case(names: List[str] = Body(..., embed=True, example
                             {
                                 "names": [{"single_string_name": name, "name_type": "PRIMARY"}],
                                 "record_type": "UNKNOWN"
-                            } for name in names
+                            } for name in unique_names
                         ],
                         "case_name": "screening_case",
                         "external_id": "external_id_123",
@@ -175,17 +196,19 @@ async def create_screening_case(names: List[str] = Body(..., embed=True, example
             "transaction_details": transaction_details,
             "case_id": case_id,
             "transaction_id": transaction_id,
+            "inputs": inputs,
             "status": "completed" if not wait_for_matches else "processing"
         }
         if wait_for_matches:
             matches = await service.wait_for_matches(case_id, max_wait_seconds)
+            await record_matches(matches, case_id)
             response_data["matches"] = matches
             response_data.update({
                 "matches": matches,
                 "status": "completed" if matches and "errors" not in matches else "processing"
             })
         
-        return response_data
+        return json_response(response_data)
        
         
     except httpx.HTTPStatusError as e:
@@ -207,17 +230,87 @@ async def create_screening_case(names: List[str] = Body(..., embed=True, example
 @router.get("/screening/cases/{case_id}/transactions/{transaction_id}")
 async def get_transaction_details(case_id: str, transaction_id: str):
     try:
-        service = DowJonesAPIService()
+        service = DowJonesAPIService(priority=INTERACTIVE)
         return await service.get_transaction_details(case_id, transaction_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 
 @router.get("/screening/cases/{case_id}/matches")
-async def get_case_matches(case_id: str):
+async def get_case_matches(
+    case_id: str,
+    activity_from: Optional[str] = Query(None, description="Only matches with activity on or after this ISO timestamp"),
+    activity_to: Optional[str] = Query(None, description="Only matches with activity before this ISO timestamp")
+):
     try:
-        service = DowJonesAPIService()
-        return await service.get_case_matches(case_id)
+        service = DowJonesAPIService(priority=INTERACTIVE)
+        activity = {bound: value for bound, value in (("from", activity_from), ("to", activity_to)) if value}
+        filters = MatchFilters(has_alerts=True, last_match_activity_on=activity or None)
+        matches = await service.get_case_matches(case_id, filters=filters)
+        await record_matches(matches, case_id)
+        return json_response(matches)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-        
\ No newline at end of file
+
+
+async def record_matches(matches, case_id: str):
+    """Write a matches response to the local match store without failing the request.
+
+    Only matches that are new or changed since they were last stored for the
+    case are written, so reading the same case repeatedly is idempotent.
+    """
+    store = get_match_store()
+    if store is None or not matches or "errors" in matches:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, store.add_response, matches, case_id, "api", True)
+    except Exception as e:
+        logger.error(f"Failed to record matches in the match store: {str(e)}")
+
+
+@router.get("/matches")
+async def query_matches(
+    peid: Optional[str] = None,
+    match_name: Optional[str] = None,
+    input_name: Optional[str] = None,
+    case_id: Optional[str] = None,
+    source: Optional[str] = None,
+    since: Optional[str] = Query(None, description="ISO timestamp, inclusive lower bound on run time"),
+    until: Optional[str] = Query(None, description="ISO timestamp, exclusive upper bound on run time"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    store = get_match_store()
+    if store is None:
+        raise HTTPException(status_code=404, detail="Match store is disabled")
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            lambda: store.query(peid, match_name, input_name, case_id, source, since, until, offset, limit)
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/matches/peids/{peid}/inputs")
+async def get_inputs_for_peid(
+    peid: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    store = get_match_store()
+    if store is None:
+        raise HTTPException(status_code=404, detail="Match store is disabled")
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, store.inputs_for_peid, peid, offset, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+        
+
+
+@router.get("/accounts/health")
+async def get_accounts_health():
+    return {"accounts": get_credential_pool().health()}
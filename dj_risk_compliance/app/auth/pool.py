@@ -0,0 +1,233 @@
+# app/auth/pool.py
+import asyncio
+import re
+import time
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+from app.config import DJAccount, settings, worker_share
+from app.auth.service import DJAuthService
+from app.metrics import ACCOUNT_COOLDOWNS
+
+
+logger = logging.getLogger(__name__)
+
+CASE_ENDPOINT = re.compile(r"^/risk-entity-screening-cases/(?!bulk-associations)([^/?]+)")
+
+# Answers to a request on a case that the signing account cannot see
+CASE_NOT_VISIBLE = (403, 404)
+
+# Case ids remembered for account affinity; the oldest are forgotten first
+MAX_BOUND_CASES = 10000
+
+
+class AccountState:
+    """One service account: its own token lifecycle, request budget and health"""
+
+    def __init__(self, account: DJAccount, budget: int, window: float):
+        self.name = account.name
+        self.auth_service = DJAuthService(account)
+        self.budget = account.request_budget or budget
+        self.window = window
+        self._sent: Deque[float] = deque()
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self.last_error: Optional[str] = None
+        self.requests = 0
+        self.throttled = 0
+        self.auth_failures = 0
+        self.errors = 0
+
+    def remaining(self, now: float) -> int:
+        """Requests left in the current budget window"""
+        while self._sent and self._sent[0] <= now - self.window:
+            self._sent.popleft()
+        return self.budget - len(self._sent) - self.in_flight
+
+    def available(self, now: float) -> bool:
+        return now >= self.cooldown_until and self.remaining(now) > 0
+
+    def available_at(self, now: float) -> float:
+        """Earliest time the account may be available again"""
+        if self.cooldown_until > now:
+            return self.cooldown_until
+        if self._sent:
+            return self._sent[0] + self.window
+        return now
+
+    def health(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        cooling = max(0.0, self.cooldown_until - now)
+        return {
+            "name": self.name,
+            "status": "cooling_down" if cooling else "active",
+            "cooldown_seconds": round(cooling, 1),
+            "remaining_budget": self.remaining(now),
+            "budget": self.budget,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "auth_failures": self.auth_failures,
+            "errors": self.errors,
+            "last_error": self.last_error
+        }
+
+
+class CredentialPool:
+    """Spreads Dow Jones requests across several service accounts.
+
+    Each request goes to the available account with the most budget left in
+    its window. An account that answers 429 or fails to authenticate is taken
+    out of rotation for its Retry-After or the configured cooldown. Requests
+    on an existing screening case stay on the account that created it, since
+    cases are not visible across accounts. The binding is kept in memory, so
+    a case this process did not create is looked for on each account in turn
+    and bound to the first one that can see it.
+    """
+
+    def __init__(
+        self,
+        accounts: List[DJAccount],
+        budget: int,
+        window: float = 60.0,
+        cooldown: float = 60.0
+    ):
+        if not accounts:
+            raise ValueError("No Dow Jones service accounts configured")
+        self.accounts = [AccountState(account, budget, window) for account in accounts]
+        self.cooldown = cooldown
+        self._by_name = {account.name: account for account in self.accounts}
+        self._cases: "OrderedDict[str, str]" = OrderedDict()
+
+    def case_account(self, case_id: str) -> Optional[str]:
+        return self._cases.get(case_id)
+
+    def bind_case(self, case_id: str, account_name: str):
+        """Pin later requests on ``case_id`` to the named account"""
+        if account_name not in self._by_name:
+            return
+        self._cases[case_id] = account_name
+        self._cases.move_to_end(case_id)
+        while len(self._cases) > MAX_BOUND_CASES:
+            self._cases.popitem(last=False)
+
+    def _candidates(self, endpoint: str, exclude: Iterable[str] = ()) -> List[AccountState]:
+        match = CASE_ENDPOINT.match(endpoint)
+        if match and match.group(1) in self._cases:
+            return [self._by_name[self._cases[match.group(1)]]]
+        return [account for account in self.accounts if account.name not in exclude]
+
+    def case_found(self, endpoint: str, account_name: str):
+        """Bind the case of a successful case request to the account that made it, if not bound yet"""
+        match = CASE_ENDPOINT.match(endpoint)
+        if match and match.group(1) not in self._cases:
+            self.bind_case(match.group(1), account_name)
+
+    def try_other_account(self, endpoint: str, status_code: int, tried: Iterable[str]) -> bool:
+        """True when a case request was refused by an account that may simply not own the case"""
+        match = CASE_ENDPOINT.match(endpoint)
+        if status_code not in CASE_NOT_VISIBLE or not match or match.group(1) in self._cases:
+            return False
+        return bool(self._candidates(endpoint, exclude=tried))
+
+    async def acquire(self, endpoint: str, exclude: Iterable[str] = ()) -> AccountState:
+        """Reserve the best account for a request, waiting while every candidate is out of rotation.
+
+        Accounts named in ``exclude`` are skipped unless the endpoint's case is bound to one of them.
+        """
+        candidates = self._candidates(endpoint, exclude)
+        while True:
+            now = time.monotonic()
+            available = [account for account in candidates if account.available(now)]
+            if available:
+                account = max(available, key=lambda a: a.remaining(now))
+                account.in_flight += 1
+                return account
+
+            wake_at = min(account.available_at(now) for account in candidates)
+            await asyncio.sleep(max(0.05, wake_at - now))
+
+    def release(self, account: AccountState, status_code: Optional[int] = None, retry_after: Optional[str] = None):
+        """Return an account after a request and update its budget and health"""
+        account.in_flight -= 1
+        account.requests += 1
+        account._sent.append(time.monotonic())
+        if status_code == 429:
+            account.throttled += 1
+            ACCOUNT_COOLDOWNS.inc(account=account.name, reason="rate_limited")
+            self._cool_down(account, self._retry_after(retry_after), "Rate limited (429)")
+        elif status_code == 401:
+            account.auth_failures += 1
+            account.auth_service.invalidate()
+            ACCOUNT_COOLDOWNS.inc(account=account.name, reason="token_rejected")
+            self._cool_down(account, self.cooldown, "Token rejected (401)")
+        elif status_code is not None and status_code >= 500:
+            account.errors += 1
+
+    def auth_failed(self, account: AccountState, error: Exception):
+        """Take an account out of rotation after its token could not be obtained"""
+        account.in_flight -= 1
+        self._auth_failure(account, error)
+
+    def _auth_failure(self, account: AccountState, error: Exception):
+        account.auth_failures += 1
+        ACCOUNT_COOLDOWNS.inc(account=account.name, reason="auth_failed")
+        self._cool_down(account, self.cooldown, f"Authentication failed: {str(error)}")
+
+    def _retry_after(self, value: Optional[str]) -> float:
+        try:
+            return max(1.0, float(value))
+        except (TypeError, ValueError):
+            return self.cooldown
+
+    def _cool_down(self, account: AccountState, seconds: float, reason: str):
+        account.cooldown_until = max(account.cooldown_until, time.monotonic() + seconds)
+        account.last_error = reason
+        logger.warning(f"Account {account.name} out of rotation for {seconds:.0f}s: {reason}")
+
+    async def warm(self):
+        """Log every account in concurrently; failures take the account out of rotation"""
+        results = await asyncio.gather(
+            *(account.auth_service.get_valid_token() for account in self.accounts),
+            return_exceptions=True
+        )
+        for account, result in zip(self.accounts, results):
+            if isinstance(result, Exception):
+                self._auth_failure(account, result)
+        if all(isinstance(result, Exception) for result in results):
+            raise results[0]
+
+    def health(self) -> List[Dict[str, Any]]:
+        return [account.health() for account in self.accounts]
+
+
+_pool: Optional[CredentialPool] = None
+
+
+def configured_accounts() -> List[DJAccount]:
+    """The primary account from DJ_CLIENT_ID/DJ_USERNAME/DJ_PASSWORD followed by DJ_ACCOUNTS"""
+    primary = DJAccount(
+        name="primary",
+        client_id=settings.dj_client_id,
+        username=settings.dj_username,
+        password=settings.dj_password
+    )
+    return [primary] + list(settings.dj_accounts)
+
+
+def get_credential_pool() -> CredentialPool:
+    """Credential pool shared by every DowJonesAPIService in the process, with this worker's share of each budget"""
+    global _pool
+    if _pool is None:
+        accounts = [
+            account.copy(update={"request_budget": worker_share(account.request_budget)}) if account.request_budget else account
+            for account in configured_accounts()
+        ]
+        _pool = CredentialPool(
+            accounts,
+            budget=worker_share(settings.dj_account_request_budget),
+            window=settings.dj_account_budget_window,
+            cooldown=settings.dj_account_cooldown
+        )
+    return _pool
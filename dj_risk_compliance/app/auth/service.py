@@ -1,25 +1,29 @@
 # app/auth/service.py
 import httpx
-from app.config import settings
+from app.config import DJAccount, service_url, settings
 from typing import Optional, List, Dict, Any
 import logging
 import time
 import asyncio
 from app.api.models import (BulkScreeningRequest)
+from app.cassette import http_transport, scaled_delay
+from app.deadlines import fit_delay, request_timeout
+from app.metrics import AUTH_LATENCY, AUTH_REQUESTS, TOKEN_CACHE
 
 
 logger = logging.getLogger(__name__)
 
 class DJAuthService:
-    def __init__(self):
-        self.auth_url = f"https://{settings.dj_auth_url}"
-        self.client_id = settings.dj_client_id
-        self.username = settings.dj_username
-        self.password = settings.dj_password
+    def __init__(self, account: Optional[DJAccount] = None):
+        self.auth_url = service_url(settings.dj_auth_url)
+        self.client_id = account.client_id if account else settings.dj_client_id
+        self.username = account.username if account else settings.dj_username
+        self.password = account.password if account else settings.dj_password
         self.authn_token: Optional[str] = None
         self.refresh_token: Optional[str] = None
         self.jwt_bearer: Optional[str] = None
         self.token_expiry: Optional[int] = None
+        self._token_lock = asyncio.Lock()
 
     async def _make_auth_request(self, url: str, payload: dict) -> dict:
         """Generic method to make authentication requests"""
@@ -27,18 +31,25 @@ class DJAuthService:
             "Content-Type": "application/json",
             "Accept": "application/json"
         }
+        grant = payload.get("grant_type", "").rsplit(":", 1)[-1]
+        started = time.monotonic()
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with httpx.AsyncClient(timeout=request_timeout(30.0), transport=http_transport()) as client:
                 response = await client.post(url, json=payload, headers=headers)
                 response.raise_for_status()
+                AUTH_REQUESTS.inc(grant=grant, outcome="success")
                 return response.json()
         except httpx.HTTPStatusError as e:
+            AUTH_REQUESTS.inc(grant=grant, outcome=str(e.response.status_code))
             logger.error(f"Auth request failed: {e.response.status_code} - {e.response.text}")
             raise
         except Exception as e:
+            AUTH_REQUESTS.inc(grant=grant, outcome="error")
             logger.error(f"Unexpected error during auth request: {str(e)}")
             raise
+        finally:
+            AUTH_LATENCY.observe(time.monotonic() - started, grant=grant)
 
     async def get_authn_token(self) -> str:
         """Step 1: Retrieve AuthN Token"""
@@ -121,8 +132,23 @@ class DJAuthService:
         """Get a valid JWT token, refreshing if needed"""
         # If we have a token and it's not expired, return it
         if self.jwt_bearer and self.token_expiry and time.time() < self.token_expiry:
+            TOKEN_CACHE.inc(result="hit")
             return self.jwt_bearer
         
+        TOKEN_CACHE.inc(result="miss")
+        # Concurrent callers wait for a single login instead of each starting one
+        async with self._token_lock:
+            if self.jwt_bearer and self.token_expiry and time.time() < self.token_expiry:
+                return self.jwt_bearer
+            return await self._fetch_token()
+
+    def invalidate(self):
+        """Drop the current JWT so the next caller fetches a new one"""
+        self.jwt_bearer = None
+        self.token_expiry = None
+
+    async def _fetch_token(self) -> str:
+        """Fetch a new JWT token, falling back to refresh and then full reauthentication"""
         try:
             # Try to get a new token
             return await self.get_jwt_bearer()
@@ -175,7 +201,7 @@ class DJAuthService:
         
         for attempt in range(max_retries):
             try:
-                async with httpx.AsyncClient(timeout=30.0) as client:
+                async with httpx.AsyncClient(timeout=request_timeout(30.0), transport=http_transport()) as client:
                     response = await client.get(
                         f"{self.api_host}{endpoint}",
                         params=params,
@@ -185,7 +211,7 @@ class DJAuthService:
                     # If still processing, wait and retry
                     if response.status_code == 202:
                         if attempt < max_retries - 1:
-                            await asyncio.sleep(delay * (attempt + 1)) 
+                            await asyncio.sleep(fit_delay(scaled_delay(delay * (attempt + 1)))) 
                             continue
                     
                     response.raise_for_status()
@@ -193,7 +219,7 @@ class DJAuthService:
                     
             except httpx.HTTPStatusError as e:
                 if e.response.status_code == 202 and attempt < max_retries - 1:
-                    await asyncio.sleep(delay * (attempt + 1))
+                    await asyncio.sleep(fit_delay(scaled_delay(delay * (attempt + 1))))
                     continue
                 error_msg = f"API request failed: {e.response.status_code} - {e.response.text}"
                 logger.error(error_msg)
@@ -0,0 +1,241 @@
+# app/cassette.py
+import asyncio
+import atexit
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_VERSION = 1
+
+# Response headers that describe the original connection rather than the content
+SKIPPED_HEADERS = {"set-cookie", "connection", "keep-alive", "transfer-encoding"}
+
+# Credentials are replaced by this placeholder before an exchange is recorded
+REDACTED = "REDACTED"
+SECRET_HEADERS = {"authorization", "proxy-authorization"}
+# Token endpoint paths, and the fields of their JSON answers that hold tokens
+TOKEN_PATHS = ("/oauth2/v1/token",)
+TOKEN_FIELDS = {"id_token", "refresh_token", "access_token"}
+
+
+class CassetteMiss(Exception):
+    """Replay was asked for an exchange the cassette does not contain"""
+
+
+def encode_bytes(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+def decode_bytes(data: str) -> bytes:
+    return base64.b64decode(data)
+
+
+def digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class Cassette:
+    """Recorded upstream exchanges stored as gzip-compressed JSON lines.
+
+    Every entry has a ``kind`` ("http" or "sftp"), a ``key`` naming the
+    operation and its target, and the ``elapsed`` seconds it originally
+    took. Replay serves entries with the same key in recorded order, so
+    repeated polls of one URL get back the same sequence of answers.
+    Request bodies and credentials are never stored, only a digest of
+    the body used to tell concurrent requests to one URL apart. Token
+    endpoint answers are kept with their tokens replaced by a placeholder.
+    """
+
+    def __init__(self, path: str, mode: str, speed: float = 1.0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self.entries: List[Dict[str, Any]] = []
+        self._pending: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._lock = threading.Lock()
+        if mode == "replay":
+            self.load()
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            if header.get("version") != CASSETTE_VERSION:
+                raise ValueError(f"Unsupported cassette version {header.get('version')} in {self.path}")
+            for line in f:
+                entry = json.loads(line)
+                self.entries.append(entry)
+                self._pending[entry["key"]].append(entry)
+        logger.info(f"Loaded {len(self.entries)} exchanges from cassette {self.path}")
+
+    def save(self):
+        if not self.recording:
+            return
+        with self._lock:
+            entries = list(self.entries)
+        with gzip.open(self.path, "wt", encoding="utf-8") as f:
+            header = {"version": CASSETTE_VERSION, "created": datetime.now(timezone.utc).isoformat()}
+            f.write(json.dumps(header) + "\n")
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+        logger.info(f"Saved {len(entries)} exchanges to cassette {self.path}")
+
+    def record(self, kind: str, key: str, elapsed: float, **fields):
+        with self._lock:
+            self.entries.append({"kind": kind, "key": key, "elapsed": round(elapsed, 6), **fields})
+
+    def take(self, kind: str, key: str, body_digest: Optional[str] = None) -> Dict[str, Any]:
+        """Next recorded entry for a key, preferring one whose request body matches"""
+        with self._lock:
+            pending = self._pending.get(key)
+            if not pending:
+                raise CassetteMiss(f"No recorded {kind} exchange left for {key}")
+            if body_digest is not None:
+                for entry in pending:
+                    if entry.get("body_digest") == body_digest:
+                        pending.remove(entry)
+                        return entry
+            return pending.popleft()
+
+    def delay(self, entry: Dict[str, Any]) -> float:
+        """Seconds to wait before serving an entry; a speed of 0 serves instantly"""
+        return entry.get("elapsed", 0.0) / self.speed if self.speed > 0 else 0.0
+
+    def scaled(self, seconds: float) -> float:
+        return seconds / self.speed if self.speed > 0 else 0.0
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Sends requests upstream and records each exchange on the cassette"""
+
+    def __init__(self, cassette: Cassette, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.cassette = cassette
+        self._transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        started = time.perf_counter()
+        response = await self._transport.handle_async_request(request)
+        try:
+            # The raw bytes are kept, so a compressed response replays with its original encoding
+            content = b"".join([chunk async for chunk in response.aiter_raw()])
+        finally:
+            await response.aclose()
+        elapsed = time.perf_counter() - started
+        headers = [(name, value) for name, value in response.headers.multi_items() if name.lower() not in SKIPPED_HEADERS]
+
+        if is_token_request(request):
+            # The request body holds the account password, even its digest is left out
+            recorded_headers, recorded_content = redact_token_response(response.status_code, headers, content)
+            body_digest = None
+        else:
+            recorded_headers, recorded_content = headers, content
+            body_digest = digest(body)
+        self.cassette.record(
+            "http", http_key(request), elapsed,
+            body_digest=body_digest,
+            request_bytes=len(body),
+            status=response.status_code,
+            headers=[(name, REDACTED if name.lower() in SECRET_HEADERS else value) for name, value in recorded_headers],
+            content=encode_bytes(recorded_content)
+        )
+        return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Answers requests from the cassette after the recorded (scaled) latency"""
+
+    def __init__(self, cassette: Cassette):
+        self.cassette = cassette
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        entry = self.cassette.take("http", http_key(request), digest(body))
+        await asyncio.sleep(self.cassette.delay(entry))
+        return httpx.Response(entry["status"], headers=entry["headers"],
+                              content=decode_bytes(entry["content"]), request=request)
+
+
+def is_token_request(request: httpx.Request) -> bool:
+    return request.url.path.endswith(TOKEN_PATHS)
+
+
+def redact_token_response(status: int, headers: List, content: bytes):
+    """Headers and body of a token endpoint answer with every token replaced by REDACTED.
+
+    The body is stored decoded, so the content coding headers are dropped;
+    an answer that is not JSON is stored without a body.
+    """
+    decoded = httpx.Response(status, headers=headers, content=content).read()
+    kept = [(name, value) for name, value in headers if name.lower() not in ("content-encoding", "content-length")]
+    try:
+        data = json.loads(decoded)
+    except ValueError:
+        return kept, b""
+    if isinstance(data, dict):
+        data = {key: REDACTED if key in TOKEN_FIELDS else value for key, value in data.items()}
+    return kept, json.dumps(data).encode("utf-8")
+
+
+def http_key(request: httpx.Request) -> str:
+    """Method and path with query; the host is left out so a replay can point anywhere"""
+    return f"{request.method} {request.url.raw_path.decode('ascii')}"
+
+
+_cassette: Optional[Cassette] = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """The process cassette when DJ_CASSETTE_MODE is set; a recording is saved at exit"""
+    global _cassette
+    if not settings.cassette_mode:
+        return None
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = Cassette(settings.cassette_path, settings.cassette_mode, settings.cassette_speed)
+            if _cassette.recording:
+                atexit.register(_cassette.save)
+            logger.info(f"Cassette {settings.cassette_path} opened in {settings.cassette_mode} mode")
+    return _cassette
+
+
+def http_transport() -> Optional[httpx.AsyncBaseTransport]:
+    """Transport for httpx clients talking to Dow Jones; None means the default network transport"""
+    cassette = get_cassette()
+    if cassette is None:
+        return None
+    return RecordingTransport(cassette) if cassette.recording else ReplayTransport(cassette)
+
+
+def scaled_delay(seconds: float) -> float:
+    """A client-side wait, such as a poll backoff, shortened by the replay speed"""
+    cassette = get_cassette()
+    if cassette is None or not cassette.replaying:
+        return seconds
+    return cassette.scaled(seconds)
@@ -1,5 +1,12 @@
-from pydantic import BaseSettings, Field
-from typing import Optional
+from pydantic import BaseModel, BaseSettings, Field
+from typing import Dict, List, Optional
+
+class DJAccount(BaseModel):
+    name: str
+    client_id: str
+    username: str
+    password: str
+    request_budget: Optional[int] = None
 
 class Settings(BaseSettings):
     dj_client_id: str = Field(..., env="DJ_CLIENT_ID")
@@ -7,6 +14,28 @@ class Settings(BaseSettings):
     dj_password: str = Field(..., env="DJ_PASSWORD")
     dj_auth_url: str = Field("auth.accounts.dowjones.com", env="DJ_AUTH_URL")
     dj_api_host: str = Field("api.dowjones.com", env="DJ_API_HOST")
+    dj_min_request_interval: float = Field(0.1, env="DJ_MIN_REQUEST_INTERVAL")
+    dj_max_concurrent_requests: int = Field(8, env="DJ_MAX_CONCURRENT_REQUESTS")
+    dj_interactive_reserved_slots: int = Field(2, env="DJ_INTERACTIVE_RESERVED_SLOTS")
+    dj_priority_weights: Dict[str, float] = Field(
+        {"interactive": 6.0, "bulk": 3.0, "polling": 1.0},
+        env="DJ_PRIORITY_WEIGHTS"
+    )
+    # Extra service accounts as a JSON list of {"name", "client_id", "username", "password"}
+    dj_accounts: List[DJAccount] = Field([], env="DJ_ACCOUNTS")
+    dj_account_request_budget: int = Field(600, env="DJ_ACCOUNT_REQUEST_BUDGET")
+    dj_account_budget_window: float = Field(60.0, env="DJ_ACCOUNT_BUDGET_WINDOW")
+    dj_account_cooldown: float = Field(60.0, env="DJ_ACCOUNT_COOLDOWN")
+    # Gzip request bodies of at least this many bytes, once the upstream is found to accept them
+    dj_request_compression: bool = Field(True, env="DJ_REQUEST_COMPRESSION")
+    dj_request_compression_min_size: int = Field(32768, env="DJ_REQUEST_COMPRESSION_MIN_SIZE")
+    # Hedged searches and profile reads: a second request once the first passes the endpoint's
+    # latency percentile, for at most dj_hedge_budget of requests
+    dj_hedging_enabled: bool = Field(False, env="DJ_HEDGING_ENABLED")
+    dj_hedge_percentile: float = Field(95.0, env="DJ_HEDGE_PERCENTILE")
+    dj_hedge_budget: float = Field(0.05, env="DJ_HEDGE_BUDGET")
+    dj_hedge_min_delay: float = Field(0.05, env="DJ_HEDGE_MIN_DELAY")
+    dj_hedge_min_samples: int = Field(20, env="DJ_HEDGE_MIN_SAMPLES")
 
     sftp_host: str = Field(..., env="SFTP_HOST")
     sftp_port: int = Field(22, env="SFTP_PORT")
@@ -26,10 +55,56 @@ class Settings(BaseSettings):
     )
     content_type: str = Field("application/json", env="CONTENT_TYPE")
 
+    # Per-request timing: Server-Timing headers, and sampled spans for a "console" or file exporter
+    server_timing_enabled: bool = Field(True, env="SERVER_TIMING_ENABLED")
+    # Responses at least this large are compressed when the client accepts zstd, br or gzip
+    response_compression_enabled: bool = Field(True, env="RESPONSE_COMPRESSION_ENABLED")
+    response_compression_min_size: int = Field(1024, env="RESPONSE_COMPRESSION_MIN_SIZE")
+    trace_exporter: Optional[str] = Field(None, env="TRACE_EXPORTER")
+    trace_sample_rate: float = Field(0.01, env="TRACE_SAMPLE_RATE")
+
+    # API request deadlines in seconds: from the client's header (capped), else the longest matching path prefix
+    request_deadline_header: str = Field("X-Request-Timeout", env="REQUEST_DEADLINE_HEADER")
+    request_deadline_default: float = Field(60.0, env="REQUEST_DEADLINE_DEFAULT")
+    request_deadline_max: float = Field(300.0, env="REQUEST_DEADLINE_MAX")
+    request_deadlines: Dict[str, float] = Field(
+        {"/api/v1/search/": 15.0, "/api/v1/profiles/": 15.0, "/api/v1/screening/bulk-associations": 120.0},
+        env="REQUEST_DEADLINES"
+    )
+
+    # Record upstream HTTP and SFTP exchanges to a cassette, or replay them offline ("record" or "replay");
+    # a replay speed of 2 halves recorded latencies and poll waits, 0 removes them
+    cassette_mode: Optional[str] = Field(None, env="DJ_CASSETTE_MODE")
+    cassette_path: str = Field("dj_cassette.jsonl.gz", env="DJ_CASSETTE_PATH")
+    cassette_speed: float = Field(1.0, env="DJ_CASSETTE_SPEED")
+
+    match_store_enabled: bool = Field(True, env="MATCH_STORE_ENABLED")
+    match_store_path: str = Field("match_store.db", env="MATCH_STORE_PATH")
+
+    # Worker processes serving the API, set by serve.py; the Dow Jones limits above are service-wide
+    # and each worker enforces its share. Workers publish their metrics to metrics_dir for /metrics.
+    workers: int = Field(1, env="DJ_WORKERS")
+    metrics_dir: Optional[str] = Field(None, env="DJ_METRICS_DIR")
+    metrics_publish_interval: float = Field(5.0, env="DJ_METRICS_PUBLISH_INTERVAL")
+
     class Config:
         env_file = ".env"
         env_file_encoding = 'utf-8'
 
         secrets_dir = '/run/secrets'
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
+
+def worker_share(total: int) -> int:
+    """This worker's part of a service-wide limit, rounded down so the workers together stay within it"""
+    return max(0, total) // max(1, settings.workers)
+
+def max_workers() -> int:
+    """Most workers the Dow Jones concurrency and request budgets can be split across, each keeping a share"""
+    limits = [settings.dj_max_concurrent_requests, settings.dj_account_request_budget]
+    limits += [account.request_budget for account in settings.dj_accounts if account.request_budget]
+    return max(1, min(limits))
+
+def service_url(host: str) -> str:
+    """Base URL of a configured host; a host given with a scheme, like a local stand-in, is used as is"""
+    return host if "://" in host else f"https://{host}"
\ No newline at end of file
@@ -0,0 +1,180 @@
+# app/deadlines.py
+import asyncio
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Dict, Optional
+
+from app.config import settings
+from app.metrics import REQUESTS_ABANDONED
+
+logger = logging.getLogger(__name__)
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+# Upstream calls get this much longer than the request itself, so when both run out the
+# request is cut off by the middleware with a 504 rather than failing inside the endpoint
+GRACE = 0.5
+
+
+class DeadlineExceeded(Exception):
+    """The request deadline passed before the operation could finish"""
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current request's deadline; None when there is no deadline"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+@contextmanager
+def deadline_scope(seconds: float):
+    """Run a block under a deadline, never later than one already in effect"""
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def request_timeout(default: float) -> float:
+    """Upstream timeout capped to the time the request has left"""
+    left = remaining()
+    if left is None:
+        return default
+    return max(0.001, min(default, left + GRACE))
+
+
+def fit_delay(delay: float) -> float:
+    """A backoff shortened so at least half the remaining budget is left for the next attempt"""
+    left = remaining()
+    if left is None:
+        return delay
+    if left <= 0:
+        raise DeadlineExceeded("Request deadline passed while waiting to retry")
+    return min(delay, left / 2)
+
+
+async def within_deadline(awaitable: Awaitable[Any]) -> Any:
+    """Await an operation, cancelling it if it outlives the request deadline"""
+    left = remaining()
+    if left is None:
+        return await awaitable
+    if left + GRACE <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded("Request deadline passed before the upstream call")
+    try:
+        return await asyncio.wait_for(awaitable, left + GRACE)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded("Request deadline passed during the upstream call")
+
+
+def route_deadline(path: str, header: Optional[str]) -> float:
+    """Deadline in seconds from the client's header, else the longest matching route default"""
+    if header:
+        try:
+            seconds = float(header)
+            if seconds > 0:
+                return min(seconds, settings.request_deadline_max)
+        except ValueError:
+            pass
+    matches = [prefix for prefix in settings.request_deadlines if path.startswith(prefix)]
+    if matches:
+        return settings.request_deadlines[max(matches, key=len)]
+    return settings.request_deadline_default
+
+
+async def _cancel(task: asyncio.Task):
+    task.cancel()
+    try:
+        await task
+    except BaseException:
+        pass
+
+
+class DeadlineMiddleware:
+    """ASGI middleware that bounds each HTTP request by a deadline and stops it when the caller leaves.
+
+    The deadline is visible to everything the request calls through
+    ``remaining()``. When it passes the handler is cancelled and a 504 is
+    sent if no response has started; when the client disconnects first the
+    handler is cancelled, so polling and upstream calls stop with it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        header = headers.get(settings.request_deadline_header.lower().encode("latin-1"))
+        seconds = route_deadline(scope["path"], header.decode("latin-1") if header else None)
+        deadline = time.monotonic() + seconds
+
+        messages: asyncio.Queue = asyncio.Queue()
+        response = {"started": False, "complete": False}
+
+        async def read_client():
+            # Reads ahead of the app so a disconnect is noticed while the handler is busy
+            while True:
+                message = await receive()
+                await messages.put(message)
+                if message["type"] == "http.disconnect":
+                    return
+
+        async def tracked_send(message):
+            if message["type"] == "http.response.start":
+                response["started"] = True
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                response["complete"] = True
+            await send(message)
+
+        token = _deadline.set(deadline)
+        try:
+            handler = asyncio.ensure_future(self.app(scope, messages.get, tracked_send))
+            reader = asyncio.ensure_future(read_client())
+        finally:
+            _deadline.reset(token)
+
+        try:
+            while True:
+                waiting = {handler} if reader.done() else {handler, reader}
+                await asyncio.wait(waiting, timeout=max(0.0, deadline - time.monotonic()),
+                                   return_when=asyncio.FIRST_COMPLETED)
+                if handler.done() or response["complete"]:
+                    # Once the response is out, background work runs to completion
+                    await handler
+                    return
+                if reader.done():
+                    REQUESTS_ABANDONED.inc(reason="disconnect")
+                    logger.info(f"Client disconnected, cancelling {scope['method']} {scope['path']}")
+                    await _cancel(handler)
+                    return
+                if time.monotonic() >= deadline:
+                    REQUESTS_ABANDONED.inc(reason="deadline")
+                    logger.warning(f"{scope['method']} {scope['path']} exceeded its {seconds:g}s deadline")
+                    await _cancel(handler)
+                    if not response["started"]:
+                        await self._timeout_response(send)
+                    return
+        finally:
+            reader.cancel()
+            if not handler.done():
+                handler.cancel()
+
+    async def _timeout_response(self, send):
+        body = json.dumps({"detail": "Request deadline exceeded"}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 504,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode("latin-1"))]
+        })
+        await send({"type": "http.response.body", "body": body})
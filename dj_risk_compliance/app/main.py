@@ -1,18 +1,95 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
 from app.api.endpoints import router as api_router
-from app.config import settings
+from app.config import max_workers, settings
+from app.deadlines import DeadlineMiddleware
+from app.metrics import CONTENT_TYPE, REGISTRY
+from app.responses import CompressionMiddleware, FastJSONResponse
+from app.services.http_client import close_http_client
+from app.tracing import finish_request, start_request
+from app.warmup import keep_warming, warm_state
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="Dow Jones Risk & Compliance API",
     description="FastAPI interface for Dow Jones Risk & Compliance Search API",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
 app.include_router(api_router, prefix="/api/v1")
 
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+    if not settings.server_timing_enabled:
+        return await call_next(request)
+    timing, token = start_request(f"{request.method} {request.url.path}", request.headers.get("traceparent"))
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        response.headers["Server-Timing"] = timing.server_timing()
+        return response
+    finally:
+        finish_request(timing, token, {"http.method": request.method, "http.target": request.url.path, "http.status_code": status_code})
+
+if settings.response_compression_enabled:
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.response_compression_min_size)
+
+# Added last so it wraps the timing middleware and its deadline covers the whole request
+app.add_middleware(DeadlineMiddleware)
+
+async def publish_metrics(directory: str):
+    """Share this worker's metrics with the others until shutdown, so any of them can serve /metrics"""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            await loop.run_in_executor(None, REGISTRY.publish, directory)
+        except OSError as e:
+            logger.error(f"Failed to publish metrics to {directory}: {str(e)}")
+        await asyncio.sleep(settings.metrics_publish_interval)
+
+@app.on_event("startup")
+async def start_warm_up():
+    # A worker with no share of a limit would have to exceed it to send anything
+    if settings.workers > max_workers():
+        raise RuntimeError(f"DJ_WORKERS={settings.workers} is more workers than the Dow Jones limits can be "
+                           f"split across ({max_workers()}); lower it or raise the limits")
+    # Warm-up runs in the background so the worker can answer /ready while it is still cold
+    app.state.warm_up = asyncio.create_task(keep_warming(app))
+    app.state.publish_metrics = asyncio.create_task(publish_metrics(settings.metrics_dir)) if settings.metrics_dir else None
+
+@app.on_event("shutdown")
+async def shut_down():
+    warm_state.shutting_down = True
+    app.state.warm_up.cancel()
+    if app.state.publish_metrics is not None:
+        app.state.publish_metrics.cancel()
+        REGISTRY.unpublish(settings.metrics_dir)
+    await close_http_client()
+
 @app.get("/")
 async def root():
     return {
         "message": "Dow Jones Risk & Compliance API Service",
         "status": "running"
-    }
\ No newline at end of file
+    }
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    # Under serve.py every worker's metrics are rendered, labelled by worker
+    if settings.metrics_dir:
+        content = await asyncio.get_running_loop().run_in_executor(None, REGISTRY.render_workers, settings.metrics_dir)
+    else:
+        content = REGISTRY.render()
+    # Set as a header: Starlette would append a second charset to a text/ media_type
+    return Response(content=content, headers={"Content-Type": CONTENT_TYPE})
+
+@app.get("/ready", include_in_schema=False)
+async def ready():
+    """Readiness for the load balancer: 503 until this worker has finished warming up"""
+    return JSONResponse(warm_state.snapshot(), status_code=200 if warm_state.ready else 503)
\ No newline at end of file
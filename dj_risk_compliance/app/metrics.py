@@ -0,0 +1,273 @@
+# app/metrics.py
+import json
+import math
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{_escape(extra[1])}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """Base of the in-process metrics; samples are keyed by their label values"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: Optional["Registry"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._samples: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with self._lock:
+            return [(key, list(value) if isinstance(value, list) else value) for key, value in self._samples.items()]
+
+    def render(self, sources: Optional[List[Tuple[Optional[str], List]]] = None) -> List[str]:
+        """Exposition lines; ``sources`` are (worker, samples) pairs, rendered with a worker label"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for worker, samples in sources or [(None, self.samples())]:
+            names = self.labelnames + (("worker",) if worker else ())
+            for key, value in samples:
+                lines.extend(self._sample_lines(names, tuple(key) + ((worker,) if worker else ()), value))
+        return lines
+
+    def _sample_lines(self, names: Sequence[str], values: Sequence[str], value) -> List[str]:
+        return [f"{self.name}{_format_labels(names, values)} {_format_value(value)}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._samples[key] = self._samples.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._samples[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._samples[key] = self._samples.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Optional["Registry"] = None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            sample = self._samples.get(key)
+            if sample is None:
+                # Per-bucket counts, then sum and count
+                sample = self._samples[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    sample[i] += 1
+                    break
+            sample[-2] += value
+            sample[-1] += 1
+
+    def _sample_lines(self, names: Sequence[str], values: Sequence[str], sample) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, sample):
+            cumulative += count
+            labels = _format_labels(names, values, ("le", _format_value(bound)))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(names, values, ("le", "+Inf"))
+        lines.append(f"{self.name}_bucket{labels} {sample[-1]}")
+        labels = _format_labels(names, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(sample[-2])}")
+        lines.append(f"{self.name}_count{labels} {sample[-1]}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def publish(self, directory: str):
+        """Write this process's samples to ``directory``, where render_workers reads them"""
+        snapshot = {metric.name: [[list(key), value] for key, value in metric.samples()] for metric in self._metrics}
+        path = os.path.join(directory, f"{os.getpid()}.json")
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        os.replace(temp_path, path)
+
+    def unpublish(self, directory: str):
+        try:
+            os.remove(os.path.join(directory, f"{os.getpid()}.json"))
+        except FileNotFoundError:
+            pass
+
+    def render_workers(self, directory: str) -> str:
+        """Metrics of every worker publishing to ``directory``, each sample labelled with its worker's pid.
+
+        This process's samples are read live, the others' as last published.
+        Files left by workers that are no longer running are removed.
+        """
+        own = str(os.getpid())
+        snapshots = {}
+        for filename in sorted(os.listdir(directory)):
+            worker, extension = os.path.splitext(filename)
+            if extension != ".json" or worker == own or not worker.isdigit():
+                continue
+            if not _running(int(worker)):
+                self._remove(os.path.join(directory, filename))
+                continue
+            try:
+                with open(os.path.join(directory, filename), encoding="utf-8") as f:
+                    snapshots[worker] = json.load(f)
+            except (OSError, ValueError):
+                continue
+
+        lines = []
+        for metric in self._metrics:
+            sources = [(own, metric.samples())]
+            sources += [(worker, snapshot.get(metric.name, [])) for worker, snapshot in snapshots.items()]
+            lines.extend(metric.render(sources))
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def write_textfile(self, path: str):
+        """Write the metrics for node_exporter's textfile collector, replacing the file atomically"""
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(temp_path, path)
+
+    def push(self, gateway_url: str, job: str, timeout: float = 10.0):
+        """Replace this job's metrics on a Prometheus Pushgateway"""
+        response = httpx.put(
+            f"{gateway_url.rstrip('/')}/metrics/job/{job}",
+            content=self.render().encode("utf-8"),
+            headers={"Content-Type": CONTENT_TYPE},
+            timeout=timeout
+        )
+        response.raise_for_status()
+
+
+def _running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+REGISTRY = Registry()
+
+# Dow Jones API
+UPSTREAM_LATENCY = Histogram(
+    "dj_upstream_request_duration_seconds",
+    "Dow Jones API round trip time by endpoint and status",
+    ["method", "endpoint", "status"]
+)
+UPSTREAM_REQUEST_BYTES = Counter(
+    "dj_upstream_request_bytes_total", "Request body bytes sent to the Dow Jones API", ["endpoint"]
+)
+UPSTREAM_RESPONSE_BYTES = Counter(
+    "dj_upstream_response_bytes_total", "Response body bytes received from the Dow Jones API", ["endpoint"]
+)
+RETRIES = Counter("dj_retries_total", "Retried operations", ["operation"])
+POLLS = Counter("dj_polls_total", "Status polls while waiting on Dow Jones processing", ["operation"])
+HEDGES = Counter("dj_hedged_requests_total", "Slow reads that were hedged or would have been, by outcome", ["endpoint", "outcome"])
+
+# API requests
+REQUESTS_ABANDONED = Counter(
+    "dj_api_requests_abandoned_total", "API requests cancelled before completion", ["reason"]
+)
+API_RESPONSE_BYTES = Counter(
+    "dj_api_response_bytes_total", "API response body bytes sent to clients that accept compression", ["encoding"]
+)
+
+# Authentication
+AUTH_REQUESTS = Counter("dj_auth_requests_total", "Token endpoint calls by grant type and outcome", ["grant", "outcome"])
+AUTH_LATENCY = Histogram("dj_auth_request_duration_seconds", "Token endpoint round trip time", ["grant"])
+TOKEN_CACHE = Counter("dj_auth_token_cache_total", "Valid token lookups served from cache or by fetching", ["result"])
+ACCOUNT_COOLDOWNS = Counter("dj_account_cooldowns_total", "Service accounts taken out of rotation", ["account", "reason"])
+
+# Scheduling
+SCHEDULER_QUEUE_DEPTH = Gauge("dj_scheduler_queue_depth", "Requests waiting for a slot by priority class", ["priority"])
+SCHEDULER_IN_FLIGHT = Gauge("dj_scheduler_in_flight", "Requests holding a scheduler slot")
+
+# Cron pipeline
+CRON_STAGE_DURATION = Histogram(
+    "dj_cron_stage_duration_seconds",
+    "Time spent in each cron pipeline stage",
+    ["stage"],
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+)
+CRON_RUNS = Counter("dj_cron_files_total", "Input files handled by the cron by final status", ["status"])
+CRON_MATCHES = Counter("dj_cron_matches_total", "Match rows written to output files")
+FAN_OUT_UNRESOLVED = Counter(
+    "dj_cron_fan_out_unresolved_matches_total",
+    "Matches written once because their association could not be mapped back to its input rows"
+)
+SFTP_BYTES = Counter("dj_sftp_bytes_total", "Bytes moved over SFTP", ["direction", "server"])
+DOWNLOAD_CACHE = Counter("dj_cron_download_cache_total", "Input downloads skipped for an up-to-date local copy", ["result"])
+PIPELINE_QUEUE_DEPTH = Gauge("dj_cron_pipeline_queue_depth", "Items waiting between overlapped cron stages", ["queue"])
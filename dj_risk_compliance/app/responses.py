@@ -0,0 +1,200 @@
+# app/responses.py
+import asyncio
+import gzip
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.metrics import API_RESPONSE_BYTES
+from app.tracing import phase
+
+# Optional accelerators: orjson for encoding, brotli and zstandard for more compression choices
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/vnd.")
+
+# Bodies larger than this are compressed on a worker thread instead of the event loop
+OFFLOAD_SIZE = 256 * 1024
+
+# Streamed bodies are collected up to this size to be compressed whole; larger streams pass through
+MAX_BUFFER_SIZE = 32 * 1024 * 1024
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON; types JSON does not know go through FastAPI's encoder"""
+    if orjson is not None:
+        return orjson.dumps(content, default=jsonable_encoder, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=jsonable_encoder
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson when it is installed"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def json_response(content: Any, status_code: int = 200) -> FastJSONResponse:
+    """Response for plain JSON data, such as Dow Jones payloads, that skips jsonable_encoder.
+
+    FastAPI passes a returned Response through untouched, so the payload is
+    walked once by the encoder instead of twice.
+    """
+    with phase("encode"):
+        return FastJSONResponse(content, status_code=status_code)
+
+
+def _gzip(body: bytes) -> bytes:
+    return gzip.compress(body, compresslevel=6)
+
+
+def _brotli(body: bytes) -> bytes:
+    return brotli.compress(body, quality=4)
+
+
+def _zstd(body: bytes) -> bytes:
+    return zstandard.ZstdCompressor(level=3).compress(body)
+
+
+def available_encodings() -> List[Tuple[str, Callable[[bytes], bytes]]]:
+    """Supported content codings in order of preference"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append(("zstd", _zstd))
+    if brotli is not None:
+        encodings.append(("br", _brotli))
+    encodings.append(("gzip", _gzip))
+    return encodings
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Content codings and their q-values from an Accept-Encoding header"""
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    return accepted
+
+
+def negotiate(header: Optional[str]) -> Optional[Tuple[str, Callable[[bytes], bytes]]]:
+    """Most preferred coding the client accepts, or None for identity"""
+    if not header:
+        return None
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    for name, compress in available_encodings():
+        if accepted.get(name, wildcard) > 0:
+            return name, compress
+    return None
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing complete responses above a size threshold.
+
+    The coding is negotiated from Accept-Encoding among zstd, br and gzip,
+    depending on which libraries are installed. A body sent in several
+    messages, as every response is once it passes through an
+    ``@app.middleware("http")`` function, is collected and compressed whole
+    up to ``max_buffer_size``; longer streams, already encoded and non-text
+    responses pass through unchanged.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, max_buffer_size: int = MAX_BUFFER_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.max_buffer_size = max_buffer_size
+
+    async def __call__(self, scope: Dict[str, Any], receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        encoding = negotiate(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Dict[str, Any]] = None
+        passthrough = False
+        chunks: List[bytes] = []
+        buffered = 0
+
+        async def compressing_send(message):
+            nonlocal start, passthrough, buffered
+            if message["type"] == "http.response.start":
+                start = message
+                response_headers = dict(start.get("headers") or [])
+                content_type = response_headers.get(b"content-type", b"").decode("latin-1")
+                if b"content-encoding" in response_headers or not content_type.startswith(COMPRESSIBLE_TYPES):
+                    passthrough = True
+                    await send(start)
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                if message["type"] == "http.response.body":
+                    API_RESPONSE_BYTES.inc(len(message.get("body", b"")), encoding="identity")
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            buffered += len(chunks[-1])
+            more_body = message.get("more_body", False)
+            if more_body and buffered <= self.max_buffer_size:
+                return
+
+            body = b"".join(chunks)
+            chunks.clear()
+            if more_body or len(body) < self.minimum_size:
+                # Too long to hold, or too short to be worth it: send what was collected as is
+                passthrough = True
+                API_RESPONSE_BYTES.inc(len(body), encoding="identity")
+                await send(start)
+                await send({"type": "http.response.body", "body": body, "more_body": more_body})
+                return
+
+            response_headers = dict(start.get("headers") or [])
+            name, compress = encoding
+            if len(body) > OFFLOAD_SIZE:
+                compressed = await asyncio.get_running_loop().run_in_executor(None, compress, body)
+            else:
+                compressed = compress(body)
+            API_RESPONSE_BYTES.inc(len(compressed), encoding=name)
+
+            kept = [(key, value) for key, value in start.get("headers") or []
+                    if key.lower() not in (b"content-length", b"vary")]
+            vary = response_headers.get(b"vary")
+            kept += [
+                (b"content-encoding", name.encode("latin-1")),
+                (b"content-length", str(len(compressed)).encode("latin-1")),
+                (b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"),
+            ]
+            await send({**start, "headers": kept})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, compressing_send)
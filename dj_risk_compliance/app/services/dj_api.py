@@ -1,65 +1,214 @@
 # app/services/dj_api.py
 import httpx
+import re
 import time
 from typing import Optional, Dict, Any, List
-from app.config import settings
-from app.auth.service import DJAuthService
+from app.config import service_url, settings
+from app.auth.pool import AccountState, get_credential_pool
+from app.cassette import scaled_delay
+from app.deadlines import DeadlineExceeded, fit_delay, request_timeout, within_deadline
 import asyncio
 from fastapi import HTTPException
 import logging
-from app.api.models import (BulkScreeningRequest)
+from app.api.models import (BulkScreeningRequest, MatchFilters)
+from app.services.hedging import get_hedging_policy
+from app.services.http_client import get_http_client
+from app.services.request_compression import get_request_compression
+from app.services.scheduler import BULK, INTERACTIVE, POLLING, get_request_scheduler
+from app.tracing import current_timing, phase, upstream_trace
+from app.metrics import (POLLS, RETRIES, UPSTREAM_LATENCY, UPSTREAM_REQUEST_BYTES,
+                         UPSTREAM_RESPONSE_BYTES)
 
 
 logger = logging.getLogger(__name__)
 
+# Ids in endpoint paths are replaced so metrics are labelled per operation, not per case
+ENDPOINT_LABELS = [
+    (re.compile(r"/bulk-associations/[^/]+"), "/bulk-associations/{transaction_id}"),
+    (re.compile(r"^/risk-entity-screening-cases/(?!bulk-associations)[^/]+"), "/risk-entity-screening-cases/{case_id}"),
+    (re.compile(r"^/riskentities/profiles/[^/]+"), "/riskentities/profiles/{profile_id}"),
+]
+
+def endpoint_label(endpoint: str) -> str:
+    path = endpoint.split("?", 1)[0]
+    for pattern, replacement in ENDPOINT_LABELS:
+        path = pattern.sub(replacement, path)
+    return path
+
+def _created_case_id(result: Any) -> Optional[str]:
+    """Case id carried by a case creation response, if any"""
+    data = result.get("data") if isinstance(result, dict) else None
+    if isinstance(data, dict):
+        return (data.get("attributes") or {}).get("case_id")
+    return None
+
 class DowJonesAPIService:
-    def __init__(self):
-        self.api_host = f"https://{settings.dj_api_host}"
-        self.auth_service = DJAuthService()
+    def __init__(self, priority: Optional[str] = None):
+        self.api_host = service_url(settings.dj_api_host)
+        self.credentials = get_credential_pool()
         self.content_type = settings.content_type
-        self.last_request_time = 0
-        self.min_request_interval = 0.1
+        # Overrides the per-method request class, e.g. for case reads made on behalf of an analyst
+        self.priority = priority
+        self.scheduler = get_request_scheduler()
+        self.hedging = get_hedging_policy()
+        self.compression = get_request_compression()
+
+    async def _send(
+        self,
+        method: str,
+        endpoint: str,
+        priority: str,
+        headers: Dict[str, str],
+        params: Optional[Dict[str, str]] = None,
+        payload: Optional[Dict] = None
+    ) -> Dict[str, Any]:
+        """Send a request once the scheduler releases a slot for its class; errors are logged and re-raised.
+
+        The request is signed with the token of the pooled account picked for
+        it, and the outcome is reported back to the pool. Inside an API request
+        the whole call, queueing included, is bounded by the request deadline.
+        """
+        return await within_deadline(self._dispatch(method, endpoint, priority, headers, params, payload))
+
+    async def _dispatch(
+        self,
+        method: str,
+        endpoint: str,
+        priority: str,
+        headers: Dict[str, str],
+        params: Optional[Dict[str, str]] = None,
+        payload: Optional[Dict] = None
+    ) -> Dict[str, Any]:
+        queued = time.perf_counter()
+        async with self.scheduler.slot(self.priority or priority):
+            tried = []
+            while True:
+                account = await self.credentials.acquire(endpoint, exclude=tried)
+                if not tried:
+                    timing = current_timing()
+                    if timing is not None:
+                        timing.add("queue", time.perf_counter() - queued)
+                try:
+                    return await self._send_as(account, method, endpoint, headers, params, payload)
+                except httpx.HTTPStatusError as e:
+                    tried.append(account.name)
+                    # A case created by another process may belong to another account
+                    if not self.credentials.try_other_account(endpoint, e.response.status_code, tried):
+                        raise
+                    logger.info(f"Case not visible to account {account.name} ({e.response.status_code}), trying another account")
+                    RETRIES.inc(operation="case_account")
 
+    async def _send_as(
+        self,
+        account: AccountState,
+        method: str,
+        endpoint: str,
+        headers: Dict[str, str],
+        params: Optional[Dict[str, str]],
+        payload: Optional[Dict]
+    ) -> Dict[str, Any]:
+        """Send one request signed by ``account`` and report its outcome to the pool"""
+        try:
+            with phase("auth", account=account.name):
+                token = await account.auth_service.get_valid_token()
+            headers = {**headers, "Authorization": token}
+        except Exception as e:
+            self.credentials.auth_failed(account, e)
+            logger.error(f"Authentication failed for account {account.name}: {str(e)}")
+            raise
+
+        label = endpoint_label(endpoint)
+        status_code, retry_after = None, None
+        started = time.monotonic()
+        try:
+            client = get_http_client()
+
+            def build(content: Optional[bytes], encoding: Optional[str] = None) -> httpx.Request:
+                request = client.build_request(
+                    method,
+                    f"{self.api_host}{endpoint}",
+                    params=params,
+                    timeout=request_timeout(30.0),
+                    content=content,
+                    headers={**headers, "Content-Encoding": encoding} if encoding else headers
+                )
+                trace = upstream_trace()
+                if trace is not None:
+                    request.extensions["trace"] = trace
+                return request
+
+            with phase("dj_request", record=False, method=method, endpoint=label):
+                response = await self.compression.send(
+                    payload, lambda content, encoding: client.send(build(content, encoding))
+                )
+            status_code, retry_after = response.status_code, response.headers.get("Retry-After")
+            # Bytes on the wire: compressed request bodies, and responses before httpx decodes them
+            UPSTREAM_REQUEST_BYTES.inc(len(response.request.content), endpoint=label)
+            UPSTREAM_RESPONSE_BYTES.inc(response.num_bytes_downloaded, endpoint=label)
+            response.raise_for_status()
+            with phase("decode"):
+                result = response.json()
+        except httpx.HTTPStatusError as e:
+            logger.error(f"API request failed: {e.response.status_code} - {e.response.text}")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error during API request: {str(e)}")
+            raise
+        finally:
+            UPSTREAM_LATENCY.observe(
+                time.monotonic() - started, method=method, endpoint=label, status=status_code or "error"
+            )
+            self.credentials.release(account, status_code, retry_after)
+
+        # Later requests on a case must use the account that created it, or the one found to see it
+        case_id = _created_case_id(result)
+        if case_id:
+            self.credentials.bind_case(case_id, account.name)
+        else:
+            self.credentials.case_found(endpoint, account.name)
+        return result
 
     async def _get_headers(self) -> Dict[str, str]:
-        """Get standard headers for all API requests"""
-        token = await self.auth_service.get_valid_token()
+        """Get standard headers for all API requests; the token is added when the request is sent"""
         return {
-            "Authorization": token,
             "Accept": self.content_type,
             "Content-Type": self.content_type
         }
 
-    async def _make_api_request(self, method: str, endpoint: str, payload: Optional[Dict] = None) -> Dict[str, Any]:
-        """Generic method to make API requests"""
-        url = f"{self.api_host}{endpoint}"
-        headers = await self._get_headers()
+    async def _make_api_request(
+        self,
+        method: str,
+        endpoint: str,
+        payload: Optional[Dict] = None,
+        priority: str = INTERACTIVE,
+        hedge: bool = False,
+        headers: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        """Generic method to make API requests; ``hedge`` is only for idempotent reads.
+
+        ``headers`` override the standard headers, e.g. for endpoints with their own media type.
+        """
+        headers = {**await self._get_headers(), **(headers or {})}
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                if method == "GET":
-                    response = await client.get(url, headers=headers)
-                elif method == "POST":
-                    response = await client.post(url, json=payload, headers=headers)
-                else:
-                    raise ValueError(f"Unsupported HTTP method: {method}")
-                
-                response.raise_for_status()
-                return response.json()
+            if method not in ("GET", "POST"):
+                raise ValueError(f"Unsupported HTTP method: {method}")
+            if hedge and self.hedging is not None:
+                return await self.hedging.run(
+                    endpoint_label(endpoint),
+                    lambda: self._send(method, endpoint, priority, headers, payload=payload)
+                )
+            return await self._send(method, endpoint, priority, headers, payload=payload)
                 
         except httpx.HTTPStatusError as e:
-            error_msg = f"API request failed: {e.response.status_code} - {e.response.text}"
-            logger.error(error_msg)
             raise HTTPException(
                 status_code=e.response.status_code,
-                detail=error_msg
+                detail=f"API request failed: {e.response.status_code} - {e.response.text}"
             )
         except Exception as e:
-            error_msg = f"Unexpected error during API request: {str(e)}"
-            logger.error(error_msg)
             raise HTTPException(
                 status_code=500,
-                detail=error_msg
+                detail=f"Unexpected error during API request: {str(e)}"
             )
 
     async def name_search(
@@ -106,18 +255,19 @@ class DowJonesAPIService:
             }
         }
         
-        return await self._make_api_request("POST", "/riskentities/search", payload)
+        return await self._make_api_request("POST", "/riskentities/search", payload, INTERACTIVE, hedge=True)
 
     async def get_risk_profile(self, profile_id: str) -> Dict[str, Any]:
         """Retrieve a full risk profile by ID"""
         headers = {
-            "Authorization": await self.auth_service.get_valid_token(),
-            "Accept": self.profiles_api_version,
-            "Content-Type": self.profiles_api_version,
+            "Accept": settings.profiles_api_version,
+            "Content-Type": settings.profiles_api_version,
             "cache-control": "no-cache"
         }
         
-        return await self._make_api_request("GET", f"/riskentities/profiles/{profile_id}")
+        return await self._make_api_request(
+            "GET", f"/riskentities/profiles/{profile_id}", priority=INTERACTIVE, hedge=True, headers=headers
+        )
 
     def _get_default_filter_group_or(self) -> Dict[str, Any]:
         """Get the default filter group for OR conditions"""
@@ -165,9 +315,7 @@ class DowJonesAPIService:
         }
     async def _get_screening_headers(self) -> Dict[str, str]:
         """Get headers for screening API requests"""
-        token = await self.auth_service.get_valid_token()
         return {
-            "Authorization": token,
             "Accept": "application/vnd.dowjones.dna.bulk-associations.v_1.2+json",
             "Content-Type": "application/vnd.dowjones.dna.bulk-associations.v_1.2+json"
         }
@@ -175,6 +323,7 @@ class DowJonesAPIService:
         """Wait for matches to be ready with retry logic"""
         for attempt in range(max_attempts):
             try:
+                POLLS.inc(operation="wait_for_matches")
                 matches = await self.get_case_matches(case_id)
                 
                 # If matches are ready (status code 200)
@@ -184,14 +333,17 @@ class DowJonesAPIService:
                 # If still processing (status code 202)
                 if any(err.get('status') == 202 for err in matches.get('errors', [])):
                     if attempt < max_attempts - 1:
-                        await asyncio.sleep(delay * (attempt + 1))  # Exponential backoff
+                        await asyncio.sleep(fit_delay(scaled_delay(delay * (attempt + 1))))  # Exponential backoff
                         continue
                         
                 return matches
                 
+            except DeadlineExceeded:
+                raise
             except Exception as e:
                 if attempt < max_attempts - 1:
-                    await asyncio.sleep(delay * (attempt + 1))
+                    RETRIES.inc(operation="wait_for_matches")
+                    await asyncio.sleep(fit_delay(scaled_delay(delay * (attempt + 1))))
                     continue
                 raise
 
@@ -200,93 +352,51 @@ class DowJonesAPIService:
         """Create a new screening case with associations"""
         endpoint = "/risk-entity-screening-cases/bulk-associations?details=true"
         headers = await self._get_headers()
-        
-        try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.api_host}{endpoint}",
-                    json=payload,
-                    headers=headers
-                )
-                response.raise_for_status()
-                return response.json()
-        except httpx.HTTPStatusError as e:
-            error_msg = f"API request failed: {e.response.status_code} - {e.response.text}"
-            logger.error(error_msg)
-            raise
-        except Exception as e:
-            error_msg = f"Unexpected error during API request: {str(e)}"
-            logger.error(error_msg)
-            raise
+        return await self._send("POST", endpoint, BULK, headers, payload=payload)
+
+    async def add_case_associations(self, case_id: str, associations: List[Dict]) -> Dict[str, Any]:
+        """Add associations to an existing screening case"""
+        endpoint = f"/risk-entity-screening-cases/{case_id}/bulk-associations?details=true"
+        payload = {
+            "data": {
+                "attributes": {"associations": associations},
+                "type": "risk-entity-screening-cases/bulk-associations"
+            }
+        }
+        headers = await self._get_headers()
+        return await self._send("POST", endpoint, BULK, headers, payload=payload)
 
     async def get_case_by_id(self, case_id: str) -> Dict[str, Any]:
         """Get a specific screening case by ID"""
         endpoint = f"/risk-entity-screening-cases/{case_id}"
         headers = await self._get_headers()
-        
-        try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(
-                    f"{self.api_host}{endpoint}",
-                    headers=headers
-                )
-                response.raise_for_status()
-                return response.json()
-        except httpx.HTTPStatusError as e:
-            error_msg = f"API request failed: {e.response.status_code} - {e.response.text}"
-            logger.error(error_msg)
-            raise
-        except Exception as e:
-            error_msg = f"Unexpected error during API request: {str(e)}"
-            logger.error(error_msg)
-            raise
+        return await self._send("GET", endpoint, POLLING, headers)
    
     async def get_transaction_details(self, case_id: str, transaction_id: str) -> Dict[str, Any]:
         """Get details for a specific transaction"""
         endpoint = f"/risk-entity-screening-cases/{case_id}/bulk-associations/{transaction_id}?details=true"
         headers = await self._get_headers()
-        
-        try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(
-                    f"{self.api_host}{endpoint}",
-                    headers=headers
-                )
-                response.raise_for_status()
-                return response.json()
-        except httpx.HTTPStatusError as e:
-            error_msg = f"API request failed: {e.response.status_code} - {e.response.text}"
-            logger.error(error_msg)
-            raise
-        except Exception as e:
-            error_msg = f"Unexpected error during API request: {str(e)}"
-            logger.error(error_msg)
-            raise
+        return await self._send("GET", endpoint, POLLING, headers)
 
-    async def get_case_matches(self, case_id: str, limit: int = 5000) -> Dict[str, Any]:
+    async def get_case_matches(
+        self,
+        case_id: str,
+        limit: int = 5000,
+        offset: int = 0,
+        filters: Optional[MatchFilters] = None
+    ) -> Dict[str, Any]:
         """Get matches for a specific case"""
         endpoint = f"/risk-entity-screening-cases/{case_id}/matches"
+        filters = filters or MatchFilters(has_alerts=True)
         params = {
-            "filter[has_alerts]": "true",
-            "filter[is_match_valid]": "true",
+            "filter[has_alerts]": str(filters.has_alerts).lower(),
+            "filter[is_match_valid]": str(filters.is_match_valid).lower(),
             "page[limit]": str(limit)
         }
+        for bound, value in (filters.last_match_activity_on or {}).items():
+            params[f"filter[last_match_activity_on][{bound}]"] = value
+        if offset:
+            params["page[offset]"] = str(offset)
         
         headers = await self._get_headers()
-        try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(
-                    f"{self.api_host}{endpoint}",
-                    params=params,
-                    headers=headers
-                )
-                response.raise_for_status()
-                return response.json()
-        except httpx.HTTPStatusError as e:
-            error_msg = f"API request failed: {e.response.status_code} - {e.response.text}"
-            logger.error(error_msg)
-            raise
-        except Exception as e:
-            error_msg = f"Unexpected error during API request: {str(e)}"
-            logger.error(error_msg)
-            raise
+        return await self._send("GET", endpoint, POLLING, headers, params=params)
@@ -0,0 +1,129 @@
+# app/services/hedging.py
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from app.config import settings
+from app.metrics import HEDGES
+
+
+class LatencyTracker:
+    """Recent upstream latencies per endpoint, for an adaptive hedge delay"""
+
+    def __init__(self, percentile: float, window: int = 500, min_samples: int = 20, min_delay: float = 0.0):
+        self.percentile = percentile
+        self.window = window
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def observe(self, endpoint: str, seconds: float):
+        samples = self._samples.get(endpoint)
+        if samples is None:
+            samples = self._samples[endpoint] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    def threshold(self, endpoint: str) -> Optional[float]:
+        """Latency percentile of the endpoint, or None until enough requests were seen"""
+        samples = self._samples.get(endpoint)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        rank = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return max(self.min_delay, ordered[rank])
+
+
+class HedgeBudget:
+    """Token bucket that lets hedges through for at most ``ratio`` of all requests"""
+
+    def __init__(self, ratio: float, burst: float = 10.0):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = 0.0
+
+    def earn(self):
+        self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def spend(self) -> bool:
+        if self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        return True
+
+
+class HedgingPolicy:
+    """Sends a second identical request when the first is slower than usual.
+
+    Only for idempotent reads. The hedge goes out once the first attempt has
+    been running longer than the endpoint's tracked latency percentile and
+    the budget allows it; the first successful response wins and the other
+    attempt is cancelled. An attempt that fails leaves the other to finish.
+    """
+
+    def __init__(self, tracker: LatencyTracker, budget: HedgeBudget):
+        self.tracker = tracker
+        self.budget = budget
+
+    async def _timed(self, endpoint: str, attempt: Callable[[], Awaitable[Any]]) -> Any:
+        started = time.monotonic()
+        try:
+            result = await attempt()
+        except asyncio.CancelledError:
+            # A cancelled attempt was at least this slow; keeping it stops the tail from vanishing
+            self.tracker.observe(endpoint, time.monotonic() - started)
+            raise
+        self.tracker.observe(endpoint, time.monotonic() - started)
+        return result
+
+    async def run(self, endpoint: str, attempt: Callable[[], Awaitable[Any]]) -> Any:
+        """Result of ``attempt()``, hedged with a second call when it is slow"""
+        self.budget.earn()
+        delay = self.tracker.threshold(endpoint)
+        primary = asyncio.ensure_future(self._timed(endpoint, attempt))
+        if delay is None:
+            return await primary
+
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return primary.result()
+            if not self.budget.spend():
+                HEDGES.inc(endpoint=endpoint, outcome="budget_exhausted")
+                return await primary
+
+            hedge = asyncio.ensure_future(self._timed(endpoint, attempt))
+            tasks.add(hedge)
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        HEDGES.inc(endpoint=endpoint, outcome="hedge_won" if task is hedge else "primary_won")
+                        return task.result()
+                    error = error or task.exception()
+            HEDGES.inc(endpoint=endpoint, outcome="both_failed")
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+_policy: Optional[HedgingPolicy] = None
+
+
+def get_hedging_policy() -> Optional[HedgingPolicy]:
+    """Policy shared by every DowJonesAPIService in the process; None when hedging is disabled"""
+    global _policy
+    if _policy is None and settings.dj_hedging_enabled:
+        _policy = HedgingPolicy(
+            LatencyTracker(
+                percentile=settings.dj_hedge_percentile,
+                min_samples=settings.dj_hedge_min_samples,
+                min_delay=settings.dj_hedge_min_delay
+            ),
+            # The ratio holds per worker; the burst is split so the workers together keep the default
+            HedgeBudget(settings.dj_hedge_budget, burst=max(1.0, 10.0 / max(1, settings.workers)))
+        )
+    return _policy
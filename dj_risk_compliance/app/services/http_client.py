@@ -0,0 +1,38 @@
+# app/services/http_client.py
+import asyncio
+from typing import Optional
+
+import httpx
+
+from app.cassette import http_transport
+from app.config import settings, worker_share
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Pooled client for Dow Jones API calls, shared on the running event loop.
+
+    Connections are kept alive between requests instead of paying a TCP and
+    TLS handshake per call. A client belongs to one event loop, so a new one
+    is opened when called from another loop.
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        connections = worker_share(settings.dj_max_concurrent_requests)
+        _client = httpx.AsyncClient(
+            timeout=30.0,
+            transport=http_transport(),
+            limits=httpx.Limits(max_connections=connections * 2, max_keepalive_connections=connections)
+        )
+        _client_loop = loop
+    return _client
+
+
+async def close_http_client():
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
@@ -0,0 +1,257 @@
+# app/services/match_store.py
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.config import settings
+from app.services.name_normalization import association_name, normalize_name
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY,
+    run_ts TEXT NOT NULL,
+    case_id TEXT,
+    source TEXT,
+    input_name TEXT,
+    normalized_input TEXT,
+    peid TEXT,
+    match_name TEXT,
+    match_type TEXT,
+    match_id TEXT,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_matches_peid ON matches (peid);
+CREATE INDEX IF NOT EXISTS ix_matches_match_name ON matches (match_name);
+CREATE INDEX IF NOT EXISTS ix_matches_normalized_input ON matches (normalized_input);
+CREATE INDEX IF NOT EXISTS ix_matches_case_id ON matches (case_id);
+CREATE INDEX IF NOT EXISTS ix_matches_run_ts ON matches (run_ts);
+"""
+
+INSERT_BATCH_SIZE = 1000
+
+
+class MatchStore:
+    """Local SQLite store of screening matches, written by the cron and the API"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.match_store_path
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(self.path, timeout=30.0)
+        connection.row_factory = sqlite3.Row
+        try:
+            if not self._initialized:
+                with self._init_lock:
+                    connection.execute("PRAGMA journal_mode=WAL")
+                    connection.executescript(SCHEMA)
+                    self._initialized = True
+            yield connection
+            connection.commit()
+        finally:
+            connection.close()
+
+    def initialize(self):
+        """Create the database and schema now rather than on first use"""
+        with self._connect():
+            pass
+
+    def add_matches(
+        self,
+        matches: Iterable[Dict[str, Any]],
+        case_id: Optional[str] = None,
+        source: Optional[str] = None,
+        input_name: Optional[str] = None,
+        run_ts: Optional[str] = None,
+        only_changed: bool = False
+    ) -> int:
+        """Insert matches; ``input_name`` is used when a match does not carry its own.
+
+        With ``only_changed`` a match is skipped when the latest stored row
+        for the same case, match id and input name holds the same record, so
+        reading a case's matches again does not duplicate them.
+        """
+        run_ts = run_ts or datetime.now(timezone.utc).isoformat()
+        count = 0
+
+        with self._connect() as connection:
+            latest = None
+            if only_changed:
+                # Hold the write lock from the lookup to the insert so concurrent readers cannot both insert
+                connection.execute("BEGIN IMMEDIATE")
+                latest = self._latest_records(connection, case_id)
+            batch = []
+            for match in matches:
+                name = match.get("input_name", input_name)
+                normalized = normalize_name(name) if name is not None else None
+                match_id = _as_text(match.get("match_id"))
+                record = json.dumps(match, default=str)
+                if latest is not None:
+                    key = _record_key(match_id, normalized, record)
+                    if latest.get(key) == record:
+                        continue
+                    latest[key] = record
+                batch.append((
+                    run_ts,
+                    case_id,
+                    source,
+                    name,
+                    normalized,
+                    _as_text(match.get("peid")),
+                    match.get("match_name"),
+                    match.get("match_type"),
+                    match_id,
+                    record
+                ))
+                if len(batch) >= INSERT_BATCH_SIZE:
+                    count += self._insert(connection, batch)
+            count += self._insert(connection, batch)
+
+        return count
+
+    def add_response(
+        self,
+        response: Dict[str, Any],
+        case_id: Optional[str] = None,
+        source: Optional[str] = None,
+        only_changed: bool = False
+    ) -> int:
+        """Insert every match of a raw matches response, keyed by its association name"""
+        run_ts = datetime.now(timezone.utc).isoformat()
+        count = 0
+        for attributes, matches in _iter_response_items(response):
+            count += self.add_matches(matches, case_id, source, association_name(attributes), run_ts, only_changed)
+        return count
+
+    def _latest_records(self, connection: sqlite3.Connection, case_id: Optional[str]) -> Dict[Tuple, str]:
+        """Most recent stored record of each match of a case"""
+        latest = {}
+        for row in connection.execute(
+            "SELECT match_id, normalized_input, record FROM matches WHERE case_id IS ? ORDER BY id", (case_id,)
+        ):
+            latest[_record_key(row["match_id"], row["normalized_input"], row["record"])] = row["record"]
+        return latest
+
+    def _insert(self, connection: sqlite3.Connection, batch: List[Tuple]) -> int:
+        if not batch:
+            return 0
+        connection.executemany(
+            "INSERT INTO matches (run_ts, case_id, source, input_name, normalized_input, "
+            "peid, match_name, match_type, match_id, record) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            batch
+        )
+        inserted = len(batch)
+        batch.clear()
+        return inserted
+
+    def query(
+        self,
+        peid: Optional[str] = None,
+        match_name: Optional[str] = None,
+        input_name: Optional[str] = None,
+        case_id: Optional[str] = None,
+        source: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 100
+    ) -> Dict[str, Any]:
+        """Page through stored matches, newest run first"""
+        clauses, params = [], []
+        for column, value in (
+            ("peid", peid),
+            ("match_name", match_name),
+            ("normalized_input", normalize_name(input_name) if input_name else None),
+            ("case_id", case_id),
+            ("source", source)
+        ):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since:
+            clauses.append("run_ts >= ?")
+            params.append(since)
+        if until:
+            clauses.append("run_ts < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._connect() as connection:
+            total = connection.execute(f"SELECT COUNT(*) FROM matches {where}", params).fetchone()[0]
+            rows = connection.execute(
+                f"SELECT * FROM matches {where} ORDER BY run_ts DESC, id DESC LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+
+        return {
+            "data": [_row_to_dict(row) for row in rows],
+            "meta": {"total": total, "offset": offset, "limit": limit}
+        }
+
+    def inputs_for_peid(self, peid: str, offset: int = 0, limit: int = 100) -> Dict[str, Any]:
+        """Distinct input names that have matched an entity, with first and last run"""
+        with self._connect() as connection:
+            total = connection.execute(
+                "SELECT COUNT(DISTINCT normalized_input) FROM matches WHERE peid = ?", (peid,)
+            ).fetchone()[0]
+            rows = connection.execute(
+                "SELECT normalized_input, MIN(input_name) AS input_name, COUNT(*) AS match_count, "
+                "MIN(run_ts) AS first_seen, MAX(run_ts) AS last_seen FROM matches WHERE peid = ? "
+                "GROUP BY normalized_input ORDER BY last_seen DESC LIMIT ? OFFSET ?",
+                (peid, limit, offset)
+            ).fetchall()
+
+        return {
+            "data": [dict(row) for row in rows],
+            "meta": {"total": total, "offset": offset, "limit": limit}
+        }
+
+
+def _as_text(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def _record_key(match_id: Optional[str], normalized_input: Optional[str], record: str) -> Tuple:
+    # Matches without an id can only be told apart by their content
+    return (match_id, normalized_input) if match_id is not None else (None, normalized_input, record)
+
+
+def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    result = dict(row)
+    result["record"] = json.loads(result["record"])
+    return result
+
+
+def _iter_response_items(response: Dict[str, Any]) -> Iterator[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """Yield (association attributes, matches) pairs from a matches response"""
+    if not isinstance(response, dict):
+        return
+    if isinstance(response.get("matches"), list):
+        yield {}, response["matches"]
+        return
+
+    items = response.get("data")
+    if isinstance(response.get("matches"), dict):
+        items = response["matches"].get("data")
+    for item in items if isinstance(items, list) else []:
+        if isinstance(item, dict) and isinstance(item.get("attributes"), dict):
+            if isinstance(item["attributes"].get("matches"), list):
+                yield item["attributes"], item["attributes"]["matches"]
+
+
+_store: Optional[MatchStore] = None
+
+
+def get_match_store() -> Optional[MatchStore]:
+    """Shared store instance, or None when the store is disabled in settings"""
+    global _store
+    if not settings.match_store_enabled:
+        return None
+    if _store is None:
+        _store = MatchStore()
+    return _store
@@ -0,0 +1,94 @@
+# app/services/name_normalization.py
+import logging
+import re
+import unicodedata
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.metrics import FAN_OUT_UNRESOLVED
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize_name(name: Any) -> str:
+    """Casefold, strip diacritics and punctuation, and collapse whitespace"""
+    decomposed = unicodedata.normalize("NFKD", str(name))
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(_NON_WORD.sub(" ", stripped.casefold()).split())
+
+
+def dedupe_names(
+    names: List[Any],
+    name_index: Optional[Dict[str, List[Tuple[int, Any]]]] = None,
+    start: int = 0
+) -> Tuple[List[str], Dict[str, List[Tuple[int, Any]]]]:
+    """Collapse equivalent names into one screening name each.
+
+    Returns the unique names (the first spelling seen for each normalized
+    form, in input order) and a mapping of normalized name to every
+    ``(input index, original name)`` it stands for. Passing the index from
+    an earlier chunk (and the chunk's ``start`` offset) extends it and
+    returns only the names not seen in earlier chunks.
+    """
+    unique_names = []
+    if name_index is None:
+        name_index = {}
+
+    for index, name in enumerate(names, start):
+        key = normalize_name(name)
+        if not key:
+            continue
+        if key not in name_index:
+            name_index[key] = []
+            unique_names.append(str(name))
+        name_index[key].append((index, name))
+
+    return unique_names, name_index
+
+
+def association_name(attributes: Dict[str, Any]) -> Optional[str]:
+    """Best-effort lookup of the screened name on a matches-response item"""
+    for container in (attributes, attributes.get("association") or {}):
+        names = container.get("names")
+        if isinstance(names, list) and names and isinstance(names[0], dict):
+            name = names[0].get("single_string_name")
+            if name:
+                return name
+        for key in ("single_string_name", "association_name", "name"):
+            if isinstance(container.get(key), str):
+                return container[key]
+    return None
+
+
+def fan_out_matches(
+    attributes: Dict[str, Any],
+    matches: List[Dict[str, Any]],
+    name_index: Optional[Dict[str, List[Tuple[int, Any]]]]
+) -> Iterator[Dict[str, Any]]:
+    """Yield each match once per original input row its association stands for.
+
+    Matches whose association name cannot be read or is not in the index are
+    yielded once, unchanged; they are logged and counted because the other
+    input rows the association stood for get no output rows.
+    """
+    if not name_index:
+        yield from matches
+        return
+
+    name = association_name(attributes)
+    occurrences = name_index.get(normalize_name(name)) if name else None
+
+    if not occurrences:
+        if matches:
+            FAN_OUT_UNRESOLVED.inc(len(matches))
+            logger.warning(
+                f"Could not map {len(matches)} match(es) of association {name!r} back to input rows; "
+                f"they are written once without input_name/input_index"
+            )
+        yield from matches
+        return
+
+    for match in matches:
+        for index, original in occurrences:
+            yield {**match, "input_name": original, "input_index": index}
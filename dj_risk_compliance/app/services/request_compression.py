@@ -0,0 +1,101 @@
+# app/services/request_compression.py
+import asyncio
+import gzip
+import json
+import logging
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Answers meaning the upstream did not understand a gzip-encoded body
+REJECTED_STATUSES = (400, 415)
+
+
+class RequestCompression:
+    """Gzip-encodes large JSON request bodies for an upstream that accepts them.
+
+    Support is unknown until the first large request: it goes out compressed
+    while other large requests wait, and if the upstream answers 400 or 415
+    the body is resent as plain JSON. Compression only stays off for the rest
+    of the process when that plain resend succeeds; when it fails too the
+    request itself was bad and support stays unknown. A successful compressed
+    answer confirms support; after that only a 415 turns it off again.
+    """
+
+    def __init__(self, enabled: bool, min_size: int, level: int = 6):
+        self.enabled = enabled
+        self.min_size = min_size
+        self.level = level
+        self.supported: Optional[bool] = None
+        self._probe_lock: Optional[asyncio.Lock] = None
+        self._probe_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def encode(self, payload: Any) -> Tuple[Optional[bytes], Optional[bytes]]:
+        """Plain JSON body, and its gzip encoding when this request should be compressed"""
+        if payload is None:
+            return None, None
+        # Same bytes httpx would send for json=payload
+        body = json.dumps(payload).encode("utf-8")
+        if not self.enabled or self.supported is False or len(body) < self.min_size:
+            return body, None
+        return body, gzip.compress(body, compresslevel=self.level)
+
+    async def send(
+        self,
+        payload: Any,
+        send: Callable[[Optional[bytes], Optional[str]], Awaitable[httpx.Response]]
+    ) -> httpx.Response:
+        """Send ``payload`` through ``send(content, content_encoding)``, gzip-encoded when it should be"""
+        body, compressed = self.encode(payload)
+        if compressed is not None and self.supported is None:
+            async with self._lock():
+                # Only one request probes; the others go out once the answer is known
+                if self.supported is None:
+                    return await self._send_compressed(body, compressed, send)
+        if compressed is None or self.supported is False:
+            return await send(body, None)
+        return await self._send_compressed(body, compressed, send)
+
+    async def _send_compressed(self, body: bytes, compressed: bytes, send) -> httpx.Response:
+        probing = self.supported is None
+        response = await send(compressed, "gzip")
+        if probing and response.status_code < 400:
+            self.supported = True
+            logger.info("Upstream accepts gzip-encoded request bodies")
+        if not (response.status_code == 415 or (probing and response.status_code in REJECTED_STATUSES)):
+            return response
+
+        plain = await send(body, None)
+        if plain.status_code < 400:
+            self.supported = False
+            logger.warning(f"Upstream refused a gzip-encoded body ({response.status_code}); sending plain JSON from now on")
+        else:
+            self.supported = None
+            logger.info(f"Plain resend of a refused gzip-encoded body failed too ({plain.status_code}); gzip support still unknown")
+        return plain
+
+    def _lock(self) -> asyncio.Lock:
+        # A lock belongs to one event loop, like the pooled HTTP client
+        loop = asyncio.get_running_loop()
+        if self._probe_lock is None or self._probe_loop is not loop:
+            self._probe_lock = asyncio.Lock()
+            self._probe_loop = loop
+        return self._probe_lock
+
+
+_compression: Optional[RequestCompression] = None
+
+
+def get_request_compression() -> RequestCompression:
+    """Compression state shared by every DowJonesAPIService in the process"""
+    global _compression
+    if _compression is None:
+        _compression = RequestCompression(
+            enabled=settings.dj_request_compression,
+            min_size=settings.dj_request_compression_min_size
+        )
+    return _compression
@@ -0,0 +1,153 @@
+# app/services/scheduler.py
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+
+from app.config import settings, worker_share
+from app.metrics import SCHEDULER_IN_FLIGHT, SCHEDULER_QUEUE_DEPTH
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+POLLING = "polling"
+
+PRIORITIES = (INTERACTIVE, BULK, POLLING)
+
+
+class RequestScheduler:
+    """Priority-aware gate in front of every Dow Jones API call in the process.
+
+    Requests wait in one FIFO per class (interactive searches and profiles,
+    bulk submissions, background polling and match downloads) and are
+    released by start-time fair queuing: each release advances the class's
+    virtual time by 1/weight and the class with the lowest virtual time goes
+    next, so a backlog of polls cannot starve the other classes. Releases are
+    spaced by ``min_interval`` and at most ``max_concurrency`` requests are in
+    flight, of which ``reserved_interactive`` slots only interactive requests
+    may use.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        reserved_interactive: int,
+        weights: Dict[str, float],
+        min_interval: float = 0.0
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.reserved_interactive = min(max(0, reserved_interactive), self.max_concurrency - 1)
+        self.weights = {priority: float(weights.get(priority, 1.0)) for priority in PRIORITIES}
+        self.min_interval = min_interval
+        self._queues: Dict[str, Deque[asyncio.Future]] = {priority: deque() for priority in PRIORITIES}
+        self._virtual_time = {priority: 0.0 for priority in PRIORITIES}
+        self._clock = 0.0
+        self._in_flight = 0
+        self._next_release = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_loop = None
+        self._released = {priority: 0 for priority in PRIORITIES}
+
+    @asynccontextmanager
+    async def slot(self, priority: str = INTERACTIVE):
+        """Hold a request slot of the given class for the duration of the block"""
+        await self._acquire(priority)
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            self._release_waiters()
+            self._update_gauges()
+
+    async def _acquire(self, priority: str):
+        if priority not in self._queues:
+            raise ValueError(f"Unknown request priority: {priority}")
+        queue = self._queues[priority]
+        if not queue:
+            # A class coming back from idle starts at the current virtual time, without banked credit
+            self._virtual_time[priority] = max(self._virtual_time[priority], self._clock)
+
+        waiter = asyncio.get_running_loop().create_future()
+        queue.append(waiter)
+        self._release_waiters()
+        self._update_gauges()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Released just as the caller was cancelled: hand the slot back
+                self._in_flight -= 1
+                self._release_waiters()
+            elif waiter in queue:
+                queue.remove(waiter)
+            raise
+        finally:
+            self._update_gauges()
+
+    def _update_gauges(self):
+        for priority, queue in self._queues.items():
+            SCHEDULER_QUEUE_DEPTH.set(len(queue), priority=priority)
+        SCHEDULER_IN_FLIGHT.set(self._in_flight)
+
+    def _has_capacity(self, priority: str) -> bool:
+        limit = self.max_concurrency if priority == INTERACTIVE else self.max_concurrency - self.reserved_interactive
+        return self._in_flight < limit
+
+    def _release_waiters(self):
+        while True:
+            ready = [priority for priority in PRIORITIES if self._queues[priority] and self._has_capacity(priority)]
+            if not ready:
+                return
+
+            now = time.monotonic()
+            if now < self._next_release:
+                self._schedule(self._next_release - now)
+                return
+
+            priority = min(ready, key=lambda p: self._virtual_time[p])
+            waiter = self._queues[priority].popleft()
+            if waiter.done():
+                # Cancelled while queued, before its task could remove it: not a release
+                continue
+            self._clock = self._virtual_time[priority]
+            self._virtual_time[priority] += 1.0 / self.weights[priority]
+            self._in_flight += 1
+            self._released[priority] += 1
+            self._next_release = now + self.min_interval
+            waiter.set_result(None)
+
+    def _schedule(self, delay: float):
+        loop = asyncio.get_running_loop()
+        if self._timer is not None and self._timer_loop is loop:
+            return
+        self._timer_loop = loop
+        self._timer = loop.call_later(delay, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self._release_waiters()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Queued and released request counts per class, plus requests in flight"""
+        return {
+            "in_flight": self._in_flight,
+            "queued": {priority: len(queue) for priority, queue in self._queues.items()},
+            "released": dict(self._released)
+        }
+
+
+_scheduler: Optional[RequestScheduler] = None
+
+
+def get_request_scheduler() -> RequestScheduler:
+    """Scheduler shared by every DowJonesAPIService in the process, sized to this worker's share"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = RequestScheduler(
+            max_concurrency=worker_share(settings.dj_max_concurrent_requests),
+            reserved_interactive=worker_share(settings.dj_interactive_reserved_slots),
+            weights=settings.dj_priority_weights,
+            # Each worker spaces its own requests, so together they keep the configured rate
+            min_interval=settings.dj_min_request_interval * max(1, settings.workers)
+        )
+    return _scheduler
@@ -0,0 +1,234 @@
+# app/tracing.py
+import asyncio
+import functools
+import json
+import random
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+
+from app.config import settings
+
+_timing: ContextVar[Optional["RequestTiming"]] = ContextVar("request_timing", default=None)
+_parent_span: ContextVar[Optional[str]] = ContextVar("parent_span", default=None)
+
+# httpcore trace events grouped into the phases reported to clients
+UPSTREAM_EVENT_PHASES = {
+    "connection.connect_tcp": "connect",
+    "connection.start_tls": "connect",
+    "http11.send_request_headers": "upstream",
+    "http11.send_request_body": "upstream",
+    "http11.receive_response_headers": "upstream",
+    "http11.receive_response_body": "upstream",
+    "http2.send_request_headers": "upstream",
+    "http2.send_request_body": "upstream",
+    "http2.receive_response_headers": "upstream",
+    "http2.receive_response_body": "upstream",
+}
+
+
+class RequestTiming:
+    """Phase durations of one API request, plus its spans when the request is sampled"""
+
+    def __init__(self, name: str, sampled: bool, trace_id: Optional[str] = None, parent_span_id: Optional[str] = None):
+        self.name = name
+        self.sampled = sampled
+        self.trace_id = trace_id or secrets.token_hex(16)
+        self.parent_span_id = parent_span_id
+        self.span_id = secrets.token_hex(8)
+        self.phases: Dict[str, float] = {}
+        self.endpoint_seconds = 0.0
+        self.spans: List[Dict[str, Any]] = []
+        self.start_ns = time.time_ns()
+        self._started = time.perf_counter()
+
+    def add(self, phase: str, seconds: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def add_span(self, name: str, start_ns: int, end_ns: int, parent_id: Optional[str] = None,
+                 span_id: Optional[str] = None, attributes: Optional[Dict[str, Any]] = None,
+                 error: Optional[str] = None):
+        self.spans.append({
+            "trace_id": self.trace_id,
+            "span_id": span_id or secrets.token_hex(8),
+            "parent_span_id": parent_id or self.span_id,
+            "name": name,
+            "start_time_unix_nano": start_ns,
+            "end_time_unix_nano": end_ns,
+            "attributes": attributes or {},
+            "status": {"code": "ERROR", "message": error} if error else {"code": "OK"}
+        })
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._started
+
+    def server_timing(self) -> str:
+        entries = [f"{phase};dur={seconds * 1000:.1f}" for phase, seconds in self.phases.items()]
+        entries.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(entries)
+
+
+class SpanExporter:
+    """Writes finished spans as JSON lines to stdout ("console") or appends them to a file"""
+
+    def __init__(self, target: str):
+        self.target = target
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Dict[str, Any]]):
+        lines = "".join(json.dumps(span, default=str) + "\n" for span in spans)
+        with self._lock:
+            if self.target == "console":
+                print(lines, end="", flush=True)
+            else:
+                with open(self.target, "a", encoding="utf-8") as f:
+                    f.write(lines)
+
+
+_exporter: Optional[SpanExporter] = None
+
+
+def get_exporter() -> Optional[SpanExporter]:
+    global _exporter
+    if _exporter is None and settings.trace_exporter:
+        _exporter = SpanExporter(settings.trace_exporter)
+    return _exporter
+
+
+def current_timing() -> Optional[RequestTiming]:
+    return _timing.get()
+
+
+def _parse_traceparent(header: Optional[str]) -> Tuple[Optional[str], Optional[str], bool]:
+    """(trace id, parent span id, sampled flag) from a W3C traceparent header"""
+    try:
+        version, trace_id, parent_id, flags = header.split("-")
+        return trace_id, parent_id, bool(int(flags, 16) & 1)
+    except (AttributeError, ValueError):
+        return None, None, False
+
+
+def start_request(name: str, traceparent: Optional[str] = None):
+    """Begin timing a request; returns (timing, token) for finish_request"""
+    trace_id, parent_id, upstream_sampled = _parse_traceparent(traceparent)
+    sampled = get_exporter() is not None and (upstream_sampled or random.random() < settings.trace_sample_rate)
+    timing = RequestTiming(name, sampled, trace_id, parent_id)
+    return timing, _timing.set(timing)
+
+
+def finish_request(timing: RequestTiming, token, attributes: Optional[Dict[str, Any]] = None):
+    """Stop timing a request and export its spans when it was sampled"""
+    _timing.reset(token)
+    exporter = get_exporter()
+    if not timing.sampled or exporter is None:
+        return
+    timing.add_span(
+        timing.name, timing.start_ns, time.time_ns(),
+        parent_id=timing.parent_span_id, span_id=timing.span_id, attributes=attributes
+    )
+    # The root span goes first, children follow in start order
+    exporter.export([timing.spans[-1]] + sorted(timing.spans[:-1], key=lambda span: span["start_time_unix_nano"]))
+
+
+@contextmanager
+def phase(name: str, record: bool = True, **attributes):
+    """Time a block as a phase of the current request; a no-op outside a request.
+
+    With ``record=False`` the block only gets a span, not a Server-Timing entry.
+    """
+    timing = _timing.get()
+    if timing is None:
+        yield
+        return
+
+    span_id = secrets.token_hex(8) if timing.sampled else None
+    parent_id = _parent_span.get()
+    parent_token = _parent_span.set(span_id) if span_id else None
+    start_ns = time.time_ns()
+    started = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        if record:
+            timing.add(name, time.perf_counter() - started)
+        if span_id:
+            _parent_span.reset(parent_token)
+            timing.add_span(name, start_ns, time.time_ns(), parent_id=parent_id,
+                            span_id=span_id, attributes=attributes, error=error)
+
+
+def upstream_trace() -> Optional[Callable]:
+    """httpx ``trace`` extension attributing connection and transfer time to the current request"""
+    timing = _timing.get()
+    if timing is None:
+        return None
+    parent_id = _parent_span.get()
+    started: Dict[str, Tuple[float, int]] = {}
+
+    async def trace(event_name: str, info: Dict[str, Any]):
+        event, _, stage = event_name.rpartition(".")
+        phase_name = UPSTREAM_EVENT_PHASES.get(event)
+        if phase_name is None:
+            return
+        if stage == "started":
+            started[event] = (time.perf_counter(), time.time_ns())
+        elif event in started:
+            began, start_ns = started.pop(event)
+            timing.add(phase_name, time.perf_counter() - began)
+            if timing.sampled:
+                timing.add_span(event, start_ns, time.time_ns(), parent_id=parent_id,
+                                error=repr(info.get("exception")) if stage == "failed" else None)
+
+    return trace
+
+
+class TimedRoute(APIRoute):
+    """Route that times FastAPI's own work around the endpoint function.
+
+    The time spent in the handler outside the endpoint call (request
+    validation and response encoding) is reported as the "encode" phase;
+    the endpoint itself gets a span but no Server-Timing entry, as it
+    already contains the auth and upstream phases.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        call = self.dependant.call
+        if asyncio.iscoroutinefunction(call):
+            @functools.wraps(call)
+            async def timed_call(**values):
+                timing = _timing.get()
+                started = time.perf_counter()
+                try:
+                    with phase("endpoint", record=False):
+                        return await call(**values)
+                finally:
+                    if timing is not None:
+                        timing.endpoint_seconds += time.perf_counter() - started
+
+            self.dependant.call = timed_call
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            timing = _timing.get()
+            if timing is None:
+                return await handler(request)
+            started = time.perf_counter()
+            endpoint_before = timing.endpoint_seconds
+            response = await handler(request)
+            endpoint_time = timing.endpoint_seconds - endpoint_before
+            timing.add("encode", time.perf_counter() - started - endpoint_time)
+            return response
+
+        return timed_handler
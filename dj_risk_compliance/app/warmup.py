@@ -0,0 +1,111 @@
+# app/warmup.py
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from app.auth.pool import get_credential_pool
+from app.cassette import get_cassette
+from app.config import service_url, settings
+from app.responses import dumps
+from app.services.http_client import get_http_client
+from app.services.match_store import get_match_store
+from app.services.request_compression import get_request_compression
+
+logger = logging.getLogger(__name__)
+
+WARM_STEPS = ("token", "connection_pools", "templates")
+
+# A small screening payload, shaped like the real ones, used to exercise the encoders
+SAMPLE_PAYLOAD = {
+    "data": {
+        "attributes": {
+            "case_info": {
+                "associations": [
+                    {"names": [{"single_string_name": f"Warm Up {i}", "name_type": "PRIMARY"}], "record_type": "UNKNOWN"}
+                    for i in range(500)
+                ]
+            }
+        },
+        "type": "risk-entity-screening-cases/bulk-associations"
+    }
+}
+
+
+class WarmState:
+    """Progress of this worker's warm-up, reported by the readiness endpoint"""
+
+    def __init__(self):
+        self.steps: Dict[str, bool] = {step: False for step in WARM_STEPS}
+        self.attempts = 0
+        self.last_error: Optional[str] = None
+        self._started = time.monotonic()
+        self.warm_seconds: Optional[float] = None
+        self.shutting_down = False
+
+    @property
+    def ready(self) -> bool:
+        return all(self.steps.values()) and not self.shutting_down
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "status": "ready" if self.ready else ("shutting_down" if self.shutting_down else "warming"),
+            "steps": dict(self.steps),
+            "attempts": self.attempts,
+            "warm_seconds": round(self.warm_seconds, 3) if self.warm_seconds is not None else None,
+            "last_error": self.last_error
+        }
+
+
+warm_state = WarmState()
+
+
+def prime_templates(app):
+    """Build the OpenAPI schema and run the JSON and gzip encoders once, so the first requests pay for neither"""
+    app.openapi()
+    dumps(SAMPLE_PAYLOAD)
+    get_request_compression().encode(SAMPLE_PAYLOAD)
+
+
+async def open_api_connection():
+    """Open a pooled connection to the Dow Jones API host, so the first request skips the TCP and TLS handshakes"""
+    client = get_http_client()
+    if get_cassette() is not None:
+        # Cassette exchanges are matched by request; an extra one would not replay
+        return
+    # Any answer will do, an error status included: the connection is kept in the pool
+    await client.head(service_url(settings.dj_api_host), timeout=10.0)
+
+
+async def warm_up(app, state: WarmState = warm_state):
+    """Run the warm-up steps that have not succeeded yet"""
+    loop = asyncio.get_running_loop()
+    if not state.steps["token"]:
+        await get_credential_pool().warm()
+        state.steps["token"] = True
+    if not state.steps["connection_pools"]:
+        await open_api_connection()
+        store = get_match_store()
+        if store is not None:
+            await loop.run_in_executor(None, store.initialize)
+        state.steps["connection_pools"] = True
+    if not state.steps["templates"]:
+        await loop.run_in_executor(None, prime_templates, app)
+        state.steps["templates"] = True
+
+
+async def keep_warming(app, state: WarmState = warm_state, retry_delay: float = 5.0, max_delay: float = 60.0):
+    """Retry the warm-up with backoff until the worker is ready"""
+    delay = retry_delay
+    while not all(state.steps.values()):
+        state.attempts += 1
+        try:
+            await warm_up(app, state)
+        except Exception as e:
+            state.last_error = str(e)
+            logger.error(f"Warm-up attempt {state.attempts} failed, retrying in {delay:g}s: {str(e)}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_delay)
+    state.last_error = None
+    state.warm_seconds = time.monotonic() - state._started
+    logger.info(f"Worker warm after {state.warm_seconds:.2f}s")
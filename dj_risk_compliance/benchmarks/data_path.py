@@ -0,0 +1,264 @@
+# benchmarks/data_path.py
+"""Time and peak memory of the cron data path, with JSON baselines and regression checks.
+
+Usage: python -m benchmarks.data_path run [--sizes 100,1000,10000,100000,1000000]
+                                          [--shapes 2:0.2,5:0.0,1:0.6] [--functions iter_response_matches,...]
+                                          [--repeat 3] [--output baseline.json]
+       python -m benchmarks.data_path compare baseline.json current.json [--threshold 0.10]
+                                          [--memory-threshold 0.10]
+
+The benchmarks cover what a screening run executes: reading input names
+in chunks and deduplicating them, extracting matches from response pages
+(fanned out to their input rows), streaming them to CSV and diffing the
+CSV against the previous run. A shape is NESTING:SPARSITY as understood by
+benchmarks.synthetic. Sizes count matches, or input names for the input
+benchmarks. compare exits with status 1 when any benchmark got slower or
+used more peak memory than the thresholds allow.
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+# The cron module sets up file logging and output paths on import
+_WORK_DIR = tempfile.mkdtemp(prefix="dj_bench_")
+os.environ.setdefault("LOCAL_LOG_PATH", os.path.join(_WORK_DIR, "logs"))
+os.environ.setdefault("LOCAL_OUTPUT_PATH", os.path.join(_WORK_DIR, "output"))
+os.environ.setdefault("LOCAL_INPUT_PATH", os.path.join(_WORK_DIR, "input"))
+
+from app.services.name_normalization import dedupe_names
+from benchmarks.synthetic import FIRST_NAMES, LAST_NAMES, generate_matches_response
+from cron import dowjones_cron
+from cron.output_diff import commit_index, diff_output
+
+logging.getLogger().setLevel(logging.WARNING)
+
+DEFAULT_SIZES = "100,1000,10000,100000"
+DEFAULT_SHAPES = "2:0.2"
+
+
+def _pages(size: int, nesting: int, sparsity: float) -> Tuple[List[Dict[str, Any]], Dict]:
+    """A case's matches split into response pages, with the name index of the case's inputs"""
+    response = generate_matches_response(size, nesting=nesting, sparsity=sparsity)
+    limit = dowjones_cron.MATCHES_PAGE_LIMIT
+    pages = [{"data": response["data"][start:start + limit]} for start in range(0, len(response["data"]), limit)]
+    names = [item["attributes"]["names"][0]["single_string_name"] for item in response["data"]]
+    _, name_index = dedupe_names(names)
+    return pages, name_index
+
+
+def _page_matches(size: int, nesting: int, sparsity: float) -> List[List[Dict[str, Any]]]:
+    """Matches of each page as stream_output_file hands them to the CSV writer"""
+    pages, name_index = _pages(size, nesting, sparsity)
+    return [list(dowjones_cron.iter_response_matches(page, name_index)) for page in pages]
+
+
+def _iter_pages(data: Tuple[List[Dict[str, Any]], Dict]) -> int:
+    pages, name_index = data
+    return sum(1 for page in pages for _ in dowjones_cron.iter_response_matches(page, name_index))
+
+
+def _export(page_matches: List[List[Dict[str, Any]]]):
+    path = os.path.join(_WORK_DIR, "export.csv")
+    with dowjones_cron.StreamingCSVWriter(path) as writer:
+        for matches in page_matches:
+            writer.write_many(matches)
+    os.remove(path)
+
+
+def _csv_with_baseline(size: int, nesting: int, sparsity: float) -> Tuple[str, str, str]:
+    """An exported CSV and the index of a previous run that differs in a tenth of the rows"""
+    pages, name_index = _pages(size, nesting, sparsity)
+    matches = [match for page in pages for match in dowjones_cron.iter_response_matches(page, name_index)]
+    previous_path = os.path.join(_WORK_DIR, f"previous_{size}.csv")
+    csv_path = os.path.join(_WORK_DIR, f"current_{size}.csv")
+    index_path = os.path.join(_WORK_DIR, f"index_{size}.tsv.gz")
+    for path, rows in ((previous_path, [{**match, "score": 0.0} if i % 10 == 0 else match for i, match in enumerate(matches)]),
+                       (csv_path, matches)):
+        with dowjones_cron.StreamingCSVWriter(path) as writer:
+            writer.write_many(rows)
+    diff_output(previous_path, index_path, os.path.join(_WORK_DIR, "previous_delta.csv"))
+    commit_index(index_path)
+    return csv_path, index_path, os.path.join(_WORK_DIR, f"delta_{size}.csv")
+
+
+def _chunked_names(path: str) -> int:
+    name_index, row_count = {}, 0
+    for chunk in dowjones_cron.iter_name_chunks(path):
+        dedupe_names(chunk, name_index, row_count)
+        row_count += len(chunk)
+    return row_count
+
+
+def _input_file(size: int, nesting: int, sparsity: float) -> str:
+    path = os.path.join(_WORK_DIR, f"names_{size}.json")
+    names = [f"{FIRST_NAMES[i % len(FIRST_NAMES)]} {LAST_NAMES[(i // len(FIRST_NAMES)) % len(LAST_NAMES)]} {i}"
+             for i in range(size)]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"names": names}, f)
+    return path
+
+
+# Each benchmark is (setup, timed call); only the call is measured
+BENCHMARKS: Dict[str, Tuple[Callable[[int, int, float], Any], Callable[[Any], Any]]] = {
+    "iter_name_chunks": (
+        _input_file,
+        _chunked_names
+    ),
+    "process_json_file": (
+        _input_file,
+        dowjones_cron.process_json_file
+    ),
+    "iter_response_matches": (
+        _pages,
+        _iter_pages
+    ),
+    "StreamingCSVWriter": (
+        _page_matches,
+        _export
+    ),
+    "diff_output": (
+        _csv_with_baseline,
+        lambda paths: diff_output(*paths)
+    ),
+}
+
+
+def measure(call: Callable[[Any], Any], data: Any, repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        result = call(data)
+        timings.append(time.perf_counter() - started)
+        del result
+
+    # Peak memory comes from a separate traced run, tracing slows the timed ones down
+    gc.collect()
+    tracemalloc.start()
+    result = call(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    return {
+        "seconds_min": min(timings),
+        "seconds_median": statistics.median(timings),
+        "peak_bytes": peak,
+    }
+
+
+def run(sizes: List[int], shapes: List[Tuple[int, float]], functions: List[str], repeat: int) -> Dict[str, Any]:
+    results = []
+    for name in functions:
+        setup, call = BENCHMARKS[name]
+        for nesting, sparsity in shapes:
+            for size in sizes:
+                data = setup(size, nesting, sparsity)
+                stats = measure(call, data, repeat)
+                del data
+                results.append({"function": name, "size": size, "nesting": nesting, "sparsity": sparsity, **stats})
+                print(f"{name:<26} n={size:<8} shape={nesting}:{sparsity:<4} "
+                      f"median {stats['seconds_median'] * 1000:10.2f} ms  peak {stats['peak_bytes'] / 2**20:8.1f} MiB",
+                      flush=True)
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def _key(result: Dict[str, Any]) -> Tuple:
+    return result["function"], result["size"], result["nesting"], result["sparsity"]
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float, memory_threshold: float) -> List[str]:
+    """Print a comparison table and return the regressed benchmarks"""
+    previous = {_key(result): result for result in baseline["results"]}
+    regressions = []
+    print(f"{'benchmark':<46} {'time':>10} {'change':>8} {'peak MiB':>10} {'change':>8}")
+    for result in current["results"]:
+        key = _key(result)
+        label = f"{key[0]} n={key[1]} shape={key[2]}:{key[3]}"
+        before = previous.get(key)
+        if before is None:
+            print(f"{label:<46} {result['seconds_median'] * 1000:>8.1f}ms {'new':>8}")
+            continue
+        time_change = result["seconds_median"] / before["seconds_median"] - 1 if before["seconds_median"] else 0.0
+        memory_change = result["peak_bytes"] / before["peak_bytes"] - 1 if before["peak_bytes"] else 0.0
+        flags = []
+        if time_change > threshold:
+            flags.append("SLOWER")
+        if memory_change > memory_threshold:
+            flags.append("MORE MEMORY")
+        print(f"{label:<46} {result['seconds_median'] * 1000:>8.1f}ms {time_change:>+8.1%} "
+              f"{result['peak_bytes'] / 2**20:>10.1f} {memory_change:>+8.1%} {' '.join(flags)}")
+        if flags:
+            regressions.append(f"{label}: {', '.join(flags)}")
+    return regressions
+
+
+def _shapes(value: str) -> List[Tuple[int, float]]:
+    shapes = []
+    for part in value.split(","):
+        nesting, _, sparsity = part.partition(":")
+        shapes.append((int(nesting), float(sparsity or 0.0)))
+    return shapes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmarks and write a results file")
+    run_parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated sizes, up to 1000000")
+    run_parser.add_argument("--shapes", default=DEFAULT_SHAPES, help="Comma-separated NESTING:SPARSITY pairs")
+    run_parser.add_argument("--functions", default=",".join(BENCHMARKS), help=f"Subset of {', '.join(BENCHMARKS)}")
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--output", default="benchmark_results.json")
+
+    compare_parser = commands.add_parser("compare", help="Compare a results file against a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="Allowed relative slowdown")
+    compare_parser.add_argument("--memory-threshold", type=float, default=0.10, help="Allowed relative peak memory growth")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        functions = args.functions.split(",")
+        unknown = set(functions) - set(BENCHMARKS)
+        if unknown:
+            parser.error(f"Unknown functions: {', '.join(sorted(unknown))}")
+        results = run([int(size) for size in args.sizes.split(",")], _shapes(args.shapes), functions, args.repeat)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {len(results['results'])} results to {args.output}")
+    else:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        with open(args.current, encoding="utf-8") as f:
+            current = json.load(f)
+        regressions = compare(baseline, current, args.threshold, args.memory_threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond the threshold:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# benchmarks/load_test.py
+"""Open-loop load test of the /api/v1 endpoints at a target request rate.
+
+Usage: python -m benchmarks.load_test --rps 50 --duration 60 [--mix search=8,profile=2]
+                                      [--base-url http://127.0.0.1:8000/api/v1] [--json results.json]
+
+Requests are started on a fixed schedule whether or not earlier ones have
+finished, and latency is measured from the scheduled start, so a stalled
+server shows up in the percentiles instead of lowering the offered load.
+A scenario whose every request fails is reported as broken and makes the
+run exit with status 1, since its latencies only measure the error path.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.synthetic import FIRST_NAMES, LAST_NAMES
+
+PERCENTILES = (50, 90, 95, 99, 99.9)
+
+
+def search_request(rng: random.Random, case_id: Optional[str]) -> Tuple[str, str, Optional[Dict]]:
+    return "POST", "/search/name", {"name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"}
+
+
+def profile_request(rng: random.Random, case_id: Optional[str]) -> Tuple[str, str, Optional[Dict]]:
+    return "POST", f"/profiles/{1000000 + rng.randrange(100000)}", None
+
+
+def case_request(rng: random.Random, case_id: Optional[str]) -> Tuple[str, str, Optional[Dict]]:
+    return "GET", f"/screening/cases/{case_id}", None
+
+
+def matches_request(rng: random.Random, case_id: Optional[str]) -> Tuple[str, str, Optional[Dict]]:
+    return "GET", f"/screening/cases/{case_id}/matches", None
+
+
+SCENARIOS = {
+    "search": search_request,
+    "profile": profile_request,
+    "case": case_request,
+    "matches": matches_request,
+}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Unknown scenario {name}; expected one of {sorted(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def run_load(base_url: str, rps: float, duration: float, mix: Dict[str, float],
+                   case_id: Optional[str] = None, max_in_flight: int = 1000,
+                   timeout: float = 60.0, seed: int = 42) -> Dict:
+    rng = random.Random(seed)
+    names, weights = zip(*mix.items())
+    results: List[Tuple[str, float, str]] = []
+    dropped = 0
+    in_flight = 0
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        async def fire(scenario: str, scheduled: float):
+            nonlocal in_flight
+            method, path, body = SCENARIOS[scenario](rng, case_id)
+            try:
+                response = await client.request(method, path, json=body)
+                outcome = str(response.status_code)
+            except httpx.TimeoutException:
+                outcome = "timeout"
+            except httpx.HTTPError as e:
+                outcome = type(e).__name__
+            finally:
+                in_flight -= 1
+            results.append((scenario, time.perf_counter() - scheduled, outcome))
+
+        tasks = []
+        started = time.perf_counter()
+        total = int(rps * duration)
+        for i in range(total):
+            scheduled = started + i / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if in_flight >= max_in_flight:
+                dropped += 1
+                continue
+            in_flight += 1
+            tasks.append(asyncio.create_task(fire(rng.choices(names, weights)[0], scheduled)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    return summarize(results, elapsed, rps, dropped)
+
+
+def summarize(results: List[Tuple[str, float, str]], elapsed: float, target_rps: float, dropped: int) -> Dict:
+    def stats(rows):
+        latencies = sorted(latency for _, latency, _ in rows)
+        outcomes = Counter(outcome for _, _, outcome in rows)
+        errors = sum(count for outcome, count in outcomes.items() if not outcome.startswith("2"))
+        return {
+            "requests": len(rows),
+            "error_rate": errors / len(rows) if rows else 0.0,
+            "outcomes": dict(outcomes),
+            "latency_ms": {f"p{pct:g}": round(percentile(latencies, pct) * 1000, 2) for pct in PERCENTILES},
+            "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        }
+
+    by_scenario = {}
+    for scenario in sorted({row[0] for row in results}):
+        by_scenario[scenario] = stats([row for row in results if row[0] == scenario])
+    return {
+        "target_rps": target_rps,
+        "achieved_rps": round(len(results) / elapsed, 2) if elapsed else 0.0,
+        "duration_s": round(elapsed, 2),
+        "dropped": dropped,
+        "overall": stats(results),
+        "scenarios": by_scenario,
+    }
+
+
+def print_report(report: Dict):
+    print(f"target {report['target_rps']} rps, achieved {report['achieved_rps']} rps over "
+          f"{report['duration_s']}s, {report['dropped']} dropped at the in-flight limit")
+    header = f"{'scenario':<10} {'requests':>8} {'errors':>7} " + " ".join(f"{'p' + format(p, 'g'):>8}" for p in PERCENTILES) + f" {'max':>8}"
+    print(header)
+    for name, stats in [("overall", report["overall"])] + list(report["scenarios"].items()):
+        row = f"{name:<10} {stats['requests']:>8} {stats['error_rate']:>7.2%} "
+        row += " ".join(f"{value:>8.1f}" for value in stats["latency_ms"].values())
+        print(row + f" {stats['max_ms']:>8.1f}")
+    print(f"outcomes: {report['overall']['outcomes']}")
+    for name in broken_scenarios(report):
+        print(f"BROKEN: every {name} request failed ({report['scenarios'][name]['outcomes']})")
+
+
+def broken_scenarios(report: Dict) -> List[str]:
+    return [name for name, stats in report["scenarios"].items() if stats["requests"] and stats["error_rate"] == 1.0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000/api/v1")
+    parser.add_argument("--rps", type=float, default=20.0)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("search=8,profile=2"),
+                        help=f"Weighted scenarios out of {sorted(SCENARIOS)}, e.g. search=8,matches=1")
+    parser.add_argument("--case-id", help="Existing case for the case and matches scenarios")
+    parser.add_argument("--max-in-flight", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    if {"case", "matches"} & set(args.mix) and not args.case_id:
+        parser.error("--case-id is required for the case and matches scenarios")
+
+    report = asyncio.run(run_load(args.base_url, args.rps, args.duration, args.mix, args.case_id,
+                                  args.max_in_flight, args.timeout, args.seed))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if broken_scenarios(report):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# benchmarks/match_records.py
+"""Memory of flattened matches held as dicts versus slotted MatchRecords.
+
+Usage: python -m benchmarks.match_records [--count 100000]
+"""
+import argparse
+import gc
+import tracemalloc
+
+from benchmarks.synthetic import generate_matches
+from cron.match_record import MatchRecord, flatten_match
+
+
+def measure(build, matches):
+    gc.collect()
+    tracemalloc.start()
+    held = build(matches)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    return current, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=100000)
+    args = parser.parse_args()
+
+    matches = list(generate_matches(args.count))
+    results = {
+        "flattened dicts": measure(lambda ms: [flatten_match(m) for m in ms], matches),
+        "MatchRecord": measure(lambda ms: [MatchRecord.from_match(m) for m in ms], matches),
+    }
+
+    baseline = results["flattened dicts"][0]
+    print(f"{args.count} synthetic matches")
+    for name, (current, peak) in results.items():
+        print(f"  {name:<16} held {current / 2**20:8.1f} MiB  peak {peak / 2**20:8.1f} MiB  "
+              f"({current / baseline:.0%} of dicts)")
+
+
+if __name__ == "__main__":
+    main()
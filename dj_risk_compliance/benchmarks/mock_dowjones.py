@@ -0,0 +1,270 @@
+# benchmarks/mock_dowjones.py
+"""Local stand-in for the Dow Jones auth and Risk & Compliance APIs.
+
+Usage: python -m benchmarks.mock_dowjones [--port 9000] [--latency default=lognormal:80:0.5]
+                                          [--processing-delay 5] [--rate-429 0.01] [--rate-5xx 0.005]
+
+Point the service at it with DJ_AUTH_URL=http://127.0.0.1:9000 and
+DJ_API_HOST=http://127.0.0.1:9000.
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from benchmarks.synthetic import generate_match
+
+# Latency is drawn per endpoint class; unknown classes use "default"
+ENDPOINT_CLASSES = ("auth", "search", "profile", "submit", "transaction", "case", "matches")
+
+
+class LatencyModel:
+    """Latency distribution parsed from "fixed:MS", "uniform:LO_MS:HI_MS" or "lognormal:MEDIAN_MS:SIGMA" """
+
+    def __init__(self, spec: str):
+        kind, *params = spec.split(":")
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+        self.kind = kind
+        self.params = [float(param) for param in params]
+
+    def sample(self, rng: random.Random) -> float:
+        """Seconds to wait"""
+        if self.kind == "fixed":
+            return self.params[0] / 1000
+        if self.kind == "uniform":
+            return rng.uniform(self.params[0], self.params[1]) / 1000
+        median, sigma = self.params
+        return rng.lognormvariate(0.0, sigma) * median / 1000
+
+
+@dataclass
+class MockConfig:
+    latency: Dict[str, LatencyModel] = field(default_factory=lambda: {"default": LatencyModel("lognormal:80:0.5")})
+    processing_delay: float = 5.0
+    processing_per_name: float = 0.001
+    matches_per_name: float = 3.0
+    search_hits: int = 20
+    rate_202: float = 0.0
+    rate_429: float = 0.0
+    rate_5xx: float = 0.0
+    token_ttl: int = 3600
+    gzip_requests: bool = True
+    seed: int = 42
+
+
+@dataclass
+class MockCase:
+    case_id: str
+    names: List[str] = field(default_factory=list)
+    transactions: Dict[str, float] = field(default_factory=dict)
+    ready_at: float = 0.0
+
+
+def endpoint_class(path: str) -> str:
+    if path.startswith("/oauth2"):
+        return "auth"
+    if path.startswith("/riskentities/search"):
+        return "search"
+    if path.startswith("/riskentities/profiles"):
+        return "profile"
+    if "/bulk-associations/" in path:
+        return "transaction"
+    if path.endswith("/bulk-associations"):
+        return "submit"
+    if path.endswith("/matches"):
+        return "matches"
+    return "case"
+
+
+async def read_json(request: Request) -> Any:
+    """Request body as JSON, decompressing a gzip-encoded body"""
+    body = await request.body()
+    if request.headers.get("content-encoding", "").lower() == "gzip":
+        body = gzip.decompress(body)
+    return json.loads(body)
+
+
+def create_app(config: MockConfig) -> FastAPI:
+    app = FastAPI(title="Dow Jones stand-in")
+    rng = random.Random(config.seed)
+    cases: Dict[str, MockCase] = {}
+
+    @app.middleware("http")
+    async def latency_and_faults(request: Request, call_next):
+        kind = endpoint_class(request.url.path)
+        encoding = request.headers.get("content-encoding", "").lower()
+        if encoding and (encoding != "gzip" or not config.gzip_requests):
+            return JSONResponse({"errors": [{"status": 415, "detail": f"Unsupported content encoding {encoding}"}]},
+                                status_code=415)
+        model = config.latency.get(kind) or config.latency["default"]
+        await asyncio.sleep(model.sample(rng))
+        # Faults are not injected on the token endpoint so they do not cascade into auth retries
+        if kind != "auth":
+            roll = rng.random()
+            if roll < config.rate_429:
+                return JSONResponse({"errors": [{"status": 429, "detail": "Too many requests"}]},
+                                    status_code=429, headers={"Retry-After": "1"})
+            if roll < config.rate_429 + config.rate_5xx:
+                status = rng.choice([500, 502, 503])
+                return JSONResponse({"errors": [{"status": status, "detail": "Injected failure"}]}, status_code=status)
+        return await call_next(request)
+
+    @app.post("/oauth2/v1/token")
+    async def token(request: Request):
+        body = await read_json(request)
+        if body.get("grant_type") == "password":
+            return {"id_token": uuid.uuid4().hex, "refresh_token": uuid.uuid4().hex}
+        return {"token_type": "Bearer", "access_token": uuid.uuid4().hex, "expires_in": config.token_ttl}
+
+    @app.post("/riskentities/search")
+    async def search(request: Request):
+        body = await read_json(request)
+        paging = body.get("data", {}).get("attributes", {}).get("paging", {})
+        limit = min(int(paging.get("limit", 20)), config.search_hits)
+        hits = [generate_match(rng, rng.randrange(10**6)) for _ in range(limit)]
+        return {"data": hits, "meta": {"total_count": config.search_hits}}
+
+    @app.get("/riskentities/profiles/{profile_id}")
+    async def profile(profile_id: str):
+        match = generate_match(random.Random(profile_id), 0, nesting=4, sparsity=0.0)
+        return {"data": {"id": profile_id, "type": "RiskEntityProfile", "attributes": match}}
+
+    def submit(case: MockCase, associations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        names = [association.get("names", [{}])[0].get("single_string_name", "") for association in associations]
+        case.names.extend(names)
+        transaction_id = uuid.uuid4().hex
+        ready_at = time.monotonic() + config.processing_delay + config.processing_per_name * len(names)
+        case.transactions[transaction_id] = ready_at
+        case.ready_at = max(case.ready_at, ready_at)
+        return {
+            "data": {
+                "id": transaction_id,
+                "type": "risk-entity-screening-cases/bulk-associations",
+                "attributes": {"case_id": case.case_id, "status": "PENDING", "associations_count": len(names)}
+            }
+        }
+
+    @app.post("/risk-entity-screening-cases/bulk-associations")
+    async def create_case(request: Request):
+        body = await read_json(request)
+        attributes = body.get("data", {}).get("attributes", {})
+        associations = attributes.get("case_info", {}).get("associations", [])
+        case = MockCase(case_id=uuid.uuid4().hex)
+        cases[case.case_id] = case
+        return submit(case, associations)
+
+    @app.post("/risk-entity-screening-cases/{case_id}/bulk-associations")
+    async def add_associations(case_id: str, request: Request):
+        case = cases.get(case_id)
+        if case is None:
+            return JSONResponse({"errors": [{"status": 404, "detail": "Case not found"}]}, status_code=404)
+        body = await read_json(request)
+        return submit(case, body.get("data", {}).get("attributes", {}).get("associations", []))
+
+    @app.get("/risk-entity-screening-cases/{case_id}/bulk-associations/{transaction_id}")
+    async def transaction(case_id: str, transaction_id: str):
+        case = cases.get(case_id)
+        if case is None or transaction_id not in case.transactions:
+            return JSONResponse({"errors": [{"status": 404, "detail": "Transaction not found"}]}, status_code=404)
+        status = "COMPLETED" if time.monotonic() >= case.transactions[transaction_id] else "PROCESSING"
+        return {"data": {"id": transaction_id, "attributes": {"case_id": case_id, "status": status}}}
+
+    @app.get("/risk-entity-screening-cases/{case_id}")
+    async def get_case(case_id: str):
+        case = cases.get(case_id)
+        if case is None:
+            return JSONResponse({"errors": [{"status": 404, "detail": "Case not found"}]}, status_code=404)
+        return {"data": {"id": case_id, "attributes": {"case_id": case_id, "associations_count": len(case.names)}}}
+
+    @app.get("/risk-entity-screening-cases")
+    async def list_cases():
+        return {"data": [{"id": case_id, "attributes": {"case_id": case_id}} for case_id in cases]}
+
+    @app.get("/risk-entity-screening-cases/{case_id}/matches")
+    async def matches(case_id: str, request: Request):
+        case = cases.get(case_id)
+        if case is None:
+            return JSONResponse({"errors": [{"status": 404, "detail": "Case not found"}]}, status_code=404)
+        if time.monotonic() < case.ready_at or rng.random() < config.rate_202:
+            return JSONResponse({"errors": [{"status": 202, "detail": "Matches are being processed"}]}, status_code=202)
+
+        limit = int(request.query_params.get("page[limit]", 100))
+        offset = int(request.query_params.get("page[offset]", 0))
+        data = []
+        for position in range(offset, min(offset + limit, len(case.names))):
+            # Matches are derived from the case and position so every page fetch is repeatable
+            item_rng = random.Random(f"{case_id}:{position}")
+            count = int(item_rng.expovariate(1 / config.matches_per_name)) if config.matches_per_name else 0
+            data.append({
+                "id": f"{case_id}-{position}",
+                "type": "risk-entity-screening-cases/matches",
+                "attributes": {
+                    "names": [{"single_string_name": case.names[position], "name_type": "PRIMARY"}],
+                    "matches": [generate_match(item_rng, position * 1000 + i) for i in range(count)]
+                }
+            })
+        body: Dict[str, Any] = {"data": data, "meta": {"total_count": len(case.names)}}
+        if offset + limit < len(case.names):
+            body["links"] = {"next": f"{request.url.path}?page[offset]={offset + limit}&page[limit]={limit}"}
+        return body
+
+    return app
+
+
+def parse_latency(values: Optional[List[str]]) -> Dict[str, LatencyModel]:
+    latency = {"default": LatencyModel("lognormal:80:0.5")}
+    for value in values or []:
+        kind, _, spec = value.partition("=")
+        if kind not in ENDPOINT_CLASSES + ("default",):
+            raise ValueError(f"Unknown endpoint class {kind}; expected one of {ENDPOINT_CLASSES}")
+        latency[kind] = LatencyModel(spec)
+    return latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", action="append", metavar="CLASS=SPEC",
+                        help=f"Latency for an endpoint class ({', '.join(ENDPOINT_CLASSES)} or default), "
+                             "e.g. matches=lognormal:400:0.4; may be repeated")
+    parser.add_argument("--processing-delay", type=float, default=5.0, help="Seconds before a submitted transaction completes")
+    parser.add_argument("--processing-per-name", type=float, default=0.001, help="Extra processing seconds per submitted name")
+    parser.add_argument("--matches-per-name", type=float, default=3.0, help="Mean number of matches per screened name")
+    parser.add_argument("--search-hits", type=int, default=20)
+    parser.add_argument("--rate-202", type=float, default=0.0, help="Probability a ready matches request still answers 202")
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-5xx", type=float, default=0.0)
+    parser.add_argument("--token-ttl", type=int, default=3600)
+    parser.add_argument("--no-gzip-requests", action="store_true", help="Answer gzip-encoded request bodies with 415")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    config = MockConfig(
+        latency=parse_latency(args.latency),
+        processing_delay=args.processing_delay,
+        processing_per_name=args.processing_per_name,
+        matches_per_name=args.matches_per_name,
+        search_hits=args.search_hits,
+        rate_202=args.rate_202,
+        rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx,
+        token_ttl=args.token_ttl,
+        gzip_requests=not args.no_gzip_requests,
+        seed=args.seed
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
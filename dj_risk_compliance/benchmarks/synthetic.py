@@ -0,0 +1,74 @@
+# benchmarks/synthetic.py
+import random
+from typing import Any, Dict, Iterator, List
+
+MATCH_TYPES = ["Precise", "Near", "Broad"]
+SUBSCRIPTIONS = ["WL", "SOC", "AM", "PEP"]
+COUNTRIES = ["US", "GB", "FR", "DE", "AE", "NG", "RU", "CN", "BR", "IN"]
+FIRST_NAMES = ["John", "Maria", "Ahmed", "Wei", "Olga", "Carlos", "Aisha", "Pierre"]
+LAST_NAMES = ["Smith", "Garcia", "Khan", "Zhang", "Ivanova", "Silva", "Okafor", "Dubois"]
+
+
+def generate_match(rng: random.Random, index: int, nesting: int = 2, sparsity: float = 0.2) -> Dict[str, Any]:
+    """One match shaped like an item of a Dow Jones matches response.
+
+    ``nesting`` sets the number of list entries in nested fields (birthdates,
+    countries, identifications) and ``sparsity`` the probability that an
+    optional attribute is left out.
+    """
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    match = {
+        "peid": str(1000000 + index),
+        "subscription_name": rng.choice(SUBSCRIPTIONS),
+        "primary_name": {"first_name": first, "middle_name": "", "last_name": last, "entity_name": None},
+        "match_name": f"{first} {last}",
+        "match_type": rng.choice(MATCH_TYPES),
+        "match_id": f"m-{index}",
+        "gender": rng.choice(["Male", "Female", "Unknown"]),
+        "score": round(rng.random(), 3),
+        "is_match_valid": True,
+        "has_alerts": rng.random() < 0.5,
+        "birthdates": [
+            {"day": rng.randint(1, 28), "month": rng.randint(1, 12), "year": rng.randint(1940, 2000)}
+            for _ in range(nesting)
+        ],
+    }
+    if rng.random() >= sparsity:
+        match["countries"] = [{"code": rng.choice(COUNTRIES), "type": "Citizenship"} for _ in range(nesting)]
+    if rng.random() >= sparsity:
+        match["identifications"] = [{"type": "Passport", "value": f"P{rng.randint(10**7, 10**8)}"} for _ in range(nesting)]
+    if rng.random() >= sparsity:
+        match["content_category"] = {"watchlist": True, "adverse_media": rng.random() < 0.3}
+    if rng.random() >= 1 - sparsity / 10:
+        # Rare attribute that only shows up late in large cases
+        match["rare_flags"] = {f"flag_{rng.randint(0, 50)}": True}
+    return match
+
+
+def generate_matches(count: int, nesting: int = 2, sparsity: float = 0.2, seed: int = 42) -> Iterator[Dict[str, Any]]:
+    rng = random.Random(seed)
+    for index in range(count):
+        yield generate_match(rng, index, nesting, sparsity)
+
+
+def generate_matches_response(
+    count: int,
+    matches_per_association: int = 5,
+    nesting: int = 2,
+    sparsity: float = 0.2,
+    seed: int = 42
+) -> Dict[str, Any]:
+    """A full matches response with matches grouped under association items"""
+    data: List[Dict[str, Any]] = []
+    matches = list(generate_matches(count, nesting, sparsity, seed))
+    for start in range(0, count, matches_per_association):
+        position = start // matches_per_association
+        data.append({
+            "id": f"a-{position}",
+            "type": "risk-entity-screening-cases/matches",
+            "attributes": {
+                "names": [{"single_string_name": f"Input Name {position}", "name_type": "PRIMARY"}],
+                "matches": matches[start:start + matches_per_association]
+            }
+        })
+    return {"data": data, "meta": {"count": count}}
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+
+logger = logging.getLogger(__name__)
+
+
+def is_session_active(sftp):
+    try:
+        channel = sftp.get_channel()
+        return not channel.closed and channel.get_transport().is_active()
+    except Exception:
+        return False
+
+def close_session(sftp):
+    """Close an SFTP session together with its underlying transport"""
+    try:
+        transport = sftp.get_channel().get_transport()
+        sftp.close()
+        transport.close()
+    except Exception:
+        pass
+
+
+class AsyncSFTPPool:
+    """Pool of paramiko SFTP sessions driven from asyncio.
+
+    paramiko is blocking, so every operation runs on a dedicated thread pool
+    sized to the session pool; the event loop stays free for API calls while
+    transfers are in flight. A session is used by one operation at a time,
+    dead sessions are dropped and replaced on the next checkout.
+    """
+
+    def __init__(self, name, connect, size=2, keepalive=None):
+        self.name = name
+        self.size = max(1, size)
+        self._connect = connect
+        self._keepalive = keepalive
+        self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix=f"sftp-{name}")
+        self._idle = []
+        self._open = 0
+        self._available = None
+
+    def _condition(self):
+        if self._available is None:
+            self._available = asyncio.Condition()
+        return self._available
+
+    def _new_session(self):
+        sftp = self._connect()
+        if self._keepalive:
+            sftp.get_channel().get_transport().set_keepalive(self._keepalive)
+        logger.info(f"Opened SFTP session to {self.name}")
+        return sftp
+
+    async def _acquire(self):
+        available = self._condition()
+        async with available:
+            while True:
+                while self._idle:
+                    sftp = self._idle.pop()
+                    if is_session_active(sftp):
+                        return sftp
+                    self._open -= 1
+                    close_session(sftp)
+                if self._open < self.size:
+                    self._open += 1
+                    break
+                await available.wait()
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, self._new_session)
+        except Exception:
+            async with available:
+                self._open -= 1
+                available.notify()
+            raise
+
+    async def _release(self, sftp):
+        available = self._condition()
+        async with available:
+            if not is_session_active(sftp):
+                self._open -= 1
+                close_session(sftp)
+            else:
+                self._idle.append(sftp)
+            available.notify()
+
+    async def run(self, func, *args):
+        """Run ``func(sftp, *args)`` on a pooled session in the SFTP executor"""
+        sftp = await self._acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, sftp, *args)
+        finally:
+            await self._release(sftp)
+
+    async def close(self):
+        available = self._condition()
+        async with available:
+            for sftp in self._idle:
+                close_session(sftp)
+            self._open -= len(self._idle)
+            self._idle.clear()
+        self._executor.shutdown(wait=False)
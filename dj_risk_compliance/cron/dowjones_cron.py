@@ -1,12 +1,30 @@
 import os
+import argparse
+import codecs
+import csv
+import fnmatch
+import socket
+import uuid
 import json
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timezone
 import paramiko
 import asyncio
+import time
+from contextlib import contextmanager
 from app.services.dj_api import DowJonesAPIService
+from app.services.name_normalization import dedupe_names, fan_out_matches, normalize_name
+from app.api.models import MatchFilters
+from app.cassette import get_cassette, scaled_delay
+from cron.output_diff import diff_output, commit_index
+from cron.async_sftp import AsyncSFTPPool
+from cron.sftp_cassette import RecordingSFTP, ReplaySFTP
+from cron.match_record import MatchRecord, PRIORITY_COLUMNS, flatten_match
+from cron.work_queue import WorkQueue
+from app.services.match_store import get_match_store
+from app.metrics import (CRON_MATCHES, CRON_RUNS, CRON_STAGE_DURATION, DOWNLOAD_CACHE,
+                         PIPELINE_QUEUE_DEPTH, POLLS, REGISTRY, RETRIES, SFTP_BYTES)
 import logging
-from logging.handlers import TimedRotatingFileHandler
 
 
 SFTP_CONFIGS = {
@@ -16,7 +34,10 @@ SFTP_CONFIGS = {
         'username': os.getenv('SFTP_INPUT_USER'),
         'password': os.getenv('SFTP_INPUT_PASS'),
         'remote_path': os.getenv('SFTP_INPUT_REMOTE_PATH'),
-        'specific_filename': os.getenv('SFTP_INPUT_FILENAME')
+        'specific_filename': os.getenv('SFTP_INPUT_FILENAME'),
+        # Multi-file mode: every file matching the pattern is screened and then archived
+        'file_pattern': os.getenv('SFTP_INPUT_PATTERN'),
+        'archive_path': os.getenv('SFTP_INPUT_ARCHIVE_PATH')
     },
     'output_server': {
         'hostname': os.getenv('SFTP_OUTPUT_HOST'),
@@ -30,17 +51,60 @@ SFTP_CONFIGS = {
 LOCAL_PATHS = {
     'input':os.getenv('LOCAL_INPUT_PATH'),
     'output': os.getenv('LOCAL_OUTPUT_PATH'),
-    'logs':  os.getenv('LOCAL_LOG_PATH')
+    'logs':  os.getenv('LOCAL_LOG_PATH'),
+    'state': os.getenv('LOCAL_STATE_PATH') or os.getenv('LOCAL_OUTPUT_PATH')
 }
 
 
-PRIORITY_COLUMNS = [
-    'peid', 'subscription_name', 'primary_name_entity_name',
-    'primary_name_first_name', 'primary_name_middle_name',
-    'primary_name_last_name', 'match_name', 'match_type',
-    'match_id', 'gender', 'birthdates_0_day',
-    'birthdates_0_month', 'birthdates_0_year'
-]
+# Streaming export: rows are flushed to disk every EXPORT_BATCH_SIZE matches and
+# the CSV header is fixed after sampling the first SCHEMA_SAMPLE_SIZE matches.
+EXPORT_BATCH_SIZE = int(os.getenv('DJ_EXPORT_BATCH_SIZE', '1000'))
+SCHEMA_SAMPLE_SIZE = int(os.getenv('DJ_SCHEMA_SAMPLE_SIZE', '500'))
+MATCHES_PAGE_LIMIT = int(os.getenv('DJ_MATCHES_PAGE_LIMIT', '5000'))
+
+DOWNLOAD_CHUNK_SIZE = int(os.getenv('SFTP_DOWNLOAD_CHUNK_SIZE', str(1024 * 1024)))
+DOWNLOAD_PREFETCH_REQUESTS = int(os.getenv('SFTP_PREFETCH_REQUESTS', '64'))
+
+UPLOAD_TARGETS = ['input_server', 'output_server']
+UPLOAD_MAX_RETRIES = int(os.getenv('SFTP_UPLOAD_RETRIES', '3'))
+UPLOAD_RETRY_DELAY = 5
+
+SFTP_POOL_SIZE = int(os.getenv('SFTP_POOL_SIZE', '2'))
+
+# Pipelined screening: names are submitted in chunks while the file is still being parsed,
+# and stages hand work to each other through bounded queues of PIPELINE_QUEUE_SIZE items
+SUBMIT_CHUNK_SIZE = int(os.getenv('DJ_SUBMIT_CHUNK_SIZE', '1000'))
+PIPELINE_QUEUE_SIZE = int(os.getenv('DJ_PIPELINE_QUEUE_SIZE', '4'))
+
+# Sharded mode: a coordinator splits the input into shards in a SQLite work queue on shared
+# storage, worker processes screen them and write shard CSVs to WORK_DIR for the merge
+WORK_QUEUE_PATH = os.getenv('DJ_WORK_QUEUE_PATH', 'dj_work_queue.db')
+WORK_DIR = os.getenv('DJ_WORK_DIR') or os.path.join(os.path.dirname(os.path.abspath(WORK_QUEUE_PATH)), 'shards')
+SHARD_SIZE = int(os.getenv('DJ_SHARD_SIZE', '5000'))
+WORKER_LEASE_SECONDS = int(os.getenv('DJ_WORKER_LEASE_SECONDS', '900'))
+WORKER_POLL_INTERVAL = 5
+
+# Standing case mode: one long-lived case per input source, synced incrementally
+STANDING_CASE_MODE = os.getenv('DJ_STANDING_CASE', 'false').lower() in ('1', 'true', 'yes')
+
+# Emit DJ_Response_delta.csv with the rows added, changed or removed since the previous run
+OUTPUT_DIFF_ENABLED = os.getenv('DJ_OUTPUT_DIFF', 'true').lower() in ('1', 'true', 'yes')
+
+MAX_CONCURRENT_FILES = int(os.getenv('DJ_MAX_CONCURRENT_FILES', '3'))
+
+DAEMON_POLL_INTERVAL = int(os.getenv('DJ_DAEMON_POLL_INTERVAL', '15'))
+DAEMON_RESCREEN_INTERVAL = int(os.getenv('DJ_DAEMON_RESCREEN_INTERVAL', str(24 * 60 * 60)))
+DAEMON_KEEPALIVE_INTERVAL = 30
+DAEMON_RETRY_MAX_DELAY = int(os.getenv('DJ_DAEMON_RETRY_MAX_DELAY', '3600'))
+
+# Run outcomes after which an unchanged input file is not screened again
+DAEMON_DONE_STATUSES = ('completed', 'no_matches', 'invalid')
+
+# Metrics export after each run: a node_exporter textfile and/or a Pushgateway
+METRICS_TEXTFILE_PATH = os.getenv('DJ_METRICS_TEXTFILE')
+METRICS_PUSHGATEWAY_URL = os.getenv('DJ_METRICS_PUSHGATEWAY')
+METRICS_JOB = os.getenv('DJ_METRICS_JOB', 'dj_cron')
+
 def ensure_directory_exists(path):
     os.makedirs(path, exist_ok=True)
 
@@ -77,56 +141,129 @@ logger = setup_logging()
 
 
 
-def get_sftp_connection(config):
+def get_sftp_connection(config, server=None):
+    """Open an SFTP session; with a cassette the session is recorded, or replayed without connecting"""
+    cassette = get_cassette()
+    if cassette is not None and cassette.replaying:
+        return ReplaySFTP(server, cassette)
     transport = paramiko.Transport((config['hostname'], config['port']))
     transport.connect(
         username=config['username'],
         password=config['password']
     )
-    return paramiko.SFTPClient.from_transport(transport)
+    sftp = paramiko.SFTPClient.from_transport(transport)
+    return RecordingSFTP(sftp, server, cassette) if cassette is not None else sftp
 
-def download_specific_file(sftp):
+def is_cached_copy(local_path, remote_stat):
+    """True when the local file has the remote file's size and modification time"""
+    if not os.path.exists(local_path):
+        return False
+    local_stat = os.stat(local_path)
+    return local_stat.st_size == remote_stat.st_size and int(local_stat.st_mtime) == int(remote_stat.st_mtime)
+
+def download_specific_file(sftp, filename=None):
+    """Download an input file in pipelined fixed-size chunks.
+
+    Skips the transfer when the cached local copy matches the remote size and
+    mtime, and resumes an interrupted ``.part`` download from its current
+    offset as long as the remote file has not changed since.
+    """
+    filename = filename or SFTP_CONFIGS['input_server']['specific_filename']
     ensure_directory_exists(LOCAL_PATHS['input'])
-    remote_path = f"{SFTP_CONFIGS['input_server']['remote_path']}/{SFTP_CONFIGS['input_server']['specific_filename']}"
-    local_path = os.path.join(LOCAL_PATHS['input'], SFTP_CONFIGS['input_server']['specific_filename'])
+    remote_path = f"{SFTP_CONFIGS['input_server']['remote_path']}/{filename}"
+    local_path = os.path.join(LOCAL_PATHS['input'], filename)
+    partial_path = f"{local_path}.part"
     
     try:
-        with sftp.file(remote_path, 'rb') as remote_file:
-            with open(local_path, 'wb') as local_file:
-                local_file.write(remote_file.read())
-                
-        logger.info(f"Downloaded {SFTP_CONFIGS['input_server']['specific_filename']} to {local_path}")
+        remote_stat = sftp.stat(remote_path)
+        remote_times = (remote_stat.st_atime, remote_stat.st_mtime)
+        
+        if is_cached_copy(local_path, remote_stat):
+            DOWNLOAD_CACHE.inc(result="hit")
+            logger.info(f"{filename} unchanged since last download, using cached copy at {local_path}")
+            return local_path
+        
+        DOWNLOAD_CACHE.inc(result="miss")
+        # The partial file carries the remote mtime, so a changed remote file restarts the download
+        offset = 0
+        if os.path.exists(partial_path):
+            partial_stat = os.stat(partial_path)
+            if int(partial_stat.st_mtime) == int(remote_stat.st_mtime) and partial_stat.st_size <= remote_stat.st_size:
+                offset = partial_stat.st_size
+        
+        with sftp.open(remote_path, 'rb') as remote_file:
+            remote_file.seek(offset)
+            remote_file.prefetch(remote_stat.st_size, max_concurrent_requests=DOWNLOAD_PREFETCH_REQUESTS)
+            
+            with open(partial_path, 'ab' if offset else 'wb') as local_file:
+                while True:
+                    chunk = remote_file.read(DOWNLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    local_file.write(chunk)
+                    SFTP_BYTES.inc(len(chunk), direction="download", server="input_server")
+                    local_file.flush()
+                    os.utime(partial_path, remote_times)
+        
+        os.replace(partial_path, local_path)
+        os.utime(local_path, remote_times)
+        
+        if offset:
+            logger.info(f"Resumed {filename} from byte {offset} to {local_path}")
+        else:
+            logger.info(f"Downloaded {filename} to {local_path}")
         return local_path
     except Exception as e:
         logger.error(f"Failed to download file: {str(e)}")
         return None
-def upload_to_servers(local_csv_path):
-    """Upload CSV to both SFTP servers"""
-    results = {}
-    
-    # Upload  (original location)
+
+def put_atomic(sftp, local_path, remote_path):
+    """Upload under a temporary name and rename into place once complete"""
+    temp_path = f"{remote_path}.part"
+    sftp.put(local_path, temp_path)
     try:
-        with get_sftp_connection(SFTP_CONFIGS['input_server']) as sftp:
-            remote_path = f"{SFTP_CONFIGS['input_server']['remote_path']}/DJ_Response.csv"
-            sftp.put(local_csv_path, remote_path)
-            results['input_server'] = True
-            logger.info(f"Uploaded to server: {remote_path}")
-    except Exception as e:
-        results['input_server'] = False
-        logger.error(f"Failed to upload to server: {str(e)}")
+        sftp.posix_rename(temp_path, remote_path)
+    except IOError:
+        # Servers without the posix-rename extension refuse to overwrite on rename
+        try:
+            sftp.remove(remote_path)
+        except IOError:
+            pass
+        sftp.rename(temp_path, remote_path)
+
+def upload_to_target(target, local_csv_path, remote_filename, sftp=None):
+    """Upload to a single SFTP target with retries, reusing an open session if given"""
+    config = SFTP_CONFIGS[target]
+    remote_path = f"{config['remote_path']}/{remote_filename}"
+    result = {'success': False, 'attempts': 0, 'elapsed': 0.0, 'error': None}
+    started = time.monotonic()
     
-    # Upload to output server 
-    try:
-        with get_sftp_connection(SFTP_CONFIGS['output_server']) as sftp:
-            remote_path = f"{SFTP_CONFIGS['output_server']['remote_path']}/DJ_Response.csv"
-            sftp.put(local_csv_path, remote_path)
-            results['output_server'] = True
-            logger.info(f"Uploaded to output server: {remote_path}")
-    except Exception as e:
-        results['output_server'] = False
-        logger.error(f"Failed to upload to output server: {str(e)}")
+    for attempt in range(1, UPLOAD_MAX_RETRIES + 1):
+        result['attempts'] = attempt
+        try:
+            # Only trust a shared session on the first attempt; retry on a fresh one
+            if sftp is not None and attempt == 1:
+                put_atomic(sftp, local_csv_path, remote_path)
+            else:
+                with get_sftp_connection(config, target) as fresh_sftp:
+                    put_atomic(fresh_sftp, local_csv_path, remote_path)
+            SFTP_BYTES.inc(os.path.getsize(local_csv_path), direction="upload", server=target)
+            result['success'] = True
+            result['error'] = None
+            break
+        except Exception as e:
+            result['error'] = str(e)
+            logger.warning(f"Upload to {target} failed (attempt {attempt}/{UPLOAD_MAX_RETRIES}): {str(e)}")
+            if attempt < UPLOAD_MAX_RETRIES:
+                RETRIES.inc(operation="sftp_upload")
+                time.sleep(UPLOAD_RETRY_DELAY * attempt)
     
-    return results
+    result['elapsed'] = round(time.monotonic() - started, 3)
+    if result['success']:
+        logger.info(f"Uploaded to {target}: {remote_path} in {result['elapsed']}s ({result['attempts']} attempt(s))")
+    else:
+        logger.error(f"Failed to upload to {target} after {result['attempts']} attempt(s): {result['error']}")
+    return result
 
 def process_json_file(filepath):
     try:
@@ -150,24 +287,103 @@ def process_json_file(filepath):
         logger.error(f"Error processing JSON file: {str(e)}")
         return None
 
-def flatten_match(match):
-    flattened = {}
-    
-    for key, value in match.items():
-        if isinstance(value, dict):
-            for subkey, subvalue in value.items():
-                flattened[f"{key}_{subkey}"] = subvalue
-        elif isinstance(value, list):
-            for i, item in enumerate(value):
-                if isinstance(item, dict):
-                    for subkey, subvalue in item.items():
-                        flattened[f"{key}_{i}_{subkey}"] = subvalue
-                else:
-                    flattened[f"{key}_{i}"] = item
-        else:
-            flattened[key] = value
-    
-    return flattened
+class InputFileError(ValueError):
+    """The input names file is malformed"""
+
+def detect_encoding(filepath, block_size=1 << 20):
+    """utf-8-sig when the whole file decodes as UTF-8, latin-1 otherwise"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        with open(filepath, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                decoder.decode(block)
+            decoder.decode(b'', final=True)
+        return 'utf-8-sig'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+class JSONStreamReader:
+    """Minimal incremental reader over a JSON text file, one value at a time"""
+
+    def __init__(self, f, block_size=1 << 16):
+        self.f = f
+        self.block_size = block_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        chunk = '' if self.eof else self.f.read(self.block_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buf) or not self._fill():
+                return self.buf[self.pos:self.pos + 1]
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Invalid JSON: expected '{char}' at offset {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A number running into the end of the buffer may continue in the next block
+                if end < len(self.buf) or self.eof or not self._fill():
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+
+def iter_json_names(filepath):
+    """Yield the entries of the top-level "names" list without loading the whole file"""
+    with open(filepath, 'r', encoding=detect_encoding(filepath)) as f:
+        reader = JSONStreamReader(f)
+        if reader.peek() != '{':
+            raise ValueError("Invalid JSON format - expected {'names': [...]}")
+        reader.expect('{')
+        
+        while reader.peek() != '}':
+            key = reader.value()
+            reader.expect(':')
+            if key != 'names':
+                reader.value()
+            else:
+                if reader.peek() != '[':
+                    raise ValueError("'names' should be a list")
+                reader.expect('[')
+                while reader.peek() != ']':
+                    yield reader.value()
+                    if reader.peek() == ',':
+                        reader.expect(',')
+                reader.expect(']')
+                return
+            if reader.peek() == ',':
+                reader.expect(',')
+        
+        raise ValueError("Invalid JSON format - expected {'names': [...]}")
+
+def iter_name_chunks(filepath, chunk_size=SUBMIT_CHUNK_SIZE):
+    chunk = []
+    for name in iter_json_names(filepath):
+        chunk.append(name)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
 
 def create_output_dataframe(matches):
 
@@ -182,33 +398,42 @@ def create_output_dataframe(matches):
     other_columns = sorted([col for col in df.columns if col not in PRIORITY_COLUMNS])
     
     return df[existing_priority + other_columns]
-def process_matches_response(response):
-    
+def iter_response_matches(response, name_index=None):
+    """Yield the individual matches contained in one matches response page.
+
+    With a ``name_index`` from dedupe_names, matches of a deduplicated
+    association are repeated for every original input row it stands for.
+    """
+    if not response:
+        raise ValueError("Empty API response")
+
+    if 'errors' in response:
+        error_msg = response['errors'][0].get('detail', 'Unknown error')
+        raise ValueError(f"API error: {error_msg}")
+
+    if isinstance(response.get('matches'), list):
+        # Flat pages carry no association item, only what each match says about its own
+        for match in response['matches']:
+            association = match.get('association') if isinstance(match, dict) else None
+            yield from fan_out_matches({'association': association or {}}, [match], name_index)
+
+    elif isinstance(response.get('data'), list):
+        for item in response['data']:
+            if isinstance(item, dict) and isinstance(item.get('attributes'), dict):
+                if isinstance(item['attributes'].get('matches'), list):
+                    yield from fan_out_matches(item['attributes'], item['attributes']['matches'], name_index)
+
+    elif isinstance(response.get('matches'), dict) and isinstance(response['matches'].get('data'), list):
+        for item in response['matches']['data']:
+            if isinstance(item, dict) and isinstance(item.get('attributes'), dict):
+                if isinstance(item['attributes'].get('matches'), list):
+                    yield from fan_out_matches(item['attributes'], item['attributes']['matches'], name_index)
+
+def process_matches_response(response, name_index=None):
+
     try:
-        if not response:
-            raise ValueError("Empty API response")
-            
-        if 'errors' in response:
-            error_msg = response['errors'][0].get('detail', 'Unknown error')
-            raise ValueError(f"API error: {error_msg}")
-            
-        matches = []
-        
-        if isinstance(response.get('matches'), list):
-            matches.extend(response['matches'])
-        
-        elif isinstance(response.get('data'), list):
-            for item in response['data']:
-                if isinstance(item, dict) and isinstance(item.get('attributes'), dict):
-                    if isinstance(item['attributes'].get('matches'), list):
-                        matches.extend(item['attributes']['matches'])
-        
-        elif isinstance(response.get('matches'), dict) and isinstance(response['matches'].get('data'), list):
-            for item in response['matches']['data']:
-                if isinstance(item, dict) and isinstance(item.get('attributes'), dict):
-                    if isinstance(item['attributes'].get('matches'), list):
-                        matches.extend(item['attributes']['matches'])
-        
+        matches = [MatchRecord.from_match(match) for match in iter_response_matches(response, name_index)]
+
         if not matches:
             raise ValueError("No matches found in API response")
             
@@ -218,6 +443,212 @@ def process_matches_response(response):
         logger.error(f"Error processing matches: {str(e)}")
         return None
     
+async def iter_case_match_pages(service, case_id, first_page, limit=MATCHES_PAGE_LIMIT, filters=None):
+    """Yield match response pages for a case, starting with an already fetched page"""
+    page = first_page
+    offset = 0
+    
+    while page:
+        yield page
+        
+        data = page.get('data')
+        has_next = bool(page.get('links', {}).get('next'))
+        if not has_next and (not isinstance(data, list) or len(data) < limit):
+            break
+        
+        offset += limit
+        page = await service.get_case_matches(case_id, limit=limit, offset=offset, filters=filters)
+        if 'errors' in page:
+            raise ValueError(f"API error while paging matches at offset {offset}")
+
+class StreamingCSVWriter:
+    """Write flattened matches to a CSV in fixed-size batches.
+
+    The header is PRIORITY_COLUMNS followed by the sorted columns seen in the
+    first ``sample_size`` matches. Columns that only show up later are spilled
+    to a JSON-lines side file and merged back in one streaming pass on close,
+    so memory stays bounded regardless of the number of matches.
+    """
+
+    def __init__(self, path, batch_size=EXPORT_BATCH_SIZE, sample_size=SCHEMA_SAMPLE_SIZE):
+        self.path = path
+        self.spill_path = f"{path}.spill"
+        self.batch_size = max(1, batch_size)
+        self.sample_size = max(1, sample_size)
+        self.columns = None
+        self.late_columns = set()
+        self.rows_written = 0
+        self._pending = []
+        self._file = None
+        self._writer = None
+        self._spill = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, match):
+        # Buffered rows are kept as slotted records rather than flattened dicts
+        self._pending.append(match if isinstance(match, MatchRecord) else MatchRecord.from_match(match))
+        
+        if self.columns is None:
+            if len(self._pending) >= self.sample_size:
+                self._start()
+        elif len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def write_many(self, matches):
+        for match in matches:
+            self.write(match)
+
+    def _start(self):
+        sampled = set()
+        for row in self._pending:
+            sampled.update(row)
+        other_columns = sorted(col for col in sampled if col not in PRIORITY_COLUMNS)
+        self.columns = PRIORITY_COLUMNS + other_columns
+        
+        self._file = open(self.path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.columns, extrasaction='ignore')
+        self._writer.writeheader()
+        self.flush()
+
+    def flush(self):
+        if self.columns is None:
+            self._start()
+            return
+        
+        known = set(self.columns)
+        for row in self._pending:
+            extra = {key: value for key, value in row.items() if key not in known}
+            if extra:
+                if self._spill is None:
+                    self._spill = open(self.spill_path, 'w', encoding='utf-8')
+                self._spill.write(json.dumps({"row": self.rows_written, "values": extra}, default=str) + "\n")
+                self.late_columns.update(extra)
+            self._writer.writerow(row)
+            self.rows_written += 1
+        
+        self._pending.clear()
+        self._file.flush()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+        
+        if self._spill is not None:
+            self._spill.close()
+            self._merge_spill()
+        
+        return self.path
+
+    def abort(self):
+        for handle in (self._file, self._spill):
+            if handle is not None:
+                handle.close()
+        for path in (self.path, self.spill_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _merge_spill(self):
+        """Rewrite the CSV with the late-appearing columns appended to the header"""
+        late = sorted(self.late_columns)
+        merged_path = f"{self.path}.merge"
+        
+        with open(self.path, 'r', newline='', encoding='utf-8') as src, \
+                open(self.spill_path, 'r', encoding='utf-8') as spill, \
+                open(merged_path, 'w', newline='', encoding='utf-8') as dst:
+            reader = csv.reader(src)
+            writer = csv.writer(dst)
+            writer.writerow(next(reader) + late)
+            
+            pending = json.loads(spill.readline() or 'null')
+            for index, row in enumerate(reader):
+                values = {}
+                if pending and pending['row'] == index:
+                    values = pending['values']
+                    pending = json.loads(spill.readline() or 'null')
+                writer.writerow(row + [values.get(col, '') for col in late])
+        
+        os.replace(merged_path, self.path)
+        os.remove(self.spill_path)
+        logger.info(f"Merged {len(late)} late-appearing columns into {self.path}")
+
+def source_name(filename):
+    """Name identifying an input file in output names and logs"""
+    return os.path.splitext(os.path.basename(filename))[0] if filename else None
+
+def response_filename(source=None):
+    """Remote name of the response file for an input source"""
+    return f"DJ_Response_{source}.csv" if source else "DJ_Response.csv"
+
+def delta_filename(source=None):
+    return f"DJ_Response_{source}_delta.csv" if source else "DJ_Response_delta.csv"
+
+def previous_index_path(source=None):
+    ensure_directory_exists(LOCAL_PATHS['state'])
+    return os.path.join(LOCAL_PATHS['state'], f"previous_index_{source or 'default'}.tsv.gz")
+
+def local_output_path(source=None):
+    ensure_directory_exists(LOCAL_PATHS['output'])
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    prefix = f"DJ_Response_{source}" if source else "DJ_Response"
+    return os.path.join(LOCAL_PATHS['output'], f"{prefix}_{timestamp}.csv")
+
+async def stream_output_file(service, case_id, first_page, local_path=None, name_index=None, source=None, filters=None):
+    """Page through a case's matches and stream them to CSV, returns (path, row count).
+
+    Pages are fetched by a separate task into a bounded queue, so the next
+    page downloads while the previous one is flattened and written on a
+    worker thread. Each page is also recorded in the local match store when
+    it is enabled.
+    """
+    if local_path is None:
+        local_path = local_output_path()
+    store = get_match_store()
+    run_ts = datetime.now(timezone.utc).isoformat()
+    queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    loop = asyncio.get_running_loop()
+    
+    async def fetch_pages():
+        try:
+            async for page in iter_case_match_pages(service, case_id, first_page, filters=filters):
+                await queue.put(page)
+                PIPELINE_QUEUE_DEPTH.set(queue.qsize(), queue="match_pages")
+        finally:
+            await queue.put(None)
+    
+    def write_page(writer, page):
+        matches = list(iter_response_matches(page, name_index))
+        writer.write_many(matches)
+        if store is not None:
+            try:
+                store.add_matches(matches, case_id, source, run_ts=run_ts)
+            except Exception as e:
+                logger.error(f"Failed to record matches in the match store: {str(e)}")
+    
+    fetch_task = asyncio.create_task(fetch_pages())
+    try:
+        with StreamingCSVWriter(local_path) as writer:
+            while True:
+                page = await queue.get()
+                PIPELINE_QUEUE_DEPTH.set(queue.qsize(), queue="match_pages")
+                if page is None:
+                    break
+                await loop.run_in_executor(None, write_page, writer, page)
+            await fetch_task
+    finally:
+        if not fetch_task.done():
+            fetch_task.cancel()
+    
+    logger.info(f"Streamed {writer.rows_written} matches to {local_path}")
+    return local_path, writer.rows_written
+
 def save_output_files(df, case_id):
     ensure_directory_exists(LOCAL_PATHS['output'])
     
@@ -231,20 +662,22 @@ def save_output_files(df, case_id):
     return local_path
 
 
-async def process_names(names):
-    service = DowJonesAPIService()
-    payload = {
+def build_associations(names):
+    return [
+        {
+            "names": [{"single_string_name": name, "name_type": "PRIMARY"}],
+            "record_type": "UNKNOWN"
+        } for name in names
+    ]
+
+def build_case_payload(names, case_name="screening_case", external_id="external_id_123"):
+    return {
         "data": {
             "attributes": {
                 "case_info": {
-                    "associations": [
-                        {
-                            "names": [{"single_string_name": name, "name_type": "PRIMARY"}],
-                            "record_type": "UNKNOWN"
-                        } for name in names
-                    ],
-                    "case_name": "screening_case",
-                    "external_id": "external_id_123",
+                    "associations": build_associations(names),
+                    "case_name": case_name,
+                    "external_id": external_id,
                     "owner_id": "DJ",
                     "has_alerts": True,
                     "options": {
@@ -265,16 +698,8 @@ async def process_names(names):
             "type": "risk-entity-screening-cases/bulk-associations"
         }
     }
-    
 
-    creation_result = await service.create_screening_case(payload)
-    case_id = creation_result["data"]["attributes"]["case_id"]
-    transaction_id = creation_result["data"]["id"]
-    
-    logger.info(f"Case created with ID: {case_id}")
-    logger.info(f"Transaction ID: {transaction_id}")
-    
-   
+async def wait_for_transaction(service, case_id, transaction_id):
     max_transaction_retries = 50
     base_transaction_delay = 5 
     
@@ -282,24 +707,29 @@ async def process_names(names):
         current_delay = min(base_transaction_delay * (2 ** attempt), 220)  
         
         # Get transaction details
+        POLLS.inc(operation="transaction")
         transaction_details = await service.get_transaction_details(case_id, transaction_id)
         transaction_status = transaction_details.get('data', {}).get('attributes', {}).get('status')
         
         logger.info(f"Transaction status: {transaction_status} (attempt {attempt + 1})")
         
         if transaction_status == "COMPLETED":
-            break
+            return
         elif transaction_status in ["PENDING", "PROCESSING"]:
             if attempt < max_transaction_retries - 1:
-                await asyncio.sleep(current_delay)
+                await asyncio.sleep(scaled_delay(current_delay))
                 continue
             else:
                 raise Exception("Max retries reached while waiting for transaction to complete")
         else:
             raise Exception(f"Unexpected transaction status: {transaction_status}")
 
-    
-   
+async def wait_for_case_matches(service, case_id, filters=None):
+    """Poll until the case's first page of matches is available.
+
+    The page is requested with the same page size iter_case_match_pages
+    uses, so the offsets of the following pages line up with it.
+    """
     max_retries = 50
     base_delay = 10  
     max_delay = 220  
@@ -307,21 +737,305 @@ async def process_names(names):
     for attempt in range(max_retries):
         current_delay = min(base_delay * (2 ** attempt), max_delay)
         
-        matches_response = await service.get_case_matches(case_id)
+        POLLS.inc(operation="case_matches")
+        matches_response = await service.get_case_matches(
+            case_id, limit=MATCHES_PAGE_LIMIT, offset=0, filters=filters
+        )
         
         if 'errors' not in matches_response:
-            return case_id, transaction_id, matches_response
+            return matches_response
             
         logger.info(f"Matches still processing (attempt {attempt + 1}), waiting {current_delay} seconds...")
-        await asyncio.sleep(current_delay)
+        await asyncio.sleep(scaled_delay(current_delay))
+    return matches_response
+
+async def process_names(names, service=None):
+    if service is None:
+        service = DowJonesAPIService()
+    payload = build_case_payload(names)
+
+    creation_result = await service.create_screening_case(payload)
+    case_id = creation_result["data"]["attributes"]["case_id"]
+    transaction_id = creation_result["data"]["id"]
+    
+    logger.info(f"Case created with ID: {case_id}")
+    logger.info(f"Transaction ID: {transaction_id}")
+    
+    await wait_for_transaction(service, case_id, transaction_id)
+    matches_response = await wait_for_case_matches(service, case_id)
     return case_id, transaction_id, matches_response
 
+async def submit_names_pipelined(local_json_path, service):
+    """Parse, deduplicate and submit names chunk by chunk.
+
+    A parser task reads the input file incrementally and feeds chunks of new
+    unique names through a bounded queue; the first chunk creates the case
+    and later chunks are added to it while parsing continues. Transaction
+    polling for each chunk starts as soon as it is submitted. Returns
+    (case_id, name_index, input row count); case_id is None when the file
+    holds no names.
+    """
+    queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    name_index = {}
+    row_count = 0
+    loop = asyncio.get_running_loop()
+    
+    async def parse():
+        nonlocal row_count
+        chunks = iter_name_chunks(local_json_path)
+        try:
+            while True:
+                chunk = await loop.run_in_executor(None, next, chunks, None)
+                if chunk is None:
+                    break
+                unique_names, _ = dedupe_names(chunk, name_index, row_count)
+                row_count += len(chunk)
+                if unique_names:
+                    await queue.put(unique_names)
+                    PIPELINE_QUEUE_DEPTH.set(queue.qsize(), queue="name_chunks")
+        except ValueError as e:
+            raise InputFileError(str(e)) from e
+        finally:
+            await queue.put(None)
+    
+    parse_task = asyncio.create_task(parse())
+    transaction_waits = []
+    case_id = None
+    try:
+        while True:
+            chunk = await queue.get()
+            PIPELINE_QUEUE_DEPTH.set(queue.qsize(), queue="name_chunks")
+            if chunk is None:
+                break
+            if case_id is None:
+                creation_result = await service.create_screening_case(build_case_payload(chunk))
+                case_id = creation_result["data"]["attributes"]["case_id"]
+                transaction_id = creation_result["data"]["id"]
+                logger.info(f"Case created with ID: {case_id}")
+            else:
+                result = await service.add_case_associations(case_id, build_associations(chunk))
+                transaction_id = result["data"]["id"]
+            logger.info(f"Submitted {len(chunk)} names in transaction {transaction_id}")
+            transaction_waits.append(asyncio.create_task(wait_for_transaction(service, case_id, transaction_id)))
+        
+        await parse_task
+        await asyncio.gather(*transaction_waits)
+    finally:
+        for task in [parse_task] + transaction_waits:
+            if not task.done():
+                task.cancel()
+    
+    logger.info(f"Screening {len(name_index)} unique names out of {row_count} input rows")
+    return case_id, name_index, row_count
+
+def shard_payloads(local_json_path, shard_size=SHARD_SIZE):
+    """Deduplicate the input names and split them into shard payloads.
+
+    Each entry carries the name to screen, its normalized key and every
+    (input index, original name) it stands for, so a worker can fan its
+    matches back out without seeing the rest of the input.
+    """
+    name_index = {}
+    row_count = 0
+    for chunk in iter_name_chunks(local_json_path):
+        dedupe_names(chunk, name_index, row_count)
+        row_count += len(chunk)
+    logger.info(f"Sharding {len(name_index)} unique names out of {row_count} input rows")
+    
+    entries = [
+        {'name': str(occurrences[0][1]), 'key': key, 'inputs': occurrences}
+        for key, occurrences in name_index.items()
+    ]
+    return [entries[start:start + shard_size] for start in range(0, len(entries), shard_size)]
+
+def merge_shard_outputs(shard_paths, local_path):
+    """Concatenate shard CSVs under one header, streaming row by row; returns the row count"""
+    other_columns = set()
+    for path in shard_paths:
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            other_columns.update(next(csv.reader(f), []))
+    columns = PRIORITY_COLUMNS + sorted(other_columns - set(PRIORITY_COLUMNS))
+    
+    row_count = 0
+    with open(local_path, 'w', newline='', encoding='utf-8') as dst:
+        writer = csv.DictWriter(dst, fieldnames=columns)
+        writer.writeheader()
+        for path in shard_paths:
+            with open(path, 'r', newline='', encoding='utf-8') as src:
+                for row in csv.DictReader(src):
+                    writer.writerow(row)
+                    row_count += 1
+    
+    logger.info(f"Merged {len(shard_paths)} shard output(s) into {local_path}")
+    return row_count
+
+async def screen_sharded(work_queue, local_json_path, source=None):
+    """Queue an input file as shards for worker processes and merge their outputs.
+
+    Returns (local CSV path, match count) once every shard is done; raises if
+    any shard exhausted its attempts.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        payloads = await loop.run_in_executor(None, shard_payloads, local_json_path)
+    except ValueError as e:
+        raise InputFileError(str(e)) from e
+    if not payloads:
+        raise InputFileError("No names in input file")
+    
+    job_id = f"{source or 'default'}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    await loop.run_in_executor(None, work_queue.create_job, job_id, payloads, source)
+    
+    last_progress = None
+    while True:
+        progress = await loop.run_in_executor(None, work_queue.progress, job_id)
+        if progress != last_progress:
+            logger.info(f"Job {job_id} progress: {progress}")
+            last_progress = progress
+        if not progress.get('pending') and not progress.get('leased'):
+            break
+        await asyncio.sleep(WORKER_POLL_INTERVAL)
+    
+    if progress.get('failed'):
+        raise Exception(f"{progress['failed']} shard(s) of job {job_id} failed")
+    
+    results = await loop.run_in_executor(None, work_queue.results, job_id)
+    local_path = local_output_path(source)
+    match_count = await loop.run_in_executor(
+        None, merge_shard_outputs, [path for _, path, _ in results], local_path
+    )
+    return local_path, match_count
+
+async def process_shard(work_queue, service, worker_id, shard, lease_seconds):
+    """Screen one claimed shard into a CSV in the shared work directory"""
+    loop = asyncio.get_running_loop()
+    job_id, shard_no = shard['job_id'], shard['shard_no']
+    
+    async def keep_lease():
+        while True:
+            await asyncio.sleep(lease_seconds / 3)
+            renewed = await loop.run_in_executor(None, work_queue.renew, job_id, shard_no, worker_id, lease_seconds)
+            if not renewed:
+                logger.warning(f"Lost the lease on shard {shard_no} of job {job_id}")
+                return
+    
+    lease_task = asyncio.create_task(keep_lease())
+    try:
+        entries = shard['payload']
+        unique_names = [entry['name'] for entry in entries]
+        name_index = {entry['key']: [tuple(item) for item in entry['inputs']] for entry in entries}
+        logger.info(f"Worker {worker_id} screening shard {shard_no} of job {job_id} ({len(unique_names)} names, attempt {shard['attempt']})")
+        
+        case_id, transaction_id, matches_response = await process_names(unique_names, service)
+        if not matches_response or 'errors' in matches_response:
+            raise Exception("Failed to get matches from API")
+        
+        ensure_directory_exists(WORK_DIR)
+        # One file per attempt, so a worker whose lease expired cannot overwrite the result of the one that took over
+        result_path = os.path.join(WORK_DIR, f"{job_id}_shard_{shard_no:05d}_attempt_{shard['attempt']}.csv")
+        result_path, match_count = await stream_output_file(
+            service, case_id, matches_response, result_path, name_index, shard['source']
+        )
+        completed = await loop.run_in_executor(None, work_queue.complete, job_id, shard_no, worker_id, result_path, match_count)
+        if not completed:
+            logger.warning(f"Lost the lease on shard {shard_no} of job {job_id} before completing it; discarding {result_path}")
+            os.remove(result_path)
+            return
+        logger.info(f"Shard {shard_no} of job {job_id} done with {match_count} matches")
+    except Exception as e:
+        logger.error(f"Shard {shard_no} of job {job_id} failed: {str(e)}", exc_info=True)
+        await loop.run_in_executor(None, work_queue.fail, job_id, shard_no, worker_id, e)
+    finally:
+        lease_task.cancel()
+
+async def run_worker(work_queue, worker_id, lease_seconds=WORKER_LEASE_SECONDS):
+    """Claim and screen shards from the work queue until interrupted"""
+    loop = asyncio.get_running_loop()
+    service = DowJonesAPIService()
+    logger.info(f"Worker {worker_id} polling {work_queue.path}")
+    
+    while True:
+        shard = await loop.run_in_executor(None, work_queue.claim, worker_id, lease_seconds)
+        if shard is None:
+            await asyncio.sleep(WORKER_POLL_INTERVAL)
+            continue
+        await process_shard(work_queue, service, worker_id, shard, lease_seconds)
+        await export_metrics()
+
+def standing_state_path():
+    return os.path.join(LOCAL_PATHS['state'], 'standing_cases.json')
+
+def load_standing_cases():
+    path = standing_state_path()
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_standing_case(key, entry):
+    ensure_directory_exists(LOCAL_PATHS['state'])
+    cases = load_standing_cases()
+    cases[key] = entry
+    temp_path = f"{standing_state_path()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(cases, f, indent=2)
+    os.replace(temp_path, standing_state_path())
+
+async def sync_standing_case(names, service, source=None):
+    """Bring the standing case of an input source up to date.
+
+    Creates the case on first use, adds only names it has not screened
+    before, and fetches matches with activity since the last successful
+    sync. Returns (case_id, matches_response, watermark, filters); the
+    watermark must be committed with commit_standing_watermark once the
+    output is delivered, and the filters reused to page the matches.
+    """
+    key = source or 'default'
+    entry = load_standing_cases().get(key)
+    watermark = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    
+    if entry is None:
+        payload = build_case_payload(names, case_name=f"standing_{key}", external_id=f"standing_{key}")
+        creation_result = await service.create_screening_case(payload)
+        case_id = creation_result["data"]["attributes"]["case_id"]
+        logger.info(f"Standing case for {key} created with ID: {case_id}")
+        # Remember the account that owns the case so later runs stay on it
+        entry = {'case_id': case_id, 'names': [], 'watermark': None,
+                 'account': service.credentials.case_account(case_id)}
+        new_names = names
+        await wait_for_transaction(service, case_id, creation_result["data"]["id"])
+    else:
+        case_id = entry['case_id']
+        if entry.get('account'):
+            service.credentials.bind_case(case_id, entry['account'])
+        known = set(entry['names'])
+        new_names = [name for name in names if normalize_name(name) not in known]
+        logger.info(f"Standing case {case_id} for {key}: {len(new_names)} new of {len(names)} names")
+        if new_names:
+            result = await service.add_case_associations(case_id, build_associations(new_names))
+            await wait_for_transaction(service, case_id, result["data"]["id"])
+    
+    # Persist the case and its names right away; only the watermark waits for delivery
+    entry['names'] = sorted(set(entry['names']) | {normalize_name(name) for name in new_names})
+    save_standing_case(key, entry)
+    
+    filters = MatchFilters(
+        has_alerts=True,
+        is_match_valid=True,
+        last_match_activity_on={"from": entry['watermark']} if entry['watermark'] else None
+    )
+    matches_response = await wait_for_case_matches(service, case_id, filters)
+    return case_id, matches_response, watermark, filters
+
+def commit_standing_watermark(source, watermark):
+    key = source or 'default'
+    entry = load_standing_cases()[key]
+    entry['watermark'] = watermark
+    save_standing_case(key, entry)
+
 #Create an empty CSV
-def create_empty_csv():
-    ensure_directory_exists(LOCAL_PATHS['output'])
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    local_filename = f"DJ_Response_{timestamp}.csv"
-    local_path = os.path.join(LOCAL_PATHS['output'], local_filename)
+def create_empty_csv(source=None):
+    local_path = local_output_path(source)
     
     # Create empty DataFrame with just the priority columns
     df = pd.DataFrame(columns=PRIORITY_COLUMNS)
@@ -329,55 +1043,340 @@ def create_empty_csv():
     
     logger.info(f"Created empty response file at {local_path}")
     return local_path
-async def main():
+@contextmanager
+def timed_stage(stage):
+    """Record the duration of a pipeline stage"""
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        CRON_STAGE_DURATION.observe(time.monotonic() - started, stage=stage)
+
+async def export_metrics():
+    """Write the process metrics to the textfile and/or Pushgateway, when configured, off the event loop"""
+    loop = asyncio.get_running_loop()
+    try:
+        if METRICS_TEXTFILE_PATH:
+            await loop.run_in_executor(None, REGISTRY.write_textfile, METRICS_TEXTFILE_PATH)
+        if METRICS_PUSHGATEWAY_URL:
+            await loop.run_in_executor(None, REGISTRY.push, METRICS_PUSHGATEWAY_URL, METRICS_JOB)
+    except Exception as e:
+        logger.error(f"Failed to export metrics: {str(e)}")
+
+def open_sftp_pools(keepalive=None):
+    """One async session pool per SFTP server"""
+    return {
+        target: AsyncSFTPPool(
+            target,
+            lambda config=SFTP_CONFIGS[target], target=target: get_sftp_connection(config, target),
+            size=SFTP_POOL_SIZE,
+            keepalive=keepalive
+        )
+        for target in UPLOAD_TARGETS
+    }
+
+async def close_sftp_pools(pools):
+    await asyncio.gather(*(pool.close() for pool in pools.values()))
+
+async def upload_to_servers(local_csv_path, pools, remote_filename="DJ_Response.csv"):
+    """Upload CSV to both SFTP servers concurrently through their session pools"""
+    results = await asyncio.gather(*(
+        pools[target].run(lambda sftp, target=target: upload_to_target(target, local_csv_path, remote_filename, sftp))
+        for target in UPLOAD_TARGETS
+    ))
+    return dict(zip(UPLOAD_TARGETS, results))
+
+async def run_pipeline(pools, service, filename=None, multi_file=False, work_queue=None):
+    """Screen one input file end to end.
+
+    All SFTP work goes through the async session pools, so transfers never
+    block the event loop. In multi-file mode the response is written as
+    DJ_Response_<source>.csv and the input is archived once handled. With a
+    ``work_queue`` the names are screened by worker processes instead.
+    Returns a status dict.
+    """
+    input_pool = pools['input_server']
+    source = source_name(filename) if multi_file else None
+    remote_filename = response_filename(source)
+    status = {'file': filename, 'status': 'failed', 'matches': 0, 'output': remote_filename}
+    
+    # Log the service accounts in while the input file downloads
+    token_task = asyncio.create_task(service.credentials.warm())
+    try:
+        with timed_stage("download"):
+            local_json_path = await input_pool.run(download_specific_file, filename)
+        await token_task
+    finally:
+        if not token_task.done():
+            token_task.cancel()
+    if not local_json_path:
+        return status
+    
+    watermark, filters = None, None
+    local_csv_path = None
+    try:
+        with timed_stage("screen"):
+            if work_queue is not None:
+                local_csv_path, match_count = await screen_sharded(work_queue, local_json_path, source)
+            elif STANDING_CASE_MODE:
+                names = process_json_file(local_json_path)
+                if not names:
+                    raise InputFileError("No names in input file")
+                unique_names, name_index = dedupe_names(names)
+                logger.info(f"Screening {len(unique_names)} unique names out of {len(names)} input rows")
+                case_id, matches_response, watermark, filters = await sync_standing_case(unique_names, service, source)
+            else:
+                case_id, name_index, row_count = await submit_names_pipelined(local_json_path, service)
+                if case_id is None:
+                    raise InputFileError("No names in input file")
+                matches_response = await wait_for_case_matches(service, case_id)
+    except InputFileError as e:
+        logger.error(f"Error processing JSON file: {str(e)}")
+        status['status'] = 'invalid'
+        if multi_file:
+            await input_pool.run(archive_input_file, filename, '.invalid')
+        return status
+    
+    if local_csv_path is None:
+        status['case_id'] = case_id
+        
+        if not matches_response or 'errors' in matches_response:
+            logger.error(f"Failed to get matches from API for {filename or 'input file'}")
+            local_csv_path = create_empty_csv(source)
+            await upload_to_servers(local_csv_path, pools, remote_filename)
+            return status
+        
+        with timed_stage("stream"):
+            local_csv_path, match_count = await stream_output_file(
+                service, case_id, matches_response, local_output_path(source), name_index, source, filters
+            )
+    status['matches'] = match_count
+    CRON_MATCHES.inc(match_count)
+    if not match_count:
+        logger.warning("No matches found in API response")
+        os.remove(local_csv_path)
+        local_csv_path = create_empty_csv(source)
+    
+    # Upload for both servers
+    with timed_stage("upload"):
+        upload_results = await upload_to_servers(local_csv_path, pools, remote_filename)
+    
+    uploaded = all(result['success'] for result in upload_results.values())
+    
+    # A standing case already returns only changed matches, so there is nothing to diff
+    index_path = None
+    if OUTPUT_DIFF_ENABLED and not STANDING_CASE_MODE:
+        index_path = previous_index_path(source)
+        delta_path = local_csv_path[:-len('.csv')] + '_delta.csv'
+        loop = asyncio.get_running_loop()
+        with timed_stage("diff"):
+            status['delta'] = await loop.run_in_executor(None, diff_output, local_csv_path, index_path, delta_path)
+        with timed_stage("upload"):
+            delta_results = await upload_to_servers(delta_path, pools, delta_filename(source))
+        uploaded = uploaded and all(result['success'] for result in delta_results.values())
+    
+    if not uploaded:
+        logger.error("Failed to upload to one or more servers")
+        status['status'] = 'upload_failed'
+        return status
+    
+    status['status'] = 'completed' if match_count else 'no_matches'
+    if watermark:
+        commit_standing_watermark(source, watermark)
+    if index_path:
+        commit_index(index_path)
+    if multi_file:
+        await input_pool.run(archive_input_file, filename)
+    return status
+
+def discover_input_files(snapshot):
+    """Input files in a directory snapshot matching SFTP_INPUT_PATTERN.
+
+    Files are told apart downstream by source_name, which drops the
+    extension, so names that differ only in extension or case (a.json,
+    a.txt, A.JSON) would share one response file, diff index and standing
+    case. Such files are left out until they are renamed.
+    """
+    pattern = SFTP_CONFIGS['input_server']['file_pattern']
+    by_source = {}
+    for name in sorted(name for name in snapshot if fnmatch.fnmatch(name, pattern)):
+        by_source.setdefault(source_name(name).casefold(), []).append(name)
+    
+    filenames = []
+    for names in by_source.values():
+        if len(names) > 1:
+            logger.error(f"Skipping input files with the same source name, rename all but one: {', '.join(names)}")
+            continue
+        filenames.extend(names)
+    return sorted(filenames)
+
+def archive_input_file(sftp, filename, suffix=''):
+    """Move a handled input file into the archive directory so it is not picked up again"""
+    config = SFTP_CONFIGS['input_server']
+    archive_path = config['archive_path'] or f"{config['remote_path']}/processed"
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    
+    try:
+        try:
+            sftp.stat(archive_path)
+        except IOError:
+            sftp.mkdir(archive_path)
+        sftp.rename(f"{config['remote_path']}/{filename}", f"{archive_path}/{filename}.{timestamp}{suffix}")
+        logger.info(f"Archived {filename} to {archive_path}")
+    except Exception as e:
+        logger.error(f"Failed to archive {filename}: {str(e)}")
+
+async def process_input_files(pools, service, filenames, work_queue=None):
+    """Screen several input files concurrently, sharing the service's request budget"""
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_FILES)
+    
+    async def process_one(filename):
+        async with semaphore:
+            try:
+                logger.info(f"Processing input file {filename}")
+                return await run_pipeline(pools, service, filename, multi_file=True, work_queue=work_queue)
+            except Exception as e:
+                logger.error(f"Fatal error processing {filename}: {str(e)}", exc_info=True)
+                return {'file': filename, 'status': 'failed', 'matches': 0, 'output': response_filename(source_name(filename))}
+    
+    statuses = await asyncio.gather(*(process_one(filename) for filename in filenames))
+    for status in statuses:
+        CRON_RUNS.inc(status=status['status'])
+        logger.info(f"{status['file']}: {status['status']} ({status['matches']} matches) -> {status['output']}")
+    return statuses
+
+async def main(work_queue=None):
+    pools = open_sftp_pools()
     try:
         logger.info("Starting Dow Jones screening process")
         
-        with get_sftp_connection(SFTP_CONFIGS['input_server']) as sftp:
-            logger.info(f"Connected to input SFTP at {SFTP_CONFIGS['input_server']['hostname']}")
-            
-            local_json_path = download_specific_file(sftp)
-            if not local_json_path:
-                return
-            
-            names = process_json_file(local_json_path)
-            if not names:
-                return
-            
-            case_id, transaction_id, matches_response = await process_names(names)
-            
-            if not matches_response or 'errors' in matches_response:
-                logger.error("Failed to get matches from API")
-                local_csv_path = create_empty_csv()
-                upload_results = upload_to_servers(local_csv_path)
-                return
-            
-            
-            matches = process_matches_response(matches_response)
-            if not matches:
-                logger.warning("No matches found in API response")
-                local_csv_path = create_empty_csv()
-                upload_results = upload_to_servers(local_csv_path)
-                return
-            
-            df = create_output_dataframe(matches)
-            local_csv_path = save_output_files(df, case_id)
-            
-            # Upload for both servers
-            upload_results = upload_to_servers(local_csv_path)
-            
-            if not all(upload_results.values()):
-                logger.error("Failed to upload to one or more servers")
+        service = DowJonesAPIService()
+        if SFTP_CONFIGS['input_server']['file_pattern']:
+            filenames = discover_input_files(await pools['input_server'].run(snapshot_input_files))
+            logger.info(f"Found {len(filenames)} pending input file(s)")
+            await process_input_files(pools, service, filenames, work_queue)
+        else:
+            status = await run_pipeline(pools, service, work_queue=work_queue)
+            CRON_RUNS.inc(status=status['status'])
             
     except Exception as e:
         logger.error(f"Fatal error in main process: {str(e)}", exc_info=True)
+        CRON_RUNS.inc(status="failed")
         local_csv_path = create_empty_csv()
-        upload_results = upload_to_servers(local_csv_path)
+        await upload_to_servers(local_csv_path, pools)
     finally:
+        await close_sftp_pools(pools)
+        await export_metrics()
         logger.info("Processing complete")
 
+def snapshot_input_files(sftp):
+    """Map each file in the remote input directory to its (size, mtime)"""
+    remote_path = SFTP_CONFIGS['input_server']['remote_path']
+    return {attr.filename: (attr.st_size, attr.st_mtime) for attr in sftp.listdir_attr(remote_path)}
+
+async def run_daemon(poll_interval=DAEMON_POLL_INTERVAL, rescreen_interval=DAEMON_RESCREEN_INTERVAL):
+    """Watch the input directory and run the pipeline when input files change.
+
+    The interpreter, the DowJonesAPIService (and its cached token) and the
+    keepalive SFTP session pools stay alive between runs. A file is only
+    picked up once its size and mtime are stable across two polls. With
+    SFTP_INPUT_PATTERN set every new matching file is screened; otherwise the
+    single configured file is, and ``rescreen_interval`` forces a run of it
+    even when unchanged, like the daily cron did (0 disables that). A file
+    whose run fails or whose upload fails stays pending and is retried with
+    exponential backoff, or straight away once it changes again.
+    """
+    config = SFTP_CONFIGS['input_server']
+    multi_file = bool(config['file_pattern'])
+    service = DowJonesAPIService()
+    pools = open_sftp_pools(keepalive=DAEMON_KEEPALIVE_INTERVAL)
+    previous = {}
+    processed = {}
+    retries = {}
+    last_run = 0.0
+    
+    logger.info(f"Starting Dow Jones watcher daemon (poll every {poll_interval}s)")
+    
+    try:
+        while True:
+            try:
+                # Dead sessions are dropped by the pool and reopened on the next poll
+                snapshot = await pools['input_server'].run(snapshot_input_files)
+            except Exception as e:
+                logger.error(f"Failed to poll input SFTP: {str(e)}")
+                await asyncio.sleep(poll_interval)
+                continue
+            
+            candidates = discover_input_files(snapshot) if multi_file else [config['specific_filename']]
+            stable = [name for name in candidates if name in snapshot and snapshot[name] == previous.get(name)]
+            now = time.monotonic()
+            pending = [
+                name for name in stable
+                if processed.get(name) != snapshot[name]
+                and (name not in retries or retries[name][1] <= now or retries[name][2] != snapshot[name])
+            ]
+            rescreen_due = not multi_file and stable and rescreen_interval and time.monotonic() - last_run >= rescreen_interval
+            previous = snapshot
+            
+            if pending or rescreen_due:
+                for name in pending or stable:
+                    size, mtime = snapshot[name]
+                    logger.info(f"{'New or changed' if pending else 'Scheduled rescreen of'} input file {name} (size={size}, mtime={mtime})")
+                outcomes = {}
+                try:
+                    if multi_file:
+                        for status in await process_input_files(pools, service, pending):
+                            outcomes[status['file']] = status['status']
+                    else:
+                        status = await run_pipeline(pools, service, config['specific_filename'])
+                        CRON_RUNS.inc(status=status['status'])
+                        outcomes[config['specific_filename']] = status['status']
+                except Exception as e:
+                    logger.error(f"Fatal error in pipeline run: {str(e)}", exc_info=True)
+                    CRON_RUNS.inc(status="failed")
+                    local_csv_path = create_empty_csv()
+                    await upload_to_servers(local_csv_path, pools)
+                for name in pending or stable:
+                    outcome = outcomes.get(name, 'failed')
+                    if outcome in DAEMON_DONE_STATUSES:
+                        processed[name] = snapshot[name]
+                        retries.pop(name, None)
+                        continue
+                    # Leave the file pending so the next due poll screens it again
+                    processed.pop(name, None)
+                    attempts = retries[name][0] + 1 if name in retries else 1
+                    delay = min(DAEMON_RETRY_MAX_DELAY, poll_interval * 2 ** attempts)
+                    retries[name] = (attempts, time.monotonic() + delay, snapshot[name])
+                    logger.warning(f"{name} ended {outcome}; retrying in {delay}s (attempt {attempts + 1})")
+                last_run = time.monotonic()
+                await export_metrics()
+                logger.info("Processing complete")
+            
+            await asyncio.sleep(poll_interval)
+    finally:
+        await close_sftp_pools(pools)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Dow Jones screening cron")
+    parser.add_argument("--daemon", action="store_true", help="Keep running and watch the input directory for new files")
+    parser.add_argument("--poll-interval", type=int, default=DAEMON_POLL_INTERVAL, help="Seconds between input directory polls in daemon mode")
+    parser.add_argument("--coordinator", action="store_true", help="Split the input into shards on the work queue and merge the workers' results")
+    parser.add_argument("--worker", action="store_true", help="Screen shards claimed from the work queue")
+    parser.add_argument("--queue-path", default=WORK_QUEUE_PATH, help="SQLite work queue file shared by the coordinator and workers")
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}-{os.getpid()}", help="Name this worker records on its leases")
+    parser.add_argument("--rescreen-interval", type=int, default=DAEMON_RESCREEN_INTERVAL, help="Seconds after which an unchanged file is screened again in daemon mode (0 disables)")
+    return parser.parse_args()
+
 if __name__ == "__main__":
     if os.name == 'nt':
         asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
     
-    asyncio.run(main())
\ No newline at end of file
+    args = parse_args()
+    if args.worker:
+        asyncio.run(run_worker(WorkQueue(args.queue_path), args.worker_id))
+    elif args.coordinator:
+        asyncio.run(main(WorkQueue(args.queue_path)))
+    elif args.daemon:
+        asyncio.run(run_daemon(args.poll_interval, args.rescreen_interval))
+    else:
+        asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,128 @@
+import sys
+
+
+PRIORITY_COLUMNS = [
+    'peid', 'subscription_name', 'primary_name_entity_name',
+    'primary_name_first_name', 'primary_name_middle_name',
+    'primary_name_last_name', 'match_name', 'match_type',
+    'match_id', 'gender', 'birthdates_0_day',
+    'birthdates_0_month', 'birthdates_0_year'
+]
+
+# Flattened fields present on nearly every match get a slot; anything else goes to ``extra``
+HOT_FIELDS = PRIORITY_COLUMNS + ['input_name', 'input_index', 'score', 'is_match_valid', 'has_alerts']
+
+# Short repeated string values (match types, genders, list names) are interned
+INTERN_MAX_LENGTH = 64
+
+_MISSING = object()
+
+
+def flatten_match(match):
+    if isinstance(match, MatchRecord):
+        return match.to_dict()
+    
+    flattened = {}
+    
+    for key, value in match.items():
+        if isinstance(value, dict):
+            for subkey, subvalue in value.items():
+                flattened[f"{key}_{subkey}"] = subvalue
+        elif isinstance(value, list):
+            for i, item in enumerate(value):
+                if isinstance(item, dict):
+                    for subkey, subvalue in item.items():
+                        flattened[f"{key}_{i}_{subkey}"] = subvalue
+                else:
+                    flattened[f"{key}_{i}"] = item
+        else:
+            flattened[key] = value
+    
+    return flattened
+
+def _compact(value):
+    if type(value) is str and len(value) <= INTERN_MAX_LENGTH:
+        return sys.intern(value)
+    return value
+
+
+class MatchRecord:
+    """Flattened match stored in slots instead of a per-match dict.
+
+    Holds the same keys and values as ``flatten_match`` would produce: the
+    hot fields live in slots, rare attributes in the ``extra`` dict with
+    interned keys. Supports the read-only mapping methods the CSV writers
+    use (``get``, ``keys``, ``items``, ``[]``), so it can be written as is.
+    """
+
+    __slots__ = tuple(HOT_FIELDS) + ('extra',)
+
+    def __init__(self):
+        for field in HOT_FIELDS:
+            setattr(self, field, _MISSING)
+        self.extra = None
+
+    @classmethod
+    def from_match(cls, match):
+        record = cls()
+        for key, value in match.items():
+            if isinstance(value, dict):
+                for subkey, subvalue in value.items():
+                    record._set(f"{key}_{subkey}", subvalue)
+            elif isinstance(value, list):
+                for i, item in enumerate(value):
+                    if isinstance(item, dict):
+                        for subkey, subvalue in item.items():
+                            record._set(f"{key}_{i}_{subkey}", subvalue)
+                    else:
+                        record._set(f"{key}_{i}", item)
+            else:
+                record._set(key, value)
+        return record
+
+    def _set(self, key, value):
+        value = _compact(value)
+        if key in _HOT_FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[sys.intern(key)] = value
+
+    def get(self, key, default=None):
+        if key in _HOT_FIELD_SET:
+            value = getattr(self, key)
+            return default if value is _MISSING else value
+        if self.extra is None:
+            return default
+        return self.extra.get(key, default)
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def keys(self):
+        keys = [field for field in HOT_FIELDS if getattr(self, field) is not _MISSING]
+        if self.extra:
+            keys.extend(self.extra)
+        return keys
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def items(self):
+        return [(key, self.get(key)) for key in self.keys()]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __repr__(self):
+        return f"MatchRecord({self.to_dict()!r})"
+
+
+_HOT_FIELD_SET = frozenset(HOT_FIELDS)
@@ -0,0 +1,98 @@
+import os
+import csv
+import gzip
+import hashlib
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+KEY_COLUMNS = ['input_name', 'peid', 'match_type']
+
+# Columns that change without the match changing: the input row's position in the
+# file and the ids Dow Jones assigns per case
+VOLATILE_COLUMNS = {'input_index', 'match_id', 'case_id'}
+
+
+def _digest(text):
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big')
+
+def row_key(row):
+    return tuple(row.get(col) or '' for col in KEY_COLUMNS)
+
+def row_digest(row):
+    # Column order changes between runs, so hash the sorted non-empty material cells
+    return _digest('\x1f'.join(
+        f"{col}={value}" for col, value in sorted(row.items()) if value and col not in VOLATILE_COLUMNS
+    ))
+
+def load_index(index_path):
+    """Previous run's index: key digest -> [set of row digests, *key values]"""
+    index = {}
+    if not index_path or not os.path.exists(index_path):
+        return index
+
+    with gzip.open(index_path, 'rt', newline='', encoding='utf-8') as f:
+        for key_hash, content_hash, *key in csv.reader(f, delimiter='\t'):
+            entry = index.setdefault(int(key_hash, 16), [set(), *key])
+            entry[0].add(int(content_hash, 16))
+
+    return index
+
+def diff_output(csv_path, index_path, delta_path):
+    """Compare a response CSV with the previous run and write the delta CSV.
+
+    Rows are keyed by (input name, peid, match_type). A row is ``added`` when
+    its key was absent from the previous run, ``changed`` when the key existed
+    but no previous row had the same content, and every previous key missing
+    now is reported as ``removed``. The CSV is read in a single streaming pass;
+    only the previous run's hashed index is held in memory. The index for this
+    run is written next to the old one as ``<index_path>.new`` and takes effect
+    once commit_index is called. Returns the per-type counts.
+    """
+    previous = load_index(index_path)
+    counts = {'added': 0, 'changed': 0, 'removed': 0}
+    seen = set()
+    new_index_path = f"{index_path}.new"
+
+    with open(csv_path, 'r', newline='', encoding='utf-8') as src, \
+            open(delta_path, 'w', newline='', encoding='utf-8') as dst, \
+            gzip.open(new_index_path, 'wt', newline='', encoding='utf-8') as idx:
+        reader = csv.DictReader(src)
+        columns = list(reader.fieldnames or [])
+        for col in KEY_COLUMNS:
+            if col not in columns:
+                columns.append(col)
+
+        writer = csv.DictWriter(dst, fieldnames=['change_type'] + columns, extrasaction='ignore')
+        writer.writeheader()
+        index_writer = csv.writer(idx, delimiter='\t')
+
+        for row in reader:
+            key = row_key(row)
+            key_hash = _digest('\x1f'.join(key))
+            content_hash = row_digest(row)
+            index_writer.writerow([f"{key_hash:016x}", f"{content_hash:016x}", *key])
+            seen.add(key_hash)
+
+            entry = previous.get(key_hash)
+            if entry is None:
+                change_type = 'added'
+            elif content_hash in entry[0]:
+                continue
+            else:
+                change_type = 'changed'
+            counts[change_type] += 1
+            writer.writerow({'change_type': change_type, **row})
+
+        for key_hash, (_, *key) in previous.items():
+            if key_hash not in seen:
+                counts['removed'] += 1
+                writer.writerow({'change_type': 'removed', **dict(zip(KEY_COLUMNS, key))})
+
+    logger.info(f"Delta against previous run: {counts['added']} added, {counts['changed']} changed, {counts['removed']} removed")
+    return counts
+
+def commit_index(index_path):
+    """Make the index written by diff_output the baseline for the next run"""
+    os.replace(f"{index_path}.new", index_path)
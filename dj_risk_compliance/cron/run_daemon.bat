@@ -0,0 +1,10 @@
+@echo off
+REM Absolute Th Path
+cd C:\Users\User_Name\dj_risk_compliance
+
+REM Activate virtual environment 
+call venv\Scripts\activate.bat
+
+REM Run the cron pipeline as a long-running watcher
+python -m cron.dowjones_cron --daemon
+
@@ -0,0 +1,10 @@
+@echo off
+REM Absolute Th Path
+cd C:\Users\User_Name\dj_risk_compliance
+
+REM Activate virtual environment 
+call venv\Scripts\activate.bat
+
+REM Screen shards from the shared work queue (set DJ_WORK_QUEUE_PATH and DJ_WORK_DIR)
+python -m cron.dowjones_cron --worker
+
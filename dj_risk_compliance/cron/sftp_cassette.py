@@ -0,0 +1,259 @@
+import hashlib
+import logging
+import os
+import time
+from types import SimpleNamespace
+
+from app.cassette import CassetteMiss, decode_bytes, encode_bytes
+
+
+logger = logging.getLogger(__name__)
+
+ATTRIBUTE_FIELDS = ("st_size", "st_mtime", "st_atime", "st_mode")
+
+
+def _attributes(attr, with_filename=False):
+    fields = {name: getattr(attr, name, None) for name in ATTRIBUTE_FIELDS}
+    if with_filename:
+        fields["filename"] = attr.filename
+    return fields
+
+
+def _file_digest(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+class RecordingFile:
+    """Remote file wrapper that keeps the bytes read, recorded when the file is closed"""
+
+    def __init__(self, remote_file, recorder, path):
+        self._file = remote_file
+        self._recorder = recorder
+        self._path = path
+        self._offset = 0
+        self._chunks = []
+        self._started = time.perf_counter()
+        self._recorded = False
+
+    def seek(self, offset, whence=0):
+        self._offset = offset
+        return self._file.seek(offset, whence)
+
+    def prefetch(self, *args, **kwargs):
+        return self._file.prefetch(*args, **kwargs)
+
+    def read(self, size=None):
+        chunk = self._file.read(size)
+        self._chunks.append(chunk)
+        return chunk
+
+    def close(self):
+        self._file.close()
+        if not self._recorded:
+            self._recorded = True
+            self._recorder._record("read", self._path, self._started,
+                                   offset=self._offset, data=encode_bytes(b''.join(self._chunks)))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RecordingSFTP:
+    """Proxy of a paramiko SFTP session that records every call on the cassette.
+
+    Listings, stats and downloaded bytes are kept so a replay can serve them;
+    uploads only keep their size and digest, which is enough to compare the
+    output of two runs over the same inputs.
+    """
+
+    def __init__(self, sftp, server, cassette):
+        self._sftp = sftp
+        self.server = server
+        self.cassette = cassette
+
+    def _record(self, op, path, started, **fields):
+        self.cassette.record("sftp", f"{self.server} {op} {path}", time.perf_counter() - started, **fields)
+
+    def _call(self, op, path, func, *args):
+        """Run and record an operation whose only outcome is success or an IOError"""
+        started = time.perf_counter()
+        try:
+            result = func(*args)
+        except IOError as e:
+            self._record(op, path, started, error=[e.errno, e.strerror or str(e)])
+            raise
+        self._record(op, path, started)
+        return result
+
+    def stat(self, path):
+        started = time.perf_counter()
+        try:
+            attr = self._sftp.stat(path)
+        except IOError as e:
+            self._record("stat", path, started, error=[e.errno, e.strerror or str(e)])
+            raise
+        self._record("stat", path, started, attributes=_attributes(attr))
+        return attr
+
+    def listdir_attr(self, path):
+        started = time.perf_counter()
+        attrs = self._sftp.listdir_attr(path)
+        self._record("listdir_attr", path, started, attributes=[_attributes(attr, True) for attr in attrs])
+        return attrs
+
+    def open(self, path, mode='r', *args, **kwargs):
+        remote_file = self._sftp.open(path, mode, *args, **kwargs)
+        return RecordingFile(remote_file, self, path) if 'r' in mode else remote_file
+
+    def put(self, local_path, remote_path, *args, **kwargs):
+        started = time.perf_counter()
+        result = self._sftp.put(local_path, remote_path, *args, **kwargs)
+        self._record("put", remote_path, started, size=os.path.getsize(local_path), digest=_file_digest(local_path))
+        return result
+
+    def posix_rename(self, old_path, new_path):
+        return self._call("posix_rename", old_path, self._sftp.posix_rename, old_path, new_path)
+
+    def rename(self, old_path, new_path):
+        return self._call("rename", old_path, self._sftp.rename, old_path, new_path)
+
+    def remove(self, path):
+        return self._call("remove", path, self._sftp.remove, path)
+
+    def mkdir(self, path, *args):
+        return self._call("mkdir", path, self._sftp.mkdir, path, *args)
+
+    def get_channel(self):
+        return self._sftp.get_channel()
+
+    def close(self):
+        self._sftp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ReplayFile:
+    """Remote file served from the bytes a recording read"""
+
+    def __init__(self, data, offset):
+        self._data = data
+        self._base = offset
+        self._position = offset
+
+    def seek(self, offset, whence=0):
+        self._position = offset
+
+    def prefetch(self, *args, **kwargs):
+        pass
+
+    def read(self, size=None):
+        start = self._position - self._base
+        end = len(self._data) if size is None else start + size
+        chunk = self._data[start:end]
+        self._position += len(chunk)
+        return chunk
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _ReplayTransport:
+    def __init__(self):
+        self.active = True
+
+    def is_active(self):
+        return self.active
+
+    def set_keepalive(self, interval):
+        pass
+
+    def close(self):
+        self.active = False
+
+
+class _ReplayChannel:
+    def __init__(self, transport):
+        self._transport = transport
+
+    @property
+    def closed(self):
+        return not self._transport.active
+
+    def get_transport(self):
+        return self._transport
+
+
+class ReplaySFTP:
+    """Stand-in SFTP session answering from a cassette after the recorded (scaled) time"""
+
+    def __init__(self, server, cassette):
+        self.server = server
+        self.cassette = cassette
+        self._channel = _ReplayChannel(_ReplayTransport())
+
+    def _take(self, op, path):
+        entry = self.cassette.take("sftp", f"{self.server} {op} {path}")
+        time.sleep(self.cassette.delay(entry))
+        if entry.get("error"):
+            code, message = entry["error"]
+            raise IOError(code, message) if code is not None else IOError(message)
+        return entry
+
+    def stat(self, path):
+        return SimpleNamespace(**self._take("stat", path)["attributes"])
+
+    def listdir_attr(self, path):
+        return [SimpleNamespace(**attr) for attr in self._take("listdir_attr", path)["attributes"]]
+
+    def open(self, path, mode='r', *args, **kwargs):
+        if 'r' not in mode:
+            raise CassetteMiss(f"Replay cannot open {path} for writing")
+        entry = self._take("read", path)
+        return ReplayFile(decode_bytes(entry["data"]), entry.get("offset", 0))
+
+    def put(self, local_path, remote_path, *args, **kwargs):
+        entry = self._take("put", remote_path)
+        if entry.get("digest") != _file_digest(local_path):
+            logger.info(f"Replayed upload of {remote_path} differs from the recording "
+                        f"({os.path.getsize(local_path)} bytes, recorded {entry.get('size')})")
+
+    def posix_rename(self, old_path, new_path):
+        self._take("posix_rename", old_path)
+
+    def rename(self, old_path, new_path):
+        self._take("rename", old_path)
+
+    def remove(self, path):
+        self._take("remove", path)
+
+    def mkdir(self, path, *args):
+        self._take("mkdir", path)
+
+    def get_channel(self):
+        return self._channel
+
+    def close(self):
+        self._channel.get_transport().close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
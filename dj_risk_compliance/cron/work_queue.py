@@ -0,0 +1,159 @@
+import json
+import sqlite3
+import time
+import logging
+from contextlib import contextmanager
+
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    source TEXT,
+    created_at REAL NOT NULL,
+    shard_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS shards (
+    job_id TEXT NOT NULL,
+    shard_no INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    lease_owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result_path TEXT,
+    match_count INTEGER,
+    error TEXT,
+    PRIMARY KEY (job_id, shard_no)
+);
+CREATE INDEX IF NOT EXISTS ix_shards_status ON shards (status, lease_expires);
+"""
+
+
+class WorkQueue:
+    """Durable shard queue in a SQLite file, shareable between processes and hosts.
+
+    The coordinator adds a job split into shards; workers claim one shard at
+    a time under a lease that they renew while working. A shard whose lease
+    runs out is handed to the next worker, up to ``max_attempts`` times. The
+    default rollback journal is used rather than WAL so the file also works
+    on shared network storage.
+    """
+
+    def __init__(self, path, max_attempts=3):
+        self.path = path
+        self.max_attempts = max_attempts
+        with self._connect() as connection:
+            connection.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=60.0, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._connect() as connection:
+            # Take the write lock up front so two workers cannot claim the same shard
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+
+    def create_job(self, job_id, shards, source=None):
+        """Add a job; each shard payload must be JSON serializable"""
+        with self._transaction() as connection:
+            connection.execute(
+                "INSERT INTO jobs (job_id, source, created_at, shard_count) VALUES (?, ?, ?, ?)",
+                (job_id, source, time.time(), len(shards))
+            )
+            connection.executemany(
+                "INSERT INTO shards (job_id, shard_no, payload) VALUES (?, ?, ?)",
+                [(job_id, shard_no, json.dumps(payload)) for shard_no, payload in enumerate(shards)]
+            )
+        logger.info(f"Queued job {job_id} with {len(shards)} shard(s)")
+
+    def claim(self, worker_id, lease_seconds):
+        """Lease the next pending or expired shard; returns a dict or None"""
+        now = time.time()
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT s.job_id, s.shard_no, s.payload, s.attempts, j.source FROM shards s "
+                "JOIN jobs j ON j.job_id = s.job_id "
+                "WHERE (s.status = 'pending' OR (s.status = 'leased' AND s.lease_expires < ?)) "
+                "AND s.attempts < ? ORDER BY j.created_at, s.shard_no LIMIT 1",
+                (now, self.max_attempts)
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE shards SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE job_id = ? AND shard_no = ?",
+                (worker_id, now + lease_seconds, row["job_id"], row["shard_no"])
+            )
+        return {
+            "job_id": row["job_id"],
+            "shard_no": row["shard_no"],
+            "source": row["source"],
+            "attempt": row["attempts"] + 1,
+            "payload": json.loads(row["payload"])
+        }
+
+    def renew(self, job_id, shard_no, worker_id, lease_seconds):
+        """Extend a lease; False when the shard was taken over by another worker"""
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE shards SET lease_expires = ? WHERE job_id = ? AND shard_no = ? "
+                "AND status = 'leased' AND lease_owner = ?",
+                (time.time() + lease_seconds, job_id, shard_no, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id, shard_no, worker_id, result_path, match_count):
+        """Record a shard's result; False when the worker no longer holds its lease"""
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE shards SET status = 'done', result_path = ?, match_count = ?, error = NULL "
+                "WHERE job_id = ? AND shard_no = ? AND status = 'leased' AND lease_owner = ?",
+                (result_path, match_count, job_id, shard_no, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, job_id, shard_no, worker_id, error):
+        """Release a shard after an error; it is retried until max_attempts is reached"""
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE shards SET status = CASE WHEN attempts < ? THEN 'pending' ELSE 'failed' END, "
+                "lease_owner = NULL, lease_expires = NULL, error = ? "
+                "WHERE job_id = ? AND shard_no = ? AND lease_owner = ?",
+                (self.max_attempts, str(error), job_id, shard_no, worker_id)
+            )
+
+    def progress(self, job_id):
+        """Shard counts by status, with expired leases past max_attempts counted as failed"""
+        now = time.time()
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT CASE WHEN status = 'leased' AND lease_expires < ? AND attempts >= ? THEN 'failed' "
+                "ELSE status END AS state, COUNT(*) AS n FROM shards WHERE job_id = ? GROUP BY state",
+                (now, self.max_attempts, job_id)
+            ).fetchall()
+        return {row["state"]: row["n"] for row in rows}
+
+    def results(self, job_id):
+        """(shard_no, result_path, match_count) of the completed shards, in shard order"""
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT shard_no, result_path, match_count FROM shards "
+                "WHERE job_id = ? AND status = 'done' ORDER BY shard_no",
+                (job_id,)
+            ).fetchall()
+        return [(row["shard_no"], row["result_path"], row["match_count"]) for row in rows]
@@ -0,0 +1,103 @@
+"""Production server: several uvicorn workers, with uvloop and httptools when installed.
+
+Usage: python serve.py [--host 0.0.0.0] [--port 8000] [--workers N] [--graceful-timeout 30]
+
+Each worker warms up on start (Dow Jones token, connection pools, encoders)
+and answers /ready with 503 until it is warm, so the load balancer's health
+check should point at /ready. run.py remains the development server.
+
+The Dow Jones limits in the settings (concurrency, request spacing, account
+budgets, hedge burst) are for the whole service: DJ_WORKERS tells every
+worker to enforce its share, and there are never more workers than the
+smallest of those limits. Workers publish their metrics to DJ_METRICS_DIR
+(a fresh temporary directory unless set), and /metrics on any worker renders
+all of them with a worker label.
+"""
+import argparse
+import glob
+import importlib.util
+import inspect
+import logging
+import os
+import tempfile
+
+import uvicorn
+
+from app.config import max_workers
+
+logger = logging.getLogger(__name__)
+
+
+def default_workers() -> int:
+    """WEB_CONCURRENCY when set, else one worker per CPU this process may run on"""
+    if os.getenv("WEB_CONCURRENCY"):
+        return max(1, int(os.environ["WEB_CONCURRENCY"]))
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    return max(1, cpus)
+
+
+def installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def prepare_metrics_dir() -> str:
+    """Directory the workers publish their metrics to, emptied of a previous server's files"""
+    directory = os.getenv("DJ_METRICS_DIR") or tempfile.mkdtemp(prefix="dj_metrics_")
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        os.remove(path)
+    return directory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--graceful-timeout", type=float, default=30.0,
+                        help="Seconds in-flight requests get to finish after SIGTERM")
+    parser.add_argument("--keep-alive", type=int, default=5, help="Idle keep-alive timeout in seconds")
+    parser.add_argument("--forwarded-allow-ips", default=os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"))
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--no-access-log", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:     %(message)s")
+
+    # Every worker needs a share of the concurrency limit and of each account's request budget
+    if args.workers > max_workers():
+        logger.warning(f"Starting {max_workers()} workers instead of {args.workers}: "
+                       f"the Dow Jones limits cannot be split across more")
+        args.workers = max_workers()
+
+    # Read by app.config in every worker process
+    os.environ["DJ_WORKERS"] = str(args.workers)
+    if args.workers > 1:
+        os.environ["DJ_METRICS_DIR"] = prepare_metrics_dir()
+        logger.info(f"Service-wide Dow Jones limits are split across {args.workers} workers; "
+                    f"metrics are shared through {os.environ['DJ_METRICS_DIR']}")
+
+    options = dict(
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop="uvloop" if installed("uvloop") else "asyncio",
+        http="httptools" if installed("httptools") else "h11",
+        proxy_headers=True,
+        forwarded_allow_ips=args.forwarded_allow_ips,
+        timeout_keep_alive=args.keep_alive,
+        log_level=args.log_level,
+        access_log=not args.no_access_log
+    )
+    # Older uvicorn releases lack the shutdown timeout and wait for in-flight requests indefinitely
+    if "timeout_graceful_shutdown" in inspect.signature(uvicorn.Config).parameters:
+        options["timeout_graceful_shutdown"] = args.graceful_timeout
+    logger.info(f"Starting {args.workers} worker(s) on {args.host}:{args.port} "
+                f"(loop={options['loop']}, http={options['http']})")
+    uvicorn.run("app.main:app", **options)
+
+
+if __name__ == "__main__":
+    main()
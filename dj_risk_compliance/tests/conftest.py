@@ -0,0 +1,52 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Settings() and the cron paths are read at import time, so give them test values first
+_workdir = tempfile.mkdtemp(prefix="dj_tests_")
+for name, value in {
+    "DJ_CLIENT_ID": "test-client",
+    "DJ_USERNAME": "test-user",
+    "DJ_PASSWORD": "test-password",
+    "SFTP_HOST": "localhost",
+    "SFTP_USERNAME": "test",
+    "SFTP_PASSWORD": "test",
+    "LOCAL_INPUT_PATH": os.path.join(_workdir, "input"),
+    "LOCAL_OUTPUT_PATH": os.path.join(_workdir, "output"),
+    "LOCAL_LOG_PATH": os.path.join(_workdir, "logs"),
+    "LOCAL_STATE_PATH": os.path.join(_workdir, "state"),
+    "MATCH_STORE_PATH": os.path.join(_workdir, "match_store.db"),
+}.items():
+    os.environ.setdefault(name, value)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def make_service(monkeypatch):
+    """DowJonesAPIService on fresh accounts, scheduler and client, sending to an httpx mock handler"""
+    httpx = pytest.importorskip("httpx")
+    from app.auth.pool import CredentialPool
+    from app.config import DJAccount
+    from app.services import dj_api
+    from app.services.scheduler import RequestScheduler
+
+    def make(handler, account_names=("primary",), hedging=None):
+        accounts = [DJAccount(name=name, client_id=name, username=name, password="secret") for name in account_names]
+        pool = CredentialPool(accounts, budget=100)
+        for account in pool.accounts:
+            async def token(name=account.name):
+                return f"Bearer {name}"
+            account.auth_service.get_valid_token = token
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(dj_api, "get_http_client", lambda: client)
+        service = dj_api.DowJonesAPIService()
+        service.credentials = pool
+        service.scheduler = RequestScheduler(max_concurrency=4, reserved_interactive=1, weights={})
+        service.hedging = hedging
+        return service, pool
+
+    return make
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from app.auth.pool import CredentialPool
+from app.config import DJAccount
+from app.services import dj_api
+from app.services.scheduler import RequestScheduler
+
+
+def make_service(monkeypatch, handler, account_names):
+    accounts = [DJAccount(name=name, client_id=name, username=name, password="secret") for name in account_names]
+    pool = CredentialPool(accounts, budget=100)
+    for account in pool.accounts:
+        async def token(name=account.name):
+            return f"Bearer {name}"
+        account.auth_service.get_valid_token = token
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(dj_api, "get_http_client", lambda: client)
+    service = dj_api.DowJonesAPIService()
+    service.credentials = pool
+    service.scheduler = RequestScheduler(max_concurrency=4, reserved_interactive=1, weights={})
+    service.hedging = None
+    return service, pool
+
+
+class CaseOwners:
+    """Upstream where each case is only visible to the account that created it"""
+
+    def __init__(self, owners):
+        self.owners = owners
+        self.calls = []
+
+    def __call__(self, request):
+        account = request.headers["Authorization"].split()[-1]
+        case_id = request.url.path.split("/")[2]
+        self.calls.append(account)
+        if self.owners.get(case_id) != account:
+            return httpx.Response(404, json={"errors": [{"detail": "Case not found"}]})
+        return httpx.Response(200, json={"data": [{"attributes": {"matches": [{"match_id": "m1"}]}}]})
+
+
+def test_case_created_elsewhere_is_found_on_its_account_and_bound(monkeypatch):
+    upstream = CaseOwners({"case-9": "third"})
+    service, pool = make_service(monkeypatch, upstream, ["primary", "second", "third"])
+
+    async def run():
+        first = await service.get_case_matches("case-9")
+        second = await service.get_case_matches("case-9")
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert first == second
+    assert pool.case_account("case-9") == "third"
+    assert upstream.calls[-1] == "third"
+    # Once bound, the second read went straight to the owning account
+    assert upstream.calls.count("third") == 2
+    assert len(upstream.calls) <= 4
+
+
+def test_missing_case_fails_after_every_account_is_tried(monkeypatch):
+    upstream = CaseOwners({})
+    service, pool = make_service(monkeypatch, upstream, ["primary", "second"])
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(service._send("GET", "/risk-entity-screening-cases/case-0/matches", "polling", {}))
+
+    assert sorted(upstream.calls) == ["primary", "second"]
+    assert pool.case_account("case-0") is None
+
+
+def test_bound_case_is_not_retried_on_other_accounts(monkeypatch):
+    upstream = CaseOwners({})
+    service, pool = make_service(monkeypatch, upstream, ["primary", "second"])
+    pool.bind_case("case-1", "primary")
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(service._send("GET", "/risk-entity-screening-cases/case-1/matches", "polling", {}))
+
+    assert upstream.calls == ["primary"]
@@ -0,0 +1,54 @@
+import pytest
+
+pytest.importorskip("fastapi")
+from fastapi.testclient import TestClient
+
+from app.api import endpoints
+from app.main import app
+
+
+class FakeService:
+    submitted = []
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def create_screening_case(self, payload):
+        associations = payload["data"]["attributes"]["case_info"]["associations"]
+        FakeService.submitted = [item["names"][0]["single_string_name"] for item in associations]
+        return {"data": {"id": "tx-1", "attributes": {"case_id": "case-1"}}}
+
+    async def get_transaction_details(self, case_id, transaction_id):
+        return {"data": {"attributes": {"status": "COMPLETED"}}}
+
+    async def wait_for_matches(self, case_id, max_wait_seconds):
+        return {"data": []}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(endpoints, "DowJonesAPIService", FakeService)
+    return TestClient(app)
+
+
+def test_names_empty_after_normalization_are_reported_as_rejected(client):
+    response = client.post(
+        "/api/v1/screening/bulk-associations",
+        json={"names": ["José Núñez", "---", "jose nunez", "   "]}
+    )
+
+    assert response.status_code == 200
+    assert FakeService.submitted == ["José Núñez"]
+    assert response.json()["inputs"] == [
+        {"input_index": 0, "input_name": "José Núñez", "screened_name": "José Núñez"},
+        {"input_index": 1, "input_name": "---", "screened_name": None, "rejected": "empty after normalization"},
+        {"input_index": 2, "input_name": "jose nunez", "screened_name": "José Núñez"},
+        {"input_index": 3, "input_name": "   ", "screened_name": None, "rejected": "empty after normalization"},
+    ]
+
+
+def test_only_empty_names_are_refused(client):
+    response = client.post("/api/v1/screening/bulk-associations", json={"names": ["!!", ""]})
+
+    assert response.status_code == 422
+    assert [item["rejected"] for item in response.json()["detail"]["inputs"]] == ["empty after normalization"] * 2
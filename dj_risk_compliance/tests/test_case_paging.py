@@ -0,0 +1,47 @@
+import asyncio
+
+from cron import dowjones_cron
+
+
+class PagedService:
+    """Serves a case's matches the way the API pages them, one match per data item"""
+
+    def __init__(self, total):
+        self.matches = [{"match_id": f"m{i}"} for i in range(total)]
+        self.calls = []
+
+    async def get_case_matches(self, case_id, limit=5000, offset=0, filters=None):
+        self.calls.append((limit, offset))
+        items = self.matches[offset:offset + limit]
+        return {"data": [{"attributes": {"matches": [match]}} for match in items]}
+
+
+def collect(service, limit):
+    async def run():
+        first_page = await dowjones_cron.wait_for_case_matches(service, "case-1")
+        pages = []
+        async for page in dowjones_cron.iter_case_match_pages(service, "case-1", first_page, limit=limit):
+            pages.append(page)
+        return pages
+    return asyncio.run(run())
+
+
+def test_pages_smaller_than_total_cover_every_match_once(monkeypatch):
+    monkeypatch.setattr(dowjones_cron, "MATCHES_PAGE_LIMIT", 2)
+    service = PagedService(total=9)
+
+    pages = collect(service, limit=2)
+
+    seen = [match["match_id"] for page in pages for match in dowjones_cron.iter_response_matches(page)]
+    assert seen == [f"m{i}" for i in range(9)]
+    assert service.calls == [(2, 0), (2, 2), (2, 4), (2, 6), (2, 8)]
+
+
+def test_exact_multiple_of_page_limit_stops_on_empty_page(monkeypatch):
+    monkeypatch.setattr(dowjones_cron, "MATCHES_PAGE_LIMIT", 3)
+    service = PagedService(total=6)
+
+    pages = collect(service, limit=3)
+
+    seen = [match["match_id"] for page in pages for match in dowjones_cron.iter_response_matches(page)]
+    assert seen == [f"m{i}" for i in range(6)]
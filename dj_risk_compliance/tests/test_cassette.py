@@ -0,0 +1,65 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from app.cassette import REDACTED, Cassette, RecordingTransport, ReplayTransport
+
+PASSWORD = "hunter2-password"
+ID_TOKEN = "eyJhbGciOiJSUzI1NiJ9.id-token-payload.signature"
+REFRESH_TOKEN = "refresh-token-3f9a1c"
+ACCESS_TOKEN = "eyJhbGciOiJSUzI1NiJ9.access-token-payload.signature"
+
+
+class Upstream(httpx.AsyncBaseTransport):
+    """Auth server and API answering with unread streams, as the network transport does"""
+
+    async def handle_async_request(self, request):
+        if request.url.path == "/oauth2/v1/token":
+            grant = json.loads(await request.aread())["grant_type"]
+            if grant == "password":
+                body = {"id_token": ID_TOKEN, "refresh_token": REFRESH_TOKEN, "token_type": "Bearer"}
+            else:
+                body = {"access_token": ACCESS_TOKEN, "token_type": "Bearer", "expires_in": 3600}
+            # Token answers are gzip encoded, like the real auth server's
+            headers = {"Content-Encoding": "gzip", "Content-Type": "application/json"}
+            content = gzip.compress(json.dumps(body).encode())
+        else:
+            headers = {"Content-Type": "application/json", "Authorization": request.headers["Authorization"]}
+            content = json.dumps({"data": {"attributes": {"case_id": "case-1"}}}).encode()
+        return httpx.Response(200, headers=headers, stream=httpx.ByteStream(content))
+
+
+async def exchange(transport):
+    async with httpx.AsyncClient(transport=transport, base_url="https://dj.example") as client:
+        login = await client.post("/oauth2/v1/token", json={"grant_type": "password", "password": PASSWORD})
+        bearer = await client.post("/oauth2/v1/token", json={"grant_type": "jwt", "assertion": login.json()["id_token"]})
+        case = await client.get("/risk-entity-screening-cases/case-1",
+                                headers={"Authorization": f"Bearer {bearer.json()['access_token']}"})
+        return login.json(), bearer.json(), case.json()
+
+
+def test_recorded_cassette_holds_no_credentials(tmp_path):
+    path = str(tmp_path / "session.jsonl.gz")
+    cassette = Cassette(path, "record")
+
+    login, bearer, case = asyncio.run(exchange(RecordingTransport(cassette, Upstream())))
+    cassette.save()
+
+    # The live caller still gets the real tokens
+    assert login["id_token"] == ID_TOKEN and bearer["access_token"] == ACCESS_TOKEN
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        recorded = f.read()
+    for secret in (PASSWORD, ID_TOKEN, REFRESH_TOKEN, ACCESS_TOKEN, "id-token-payload", "access-token-payload"):
+        assert secret not in recorded
+    entries = [json.loads(line) for line in recorded.splitlines()[1:]]
+    assert all(entry["body_digest"] is None for entry in entries[:2])
+
+    replayed = Cassette(path, "replay", speed=0)
+    login, bearer, case = asyncio.run(exchange(ReplayTransport(replayed)))
+    assert login == {"id_token": REDACTED, "refresh_token": REDACTED, "token_type": "Bearer"}
+    assert bearer == {"access_token": REDACTED, "token_type": "Bearer", "expires_in": 3600}
+    assert case == {"data": {"attributes": {"case_id": "case-1"}}}
@@ -0,0 +1,142 @@
+import asyncio
+import time
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from app.deadlines import DeadlineExceeded, DeadlineMiddleware, deadline_scope, fit_delay, within_deadline
+
+
+class StalledHandler:
+    """ASGI app that never answers, noting whether it was cancelled"""
+
+    def __init__(self):
+        self.cancelled = False
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+def http_scope(timeout):
+    return {
+        "type": "http",
+        "method": "GET",
+        "path": "/api/v1/search/name",
+        "headers": [(b"x-request-timeout", str(timeout).encode())]
+    }
+
+
+class StalledUpstream:
+    """Upstream that holds every request until the test is done with it"""
+
+    def __init__(self):
+        self.received = asyncio.Event()
+
+    async def __call__(self, request):
+        self.received.set()
+        await asyncio.sleep(5)
+        return httpx.Response(200, json={})
+
+
+def test_fit_delay_leaves_half_the_remaining_budget():
+    assert fit_delay(30.0) == 30.0
+    with deadline_scope(10.0):
+        assert 4.0 < fit_delay(30.0) <= 5.0
+        assert fit_delay(1.0) == 1.0
+    with deadline_scope(-1.0):
+        with pytest.raises(DeadlineExceeded):
+            fit_delay(1.0)
+
+
+def test_upstream_call_is_cancelled_when_the_deadline_passes():
+    async def run():
+        with deadline_scope(0.05):
+            await within_deadline(asyncio.sleep(5))
+
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(run())
+    assert time.monotonic() - started < 2
+
+
+def test_middleware_answers_504_and_cancels_the_handler_at_the_deadline():
+    app = StalledHandler()
+    sent = []
+
+    async def receive():
+        await asyncio.sleep(5)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asyncio.wait_for(DeadlineMiddleware(app)(http_scope(0.05), receive, send), timeout=2))
+
+    assert app.cancelled
+    assert sent[0]["status"] == 504
+    assert b"deadline" in sent[1]["body"]
+
+
+def test_middleware_cancels_the_handler_when_the_client_disconnects():
+    app = StalledHandler()
+    sent = []
+    messages = [{"type": "http.request", "body": b""}, {"type": "http.disconnect"}]
+
+    async def receive():
+        await asyncio.sleep(0.05)
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asyncio.wait_for(DeadlineMiddleware(app)(http_scope(30), receive, send), timeout=2))
+
+    assert app.cancelled
+    assert sent == []
+
+
+def test_request_cancelled_while_queued_holds_no_slot_or_account(make_service):
+    service, pool = make_service(StalledUpstream())
+
+    async def run():
+        service.scheduler.max_concurrency = 1
+        async with service.scheduler.slot():
+            request = asyncio.create_task(service._send("GET", "/risk-entity-screening-cases/c1", "polling", {}))
+            await asyncio.sleep(0.01)
+            assert service.scheduler.stats()["queued"]["polling"] == 1
+            request.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await request
+        return service.scheduler.stats()
+
+    stats = asyncio.run(run())
+
+    assert stats["in_flight"] == 0
+    assert stats["queued"]["polling"] == 0
+    assert [account.in_flight for account in pool.accounts] == [0]
+
+
+@pytest.mark.parametrize("stop", ["cancel", "deadline"])
+def test_request_stopped_upstream_releases_its_slot_and_account(make_service, stop):
+    upstream = StalledUpstream()
+    service, pool = make_service(upstream, ["primary", "second"])
+
+    async def run():
+        with deadline_scope(0.05 if stop == "deadline" else 30):
+            request = asyncio.create_task(service._send("GET", "/risk-entity-screening-cases/c1", "polling", {}))
+        await asyncio.wait_for(upstream.received.wait(), timeout=1)
+        assert service.scheduler.stats()["in_flight"] == 1
+        if stop == "cancel":
+            request.cancel()
+        with pytest.raises((asyncio.CancelledError, DeadlineExceeded)):
+            await asyncio.wait_for(request, timeout=2)
+        return service.scheduler.stats()
+
+    stats = asyncio.run(run())
+
+    assert stats["in_flight"] == 0
+    assert [account.in_flight for account in pool.accounts] == [0, 0]
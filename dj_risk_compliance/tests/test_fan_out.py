@@ -0,0 +1,40 @@
+from app.metrics import FAN_OUT_UNRESOLVED
+from app.services.name_normalization import dedupe_names
+from cron.dowjones_cron import iter_response_matches
+
+
+def unresolved():
+    return dict(FAN_OUT_UNRESOLVED.samples()).get((), 0.0)
+
+
+def association_item(name, *peids):
+    return {
+        'attributes': {
+            'association': {'names': [{'single_string_name': name}]},
+            'matches': [{'peid': peid} for peid in peids]
+        }
+    }
+
+
+def test_matches_are_repeated_for_every_duplicate_input_row():
+    _, name_index = dedupe_names(['Jose Garcia', 'JOSÉ GARCIA', 'Ann Lee'])
+    response = {'data': [association_item('Jose Garcia', 'p1'), association_item('Ann Lee', 'p2')]}
+    before = unresolved()
+
+    rows = [(match['peid'], match['input_index']) for match in iter_response_matches(response, name_index)]
+
+    assert rows == [('p1', 0), ('p1', 1), ('p2', 2)]
+    assert unresolved() == before
+
+
+def test_unresolved_associations_and_flat_pages_are_counted():
+    _, name_index = dedupe_names(['Jose Garcia', 'Jose Garcia'])
+    response = {'data': [association_item('Somebody Else', 'p1', 'p2')]}
+    flat = {'matches': [{'peid': 'p3'}, {'peid': 'p4', 'association': {'single_string_name': 'Jose Garcia'}}]}
+    before = unresolved()
+
+    rows = list(iter_response_matches(response, name_index)) + list(iter_response_matches(flat, name_index))
+
+    assert [match['peid'] for match in rows] == ['p1', 'p2', 'p3', 'p4', 'p4']
+    assert [match.get('input_index') for match in rows[3:]] == [0, 1]
+    assert unresolved() == before + 3
@@ -0,0 +1,47 @@
+import asyncio
+import time
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from app.config import settings
+from app.services.hedging import HedgeBudget, HedgingPolicy, LatencyTracker
+
+PROFILE_LABEL = "/riskentities/profiles/{profile_id}"
+
+
+class SlowFirstProfile:
+    """Profile endpoint whose first request stalls and later ones answer at once"""
+
+    def __init__(self):
+        self.requests = []
+
+    async def __call__(self, request):
+        self.requests.append(request)
+        if len(self.requests) == 1:
+            await asyncio.sleep(5)
+        return httpx.Response(200, json={"data": {"id": request.url.path.rsplit("/", 1)[-1]}})
+
+
+def test_slow_profile_read_is_hedged(make_service):
+    tracker = LatencyTracker(percentile=95, min_samples=5, min_delay=0.01)
+    for _ in range(5):
+        tracker.observe(PROFILE_LABEL, 0.02)
+    budget = HedgeBudget(ratio=1.0)
+    upstream = SlowFirstProfile()
+    service, _ = make_service(upstream, hedging=HedgingPolicy(tracker, budget))
+
+    async def run():
+        return await asyncio.wait_for(service.get_risk_profile("12345"), timeout=2)
+
+    started = time.monotonic()
+    result = asyncio.run(run())
+
+    assert result == {"data": {"id": "12345"}}
+    # The hedge answered while the first request was still stalled
+    assert len(upstream.requests) == 2
+    assert time.monotonic() - started < 1
+    for request in upstream.requests:
+        assert request.headers["Accept"] == settings.profiles_api_version
+        assert request.headers["cache-control"] == "no-cache"
@@ -0,0 +1,37 @@
+from app.services.match_store import MatchStore
+
+
+def response(*matches):
+    return {"data": [{"attributes": {
+        "names": [{"single_string_name": "Jane Doe"}],
+        "matches": list(matches)
+    }}]}
+
+
+def test_rereading_a_case_records_each_match_once(tmp_path):
+    store = MatchStore(str(tmp_path / "store.db"))
+    page = response({"match_id": "m1", "peid": "1", "score": 0.9}, {"match_id": "m2", "peid": "2", "score": 0.8})
+
+    assert store.add_response(page, "case-1", "api", only_changed=True) == 2
+    assert store.add_response(page, "case-1", "api", only_changed=True) == 0
+    assert store.query(case_id="case-1")["meta"]["total"] == 2
+
+
+def test_changed_match_is_recorded_again(tmp_path):
+    store = MatchStore(str(tmp_path / "store.db"))
+    store.add_response(response({"match_id": "m1", "score": 0.9}), "case-1", "api", only_changed=True)
+
+    assert store.add_response(response({"match_id": "m1", "score": 0.5}), "case-1", "api", only_changed=True) == 1
+    assert store.add_response(response({"match_id": "m1", "score": 0.5}), "case-1", "api", only_changed=True) == 0
+    # Same match under another case is its own history
+    assert store.add_response(response({"match_id": "m1", "score": 0.5}), "case-2", "api", only_changed=True) == 1
+
+
+def test_cron_runs_keep_a_row_per_run(tmp_path):
+    store = MatchStore(str(tmp_path / "store.db"))
+    page = response({"match_id": "m1"})
+
+    store.add_response(page, "case-1", "cron")
+    store.add_response(page, "case-1", "cron")
+
+    assert store.query(case_id="case-1")["meta"]["total"] == 2
@@ -0,0 +1,14 @@
+import pytest
+
+pytest.importorskip("fastapi")
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.metrics import CONTENT_TYPE
+
+
+def test_metrics_content_type_has_one_charset():
+    response = TestClient(app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == CONTENT_TYPE
@@ -0,0 +1,52 @@
+import csv
+
+from cron.output_diff import commit_index, diff_output
+
+COLUMNS = ['peid', 'match_name', 'match_type', 'match_id', 'score', 'input_name', 'input_index']
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def read_delta(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def screen(tmp_path, run, names, case, scores=None):
+    """Rows of one run: every input matches one entity, ids are numbered per case"""
+    scores = scores or {}
+    rows = [
+        {'peid': f"p-{name}", 'match_name': name.title(), 'match_type': 'Precise',
+         'match_id': f"{case}-{position}", 'score': scores.get(name, '0.9'),
+         'input_name': name, 'input_index': position}
+        for position, name in enumerate(names)
+    ]
+    csv_path = tmp_path / f"run{run}.csv"
+    write_csv(csv_path, rows)
+    index_path = str(tmp_path / "index.tsv.gz")
+    counts = diff_output(str(csv_path), index_path, str(tmp_path / f"delta{run}.csv"))
+    commit_index(index_path)
+    return counts
+
+
+def test_inserted_input_row_is_the_only_change(tmp_path):
+    screen(tmp_path, 1, ['alice', 'bob', 'carol'], case='case-a')
+
+    counts = screen(tmp_path, 2, ['zoe', 'alice', 'bob', 'carol'], case='case-b')
+
+    assert counts == {'added': 1, 'changed': 0, 'removed': 0}
+    assert [row['input_name'] for row in read_delta(tmp_path / "delta2.csv")] == ['zoe']
+
+
+def test_material_change_is_still_reported(tmp_path):
+    screen(tmp_path, 1, ['alice', 'bob'], case='case-a')
+
+    counts = screen(tmp_path, 2, ['bob', 'alice'], case='case-b', scores={'bob': '0.4'})
+
+    assert counts == {'added': 0, 'changed': 1, 'removed': 0}
+    assert read_delta(tmp_path / "delta2.csv")[0]['input_name'] == 'bob'
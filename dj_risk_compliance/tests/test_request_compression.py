@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from app.services.request_compression import RequestCompression
+
+PAYLOAD = {"names": ["Jane Doe"] * 100}
+
+
+class Upstream:
+    """Answers gzip and plain bodies with fixed statuses, recording the encodings it saw"""
+
+    def __init__(self, gzip_status, plain_status):
+        self.statuses = {"gzip": gzip_status, None: plain_status}
+        self.encodings = []
+
+    async def __call__(self, content, encoding):
+        self.encodings.append(encoding)
+        await asyncio.sleep(0.01)
+        return httpx.Response(self.statuses[encoding])
+
+
+def test_gzip_is_turned_off_only_when_the_plain_resend_succeeds():
+    compression = RequestCompression(enabled=True, min_size=10)
+    upstream = Upstream(gzip_status=400, plain_status=200)
+
+    response = asyncio.run(compression.send(PAYLOAD, upstream))
+
+    assert response.status_code == 200
+    assert upstream.encodings == ["gzip", None]
+    assert compression.supported is False
+
+
+def test_bad_request_that_fails_plain_too_leaves_support_unknown():
+    compression = RequestCompression(enabled=True, min_size=10)
+    upstream = Upstream(gzip_status=400, plain_status=400)
+
+    async def run():
+        first = await compression.send(PAYLOAD, upstream)
+        assert compression.supported is None
+        upstream.statuses["gzip"] = 200
+        return first, await compression.send(PAYLOAD, upstream)
+
+    first, second = asyncio.run(run())
+
+    assert (first.status_code, second.status_code) == (400, 200)
+    assert upstream.encodings == ["gzip", None, "gzip"]
+    assert compression.supported is True
+
+
+def test_concurrent_first_requests_send_a_single_probe():
+    compression = RequestCompression(enabled=True, min_size=10)
+    upstream = Upstream(gzip_status=415, plain_status=200)
+
+    async def run():
+        return await asyncio.gather(*(compression.send(PAYLOAD, upstream) for _ in range(5)))
+
+    responses = asyncio.run(run())
+
+    assert [response.status_code for response in responses] == [200] * 5
+    assert upstream.encodings.count("gzip") == 1
+    assert upstream.encodings.count(None) == 5
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+pytest.importorskip("fastapi")
+from fastapi.testclient import TestClient
+
+from app.api import endpoints
+from app.main import app
+from app.responses import CompressionMiddleware
+from benchmarks.synthetic import generate_matches_response
+
+MATCHES = generate_matches_response(500)
+
+
+class FakeService:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def get_case_matches(self, case_id, filters=None):
+        return MATCHES
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(endpoints, "DowJonesAPIService", FakeService)
+    return TestClient(app)
+
+
+def test_large_response_is_compressed_through_the_full_middleware_stack(client):
+    response = client.get("/api/v1/screening/cases/case-1/matches", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    # The timing middleware still adds its header to the compressed response
+    assert "total;dur=" in response.headers["server-timing"]
+    assert int(response.headers["content-length"]) == response.num_bytes_downloaded
+    assert response.num_bytes_downloaded < len(json.dumps(MATCHES)) / 4
+    assert response.json() == MATCHES
+
+
+def test_identity_when_not_accepted_or_small(client):
+    plain = client.get("/api/v1/screening/cases/case-1/matches", headers={"Accept-Encoding": "identity"})
+    small = client.get("/", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in plain.headers
+    assert plain.json() == MATCHES
+    assert "content-encoding" not in small.headers
+    assert small.json()["status"] == "running"
+
+
+def test_stream_longer_than_the_buffer_passes_through():
+    chunks = [b'{"part":"' + b"x" * 4000 + b'"}'] * 3
+
+    async def streaming_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")]})
+        for i, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": i < len(chunks) - 1})
+
+    middleware = CompressionMiddleware(streaming_app, minimum_size=1024, max_buffer_size=6000)
+    response = TestClient(middleware).get("/", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert response.content == b"".join(chunks)
+
+
+def test_stream_within_the_buffer_is_compressed_whole():
+    chunks = [b'{"part":"' + b"x" * 4000 + b'"}'] * 3
+
+    async def streaming_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")]})
+        for chunk in chunks:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    response = TestClient(CompressionMiddleware(streaming_app)).get("/", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content == b"".join(chunks)
@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+
+from app.services.scheduler import BULK, RequestScheduler
+
+
+def test_waiter_cancelled_while_the_slot_is_released_does_not_leak_it():
+    scheduler = RequestScheduler(max_concurrency=1, reserved_interactive=0, weights={})
+
+    async def hold():
+        async with scheduler.slot(BULK):
+            pass
+
+    async def run():
+        async with scheduler.slot(BULK):
+            queued = asyncio.create_task(hold())
+            await asyncio.sleep(0)
+            assert scheduler.stats()["queued"][BULK] == 1
+            # Cancelled in the same step as the holder releases the slot it waits for
+            queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+
+        await asyncio.wait_for(hold(), timeout=1)
+        return scheduler.stats()
+
+    stats = asyncio.run(run())
+
+    assert stats["in_flight"] == 0
+    assert stats["queued"][BULK] == 0
+    assert stats["released"][BULK] == 2
@@ -0,0 +1,64 @@
+import json
+import os
+
+from app.auth import pool
+from app.config import DJAccount, max_workers, settings, worker_share
+from app.metrics import Counter, Histogram, Registry
+from app.services import scheduler
+
+
+def test_service_wide_limits_are_split_across_workers(monkeypatch):
+    monkeypatch.setattr(settings, "workers", 4)
+    monkeypatch.setattr(settings, "dj_max_concurrent_requests", 8)
+    monkeypatch.setattr(settings, "dj_account_request_budget", 600)
+    monkeypatch.setattr(settings, "dj_accounts", [
+        DJAccount(name="second", client_id="c", username="u", password="p", request_budget=100)
+    ])
+    monkeypatch.setattr(scheduler, "_scheduler", None)
+    monkeypatch.setattr(pool, "_pool", None)
+
+    assert worker_share(8) == 2
+    # Rounded down and never lifted to 1, so four workers stay within the service-wide limit
+    assert worker_share(3) == 0
+    assert worker_share(0) == 0
+    assert max_workers() == 8
+    assert scheduler.get_request_scheduler().max_concurrency == 2
+    assert [account.budget for account in pool.get_credential_pool().accounts] == [150, 25]
+
+
+def test_metrics_of_every_running_worker_are_rendered(tmp_path):
+    registry = Registry()
+    requests = Counter("test_requests_total", "Requests", ["endpoint"], registry=registry)
+    latency = Histogram("test_latency_seconds", "Latency", [], buckets=(0.1, 1.0), registry=registry)
+    requests.inc(3, endpoint="/search")
+    latency.observe(0.05)
+
+    # Another live worker (the parent process stands in for it) and one that has exited
+    other, gone = str(os.getppid()), "999999999"
+    for worker in (other, gone):
+        with open(tmp_path / f"{worker}.json", "w", encoding="utf-8") as f:
+            json.dump({"test_requests_total": [[["/search"], 5.0]], "test_latency_seconds": [[[], [0, 1, 2.0, 1]]]}, f)
+
+    rendered = registry.render_workers(str(tmp_path))
+
+    own = str(os.getpid())
+    assert f'test_requests_total{{endpoint="/search",worker="{own}"}} 3.0' in rendered
+    assert f'test_requests_total{{endpoint="/search",worker="{other}"}} 5.0' in rendered
+    assert f'test_latency_seconds_bucket{{worker="{other}",le="1.0"}} 1' in rendered
+    assert f'test_latency_seconds_count{{worker="{own}"}} 1' in rendered
+    assert gone not in rendered
+    assert not (tmp_path / f"{gone}.json").exists()
+    assert rendered.count("# TYPE test_requests_total counter") == 1
+
+
+def test_published_snapshot_round_trips(tmp_path):
+    registry = Registry()
+    requests = Counter("test_requests_total", "Requests", ["endpoint"], registry=registry)
+    requests.inc(2, endpoint="/profiles")
+
+    registry.publish(str(tmp_path))
+    with open(tmp_path / f"{os.getpid()}.json", encoding="utf-8") as f:
+        assert json.load(f) == {"test_requests_total": [[["/profiles"], 2.0]]}
+
+    registry.unpublish(str(tmp_path))
+    assert not list(tmp_path.iterdir())